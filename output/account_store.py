@@ -0,0 +1,373 @@
+import sqlite3
+import threading
+import time
+
+from accounts import Account
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    balance REAL NOT NULL,
+    initial_deposit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    account_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (account_id, symbol)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    type TEXT NOT NULL,
+    symbol TEXT,
+    quantity INTEGER,
+    amount REAL NOT NULL,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_timestamp ON transactions (account_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_symbol ON transactions (account_id, symbol);
+"""
+
+# The fields of a transaction as Account records it, and as the store's queries report it
+_LEDGER_FIELDS = ("type", "symbol", "quantity", "amount", "price")
+_TRANSACTION_FIELDS = _LEDGER_FIELDS + ("timestamp",)
+_LEDGER_COLUMNS = ", ".join(_LEDGER_FIELDS)
+_TRANSACTION_COLUMNS = ", ".join(_TRANSACTION_FIELDS)
+
+
+def _transaction_from_row(row) -> dict:
+    """Converts a transactions row, selected as _TRANSACTION_COLUMNS or _LEDGER_COLUMNS, into a dictionary."""
+    return dict(zip(_TRANSACTION_FIELDS, row))
+
+
+class AccountStore:
+    """SQLite-backed persistence for accounts, their holdings and their transactions.
+
+    The database runs in WAL mode so several processes on one host can share it: readers
+    never block the writer. Writes are buffered and committed together in one transaction
+    once batch_size transactions are pending, once the oldest pending write is max_delay
+    seconds old, or when flush() is called. Every read flushes first, so a store always sees
+    its own writes; other processes see them after the commit.
+
+    Each account must have a single writer. Saving an account overwrites its stored balance
+    and holdings with the in-memory ones, so two processes trading on the same account lose
+    each other's updates. Processes may share the database as long as each writes only the
+    accounts it owns, as the app's per-session accounts do.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, max_delay: float = 1.0) -> None:
+        """Opens (and if needed creates) the database.
+
+        Args:
+            path: The SQLite database file.
+            batch_size: The number of pending transactions that triggers a commit; use 1 to
+                commit every transaction as soon as it is recorded.
+            max_delay: The age in seconds of the oldest pending write at which the next write
+                commits the batch, however small it is.
+        """
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._migrate()
+        self._pending_transactions = []
+        self._pending_accounts = {}  # account_id -> (balance, initial_deposit, holdings)
+        self._pending_since = None  # time.monotonic() of the oldest pending write
+
+    def __enter__(self) -> "AccountStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _migrate(self) -> None:
+        """Adds the transaction price column to databases created before it existed.
+
+        Prices of existing trades are backfilled from their amount and quantity.
+        """
+        connection = self._connection
+        # Checked under the write lock, since another process may be migrating the same file
+        connection.execute("BEGIN IMMEDIATE")
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(transactions)")}
+        if "price" not in columns:
+            connection.execute("ALTER TABLE transactions ADD COLUMN price REAL")
+            connection.execute(
+                "UPDATE transactions SET price = amount / quantity WHERE type IN ('BUY', 'SELL') AND quantity != 0"
+            )
+        connection.execute("COMMIT")
+
+    def transactions(self, account_id: str) -> "StoredTransactions":
+        """Returns a list-like view of an account's stored transactions.
+
+        Args:
+            account_id: The account identifier.
+        """
+        return StoredTransactions(self, account_id)
+
+    def record(self, account: Account, transaction: dict) -> None:
+        """Queues a transaction together with the account state that results from it.
+
+        Both go into the same commit, so the stored balance and holdings always match the
+        stored transactions.
+
+        Args:
+            account: The account the transaction was recorded on.
+            transaction: The transaction dictionary recorded by the account.
+        """
+        with self._lock:
+            self._queue_transaction(account.account_id, transaction)
+            self._queue_account(account)
+            self._flush_if_due()
+
+    def record_transaction(self, account_id: str, transaction: dict) -> None:
+        """Queues a transaction for the next commit.
+
+        Args:
+            account_id: The account identifier.
+            transaction: The transaction dictionary recorded by the account.
+        """
+        with self._lock:
+            self._queue_transaction(account_id, transaction)
+            self._flush_if_due()
+
+    def save_account(self, account: Account) -> None:
+        """Queues the account's balance and holdings for the next commit.
+
+        Only the latest state of each account is kept, so many transactions on the same
+        account between commits cost a single row update.
+
+        Args:
+            account: The account to save.
+        """
+        with self._lock:
+            self._queue_account(account)
+            self._flush_if_due()
+
+    def _queue_transaction(self, account_id: str, transaction: dict) -> None:
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._pending_transactions.append((
+            account_id, time.time(), transaction["type"], transaction["symbol"],
+            transaction["quantity"], transaction["amount"], transaction["price"],
+        ))
+
+    def _queue_account(self, account: Account) -> None:
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._pending_accounts[account.account_id] = (
+            account.balance, account.initial_deposit, dict(account.holdings),
+        )
+
+    def _flush_if_due(self) -> None:
+        """Commits the pending writes if the batch is full or its oldest write is too old."""
+        if (len(self._pending_transactions) >= self.batch_size
+                or time.monotonic() - self._pending_since >= self.max_delay):
+            self.flush()
+
+    def flush(self) -> None:
+        """Commits every pending write in a single transaction."""
+        with self._lock:
+            if not self._pending_transactions and not self._pending_accounts:
+                return
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT INTO transactions (account_id, timestamp, type, symbol, quantity, amount, price) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_transactions,
+                )
+                for account_id, (balance, initial_deposit, holdings) in self._pending_accounts.items():
+                    connection.execute(
+                        "INSERT INTO accounts (account_id, balance, initial_deposit) VALUES (?, ?, ?) "
+                        "ON CONFLICT (account_id) DO UPDATE SET balance = excluded.balance, "
+                        "initial_deposit = excluded.initial_deposit",
+                        (account_id, balance, initial_deposit),
+                    )
+                    connection.execute("DELETE FROM holdings WHERE account_id = ?", (account_id,))
+                    connection.executemany(
+                        "INSERT INTO holdings (account_id, symbol, quantity) VALUES (?, ?, ?)",
+                        [(account_id, symbol, quantity) for symbol, quantity in holdings.items()],
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._pending_transactions = []
+            self._pending_accounts = {}
+            self._pending_since = None
+
+    def delete_account(self, account_id: str) -> None:
+        """Deletes an account with its holdings and transactions, including pending writes.
+
+        Args:
+            account_id: The account identifier.
+        """
+        with self._lock:
+            self._pending_transactions = [row for row in self._pending_transactions if row[0] != account_id]
+            self._pending_accounts.pop(account_id, None)
+            if not self._pending_transactions and not self._pending_accounts:
+                self._pending_since = None
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("transactions", "holdings", "accounts"):
+                    connection.execute(f"DELETE FROM {table} WHERE account_id = ?", (account_id,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """Commits pending writes and closes the database."""
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+    def _query(self, sql: str, parameters: tuple) -> list:
+        """Flushes pending writes, then runs a read query."""
+        with self._lock:
+            self.flush()
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def load_account(self, account_id: str):
+        """Loads a stored account, bound to this store.
+
+        Args:
+            account_id: The account identifier.
+
+        Returns:
+            The account, or None if no account with that identifier has been stored.
+        """
+        rows = self._query("SELECT balance, initial_deposit FROM accounts WHERE account_id = ?", (account_id,))
+        if not rows:
+            return None
+        balance, initial_deposit = rows[0]
+        holdings = dict(self._query("SELECT symbol, quantity FROM holdings WHERE account_id = ?", (account_id,)))
+        return Account.from_state(balance, initial_deposit, holdings, self.transactions(account_id),
+                                  account_id=account_id, store=self)
+
+    def get_transactions(self, account_id: str, start: float = None, end: float = None,
+                         offset: int = 0, limit: int = None) -> list:
+        """Lists an account's transactions in the order they were recorded.
+
+        Args:
+            account_id: The account identifier.
+            start: Only include transactions at or after this Unix timestamp.
+            end: Only include transactions at or before this Unix timestamp.
+            offset: The number of matching transactions to skip.
+            limit: The maximum number of transactions to return.
+
+        Returns:
+            A list of transaction dictionaries, each with a "timestamp".
+        """
+        sql = f"SELECT {_TRANSACTION_COLUMNS} FROM transactions WHERE account_id = ?"
+        parameters = [account_id]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            parameters.append(start)
+        if end is not None:
+            sql += " AND timestamp <= ?"
+            parameters.append(end)
+        sql += " ORDER BY id LIMIT ? OFFSET ?"
+        parameters.extend([-1 if limit is None else limit, offset])
+        return [_transaction_from_row(row) for row in self._query(sql, tuple(parameters))]
+
+    def get_ledger(self, account_id: str, offset: int = 0, limit: int = None) -> list:
+        """Lists an account's transactions exactly as Account records them, without timestamps.
+
+        Args:
+            account_id: The account identifier.
+            offset: The number of transactions to skip.
+            limit: The maximum number of transactions to return.
+
+        Returns:
+            A list of transaction dictionaries.
+        """
+        rows = self._query(
+            f"SELECT {_LEDGER_COLUMNS} FROM transactions WHERE account_id = ? ORDER BY id LIMIT ? OFFSET ?",
+            (account_id, -1 if limit is None else limit, offset),
+        )
+        return [_transaction_from_row(row) for row in rows]
+
+    def count_transactions(self, account_id: str) -> int:
+        """Returns the number of transactions stored for an account."""
+        return self._query("SELECT COUNT(*) FROM transactions WHERE account_id = ?", (account_id,))[0][0]
+
+    def get_holdings_at(self, account_id: str, timestamp: float) -> dict:
+        """Reconstructs an account's holdings as they were at a point in time.
+
+        Args:
+            account_id: The account identifier.
+            timestamp: The Unix timestamp to report holdings at.
+
+        Returns:
+            A dictionary with stock symbols as keys and the number of shares as values.
+        """
+        rows = self._query(
+            "SELECT symbol, SUM(CASE type WHEN 'BUY' THEN quantity ELSE -quantity END) AS shares "
+            "FROM transactions WHERE account_id = ? AND timestamp <= ? AND type IN ('BUY', 'SELL') "
+            "GROUP BY symbol HAVING shares != 0",
+            (account_id, timestamp),
+        )
+        return dict(rows)
+
+    def get_symbol_history(self, account_id: str, symbol: str) -> list:
+        """Lists an account's transactions in one stock symbol.
+
+        Args:
+            account_id: The account identifier.
+            symbol: The stock symbol.
+
+        Returns:
+            A list of transaction dictionaries, each with a "timestamp".
+        """
+        rows = self._query(
+            f"SELECT {_TRANSACTION_COLUMNS} FROM transactions WHERE account_id = ? AND symbol = ? ORDER BY id",
+            (account_id, symbol),
+        )
+        return [_transaction_from_row(row) for row in rows]
+
+
+class StoredTransactions:
+    """List-like view of one account's transactions in an AccountStore.
+
+    Lengths and lookups are answered by indexed queries, so the history never has to be
+    held in memory. Transactions have the same fields as an in-memory Account's.
+    """
+
+    def __init__(self, store: AccountStore, account_id: str) -> None:
+        self._store = store
+        self._account_id = account_id
+
+    def __len__(self) -> int:
+        return self._store.count_transactions(self._account_id)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._store.get_ledger(self._account_id, offset=start, limit=max(stop - start, 0))
+        if index < 0:
+            index += len(self)
+        rows = self._store.get_ledger(self._account_id, offset=index, limit=1) if index >= 0 else []
+        if not rows:
+            raise IndexError("transaction index out of range")
+        return rows[0]
+
+    def __iter__(self):
+        return iter(self.copy())
+
+    def append(self, transaction: dict) -> None:
+        """Records a transaction for the account."""
+        self._store.record_transaction(self._account_id, transaction)
+
+    def copy(self) -> list:
+        """Returns every stored transaction as a plain list of dictionaries."""
+        return self._store.get_ledger(self._account_id)
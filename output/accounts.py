@@ -18,26 +18,62 @@ def get_share_price(symbol: str) -> float:
 class Account:
     """Class representing a user account in a trading simulation platform."""
 
-    def __init__(self, initial_deposit: float) -> None:
+    def __init__(self, initial_deposit: float, account_id: str = None, store=None) -> None:
         """Initializes the account with an initial deposit.
 
         Args:
             initial_deposit: The amount of initial deposit into the account.
+            account_id: The identifier of the account in the store.
+            store: An optional AccountStore that persists the account's state and transactions.
             
         Raises:
-            ValueError: If initial deposit is not positive.
+            ValueError: If initial deposit is not positive, or a store is given without an account_id.
         """
         if initial_deposit <= 0:
             raise ValueError("Initial deposit must be positive.")
+        if store is not None and account_id is None:
+            raise ValueError("An account_id is required when using a store.")
         
         self.balance = initial_deposit
         self.initial_deposit = initial_deposit
         self.holdings = {}  # Dictionary to track number of shares for each symbol
-        self.transactions = []  # List to store all transactions
+        self.account_id = account_id
+        self.store = store
+        self.risk = None  # RiskEngine consulted before every trade, attached by the engine itself
+        self.version = 0  # Incremented on every change, so views of the account can tell when to refresh
+        # List to store all transactions, or a view of the stored ones when a store is used
+        self.transactions = store.transactions(account_id) if store is not None else []
         
         # Record the initial deposit as a transaction
         self._record_transaction("DEPOSIT", None, None, initial_deposit)
 
+    @classmethod
+    def from_state(cls, balance: float, initial_deposit: float, holdings: dict, transactions,
+                   account_id: str = None, store=None) -> "Account":
+        """Rebuilds an account from previously persisted state without replaying its transactions.
+
+        Args:
+            balance: The current cash balance.
+            initial_deposit: The amount of the initial deposit.
+            holdings: A dictionary with stock symbols as keys and the number of shares as values.
+            transactions: The transaction history; any list-like object supporting append().
+            account_id: The identifier of the account in the store.
+            store: The AccountStore the account was loaded from, if any.
+
+        Returns:
+            The restored account.
+        """
+        account = cls.__new__(cls)
+        account.balance = balance
+        account.initial_deposit = initial_deposit
+        account.holdings = holdings
+        account.account_id = account_id
+        account.store = store
+        account.risk = None
+        account.version = 0
+        account.transactions = transactions
+        return account
+
     def deposit(self, amount: float) -> None:
         """Increases the account's balance by the specified amount.
 
@@ -75,12 +111,13 @@ class Account:
         self._record_transaction("WITHDRAW", None, None, amount)
         return True
 
-    def buy_shares(self, symbol: str, quantity: int) -> bool:
+    def buy_shares(self, symbol: str, quantity: int, price: float = None) -> bool:
         """Buys a specified quantity of shares of a given stock if there are enough funds.
 
         Args:
             symbol: The stock symbol.
             quantity: The number of shares to buy.
+            price: The share price to trade at; looked up with get_share_price if not given.
 
         Returns:
             True if the transaction was successful, False otherwise.
@@ -91,10 +128,15 @@ class Account:
         if quantity <= 0:
             raise ValueError("Quantity must be positive.")
         
-        price = get_share_price(symbol)
+        if price is None:
+            price = get_share_price(symbol)
         total_cost = price * quantity
         
-        if total_cost > self.balance:
+        # An attached risk engine covers buying power too, so it replaces the funds check
+        if self.risk is not None:
+            if not self.risk.check_order("BUY", symbol, quantity, price).passed:
+                return False
+        elif total_cost > self.balance:
             return False
         
         self.balance -= total_cost
@@ -105,15 +147,16 @@ class Account:
         else:
             self.holdings[symbol] = quantity
         
-        self._record_transaction("BUY", symbol, quantity, total_cost)
+        self._record_transaction("BUY", symbol, quantity, total_cost, price)
         return True
 
-    def sell_shares(self, symbol: str, quantity: int) -> bool:
+    def sell_shares(self, symbol: str, quantity: int, price: float = None) -> bool:
         """Sells a specified quantity of shares of a given stock if the shares are available in the account.
 
         Args:
             symbol: The stock symbol.
             quantity: The number of shares to sell.
+            price: The share price to trade at; looked up with get_share_price if not given.
 
         Returns:
             True if the transaction was successful, False otherwise.
@@ -124,12 +167,17 @@ class Account:
         if quantity <= 0:
             raise ValueError("Quantity must be positive.")
         
-        if symbol not in self.holdings or self.holdings[symbol] < quantity:
-            return False
-        
-        price = get_share_price(symbol)
+        if price is None:
+            price = get_share_price(symbol)
         total_value = price * quantity
         
+        # An attached risk engine covers held shares too, so it replaces the holdings check
+        if self.risk is not None:
+            if not self.risk.check_order("SELL", symbol, quantity, price).passed:
+                return False
+        elif symbol not in self.holdings or self.holdings[symbol] < quantity:
+            return False
+        
         self.balance += total_value
         self.holdings[symbol] -= quantity
         
@@ -137,25 +185,37 @@ class Account:
         if self.holdings[symbol] == 0:
             del self.holdings[symbol]
         
-        self._record_transaction("SELL", symbol, quantity, total_value)
+        self._record_transaction("SELL", symbol, quantity, total_value, price)
         return True
 
-    def get_portfolio_value(self) -> float:
+    def get_portfolio_value(self, prices: dict = None) -> float:
         """Calculates the total portfolio value based on the current share prices and holdings.
 
+        Args:
+            prices: Share prices by symbol to value the holdings at; any symbol missing
+                from it is looked up with get_share_price.
+
         Returns:
             The total value of the portfolio (cash + shares).
         """
-        share_value = sum(get_share_price(symbol) * quantity for symbol, quantity in self.holdings.items())
+        if prices is None:
+            prices = {}
+        share_value = sum(
+            (prices[symbol] if symbol in prices else get_share_price(symbol)) * quantity
+            for symbol, quantity in self.holdings.items()
+        )
         return self.balance + share_value
 
-    def get_profit_or_loss(self) -> float:
+    def get_profit_or_loss(self, prices: dict = None) -> float:
         """Calculates the profit or loss compared to the initial deposit.
 
+        Args:
+            prices: Share prices by symbol to value the holdings at, as for get_portfolio_value.
+
         Returns:
             The account's current profit or loss.
         """
-        return self.get_portfolio_value() - self.initial_deposit
+        return self.get_portfolio_value(prices) - self.initial_deposit
 
     def get_holdings(self) -> dict:
         """Returns the current holdings of the account.
@@ -165,15 +225,22 @@ class Account:
         """
         return self.holdings.copy()
 
-    def get_transactions(self) -> list:
+    def get_transactions(self, start: int = 0) -> list:
         """Lists all the transactions that have occurred in the account.
 
+        Args:
+            start: The index of the first transaction to list, to fetch only ones recorded
+                since an earlier call.
+
         Returns:
             A list of transactions.
         """
+        if start:
+            return self.transactions[start:]
         return self.transactions.copy()
 
-    def _record_transaction(self, transaction_type: str, symbol: str, quantity: int, amount: float) -> None:
+    def _record_transaction(self, transaction_type: str, symbol: str, quantity: int, amount: float,
+                            price: float = None) -> None:
         """Records a transaction in the account's transaction history.
 
         Args:
@@ -181,11 +248,20 @@ class Account:
             symbol: The stock symbol (for BUY and SELL transactions).
             quantity: The number of shares (for BUY and SELL transactions).
             amount: The amount of money involved in the transaction.
+            price: The share price traded at (for BUY and SELL transactions).
         """
         transaction = {
             "type": transaction_type,
             "symbol": symbol,
             "quantity": quantity,
             "amount": amount,
+            "price": price,
         }
-        self.transactions.append(transaction)
\ No newline at end of file
+        if self.store is not None:
+            # The transaction and the state it leads to are committed together
+            self.store.record(self, transaction)
+        else:
+            self.transactions.append(transaction)
+        self.version += 1
+        if self.risk is not None:
+            self.risk.on_transaction(transaction)
\ No newline at end of file
@@ -1,159 +1,168 @@
+import os
+
 import gradio as gr
-from accounts import Account, get_share_price
+from accounts import get_share_price
+from account_store import AccountStore
+from async_accounts import PriceService
+from render import HISTORY_HEADERS, AccountView
+from sessions import SessionRegistry
+
+# Prices are shared by every handler so concurrent lookups of a symbol are coalesced
+prices = PriceService(get_share_price)
+
+# Each browser session gets its own account; set ACCOUNTS_DB to persist them in SQLite.
+# Workers may share the database, but a session's account must only be traded on by the
+# worker serving that session: the store is single-writer per account.
+store = AccountStore(os.environ["ACCOUNTS_DB"]) if os.environ.get("ACCOUNTS_DB") else None
+sessions = SessionRegistry(prices, idle_timeout=float(os.environ.get("SESSION_IDLE_TIMEOUT", 1800)), store=store)
+
+# Concurrency limits per event group. Trades from any number of sessions may run at once
+# (each session's trades are still applied one at a time by its AsyncAccount); read-only
+# refreshes are unlimited unless APP_READ_CONCURRENCY is set.
+TRADE_CONCURRENCY = int(os.environ.get("APP_TRADE_CONCURRENCY", 32))
+READ_CONCURRENCY = int(os.environ["APP_READ_CONCURRENCY"]) if os.environ.get("APP_READ_CONCURRENCY") else None
+QUEUE_SIZE = int(os.environ["APP_QUEUE_SIZE"]) if os.environ.get("APP_QUEUE_SIZE") else None
 
-# Initialize account with $0 (will create a real one when user creates account)
-account = None
+def view_of(account):
+    """Return the render cache for a session's account, kept on the account so it goes with it."""
+    if account.view is None:
+        account.view = AccountView(account, prices)
+    return account.view
 
-def create_account(initial_deposit):
+STOCKS = ["AAPL", "TSLA", "GOOGL"]
+PRICE_HEADERS = ["Symbol", "Price"]
+
+def error(message, **details):
+    """Build the response of a request that could not be carried out."""
+    return {"error": message, **details}
+
+async def create_account(initial_deposit, request: gr.Request):
     """Create a new account with the specified initial deposit."""
-    global account
     try:
         initial_deposit = float(initial_deposit)
-        account = Account(initial_deposit)
-        return f"Account created with initial deposit of ${initial_deposit:.2f}"
+        account = sessions.create(request.session_hash, initial_deposit)
+        return {"action": "create_account", "initial_deposit": initial_deposit, "balance": account.balance}
     except ValueError as e:
-        return f"Error: {str(e)}"
+        return error(str(e))
 
-def deposit_funds(amount):
+async def deposit_funds(amount, request: gr.Request):
     """Deposit funds into the account."""
-    global account
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
+        return error("Please create an account first.")
     
     try:
         amount = float(amount)
-        account.deposit(amount)
-        return f"Successfully deposited ${amount:.2f}. New balance: ${account.balance:.2f}"
+        await account.deposit(amount)
+        return {"action": "deposit", "amount": amount, "balance": account.balance}
     except ValueError as e:
-        return f"Error: {str(e)}"
+        return error(str(e))
 
-def withdraw_funds(amount):
+async def withdraw_funds(amount, request: gr.Request):
     """Withdraw funds from the account."""
-    global account
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
+        return error("Please create an account first.")
     
     try:
         amount = float(amount)
-        if account.withdraw(amount):
-            return f"Successfully withdrew ${amount:.2f}. New balance: ${account.balance:.2f}"
+        if await account.withdraw(amount):
+            return {"action": "withdraw", "amount": amount, "balance": account.balance}
         else:
-            return f"Error: Insufficient funds. Current balance: ${account.balance:.2f}"
+            return error("Insufficient funds.", amount=amount, balance=account.balance)
     except ValueError as e:
-        return f"Error: {str(e)}"
+        return error(str(e))
 
-def buy_shares(symbol, quantity):
+async def buy_shares(symbol, quantity, request: gr.Request):
     """Buy shares of the specified stock."""
-    global account
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
+        return error("Please create an account first.")
     
     try:
         quantity = int(quantity)
         symbol = symbol.upper()
         
-        price = get_share_price(symbol)
+        price = await prices.get(symbol)
         if price == 0.0:
-            return f"Error: Invalid stock symbol '{symbol}'. Available stocks: AAPL, TSLA, GOOGL"
-        
-        total_cost = price * quantity
+            return error(f"Invalid stock symbol '{symbol}'.", available=STOCKS)
         
-        if account.buy_shares(symbol, quantity):
-            return f"Successfully bought {quantity} shares of {symbol} at ${price:.2f} each. Total cost: ${total_cost:.2f}. New balance: ${account.balance:.2f}"
+        trade = {"symbol": symbol, "quantity": quantity, "price": price, "total": price * quantity}
+        if await account.buy(symbol, quantity, price):
+            return {"action": "buy", **trade, "balance": account.balance}
         else:
-            return f"Error: Insufficient funds to buy {quantity} shares of {symbol} at ${price:.2f} each (${total_cost:.2f}). Current balance: ${account.balance:.2f}"
+            return error("Insufficient funds.", **trade, balance=account.balance)
     except ValueError as e:
-        return f"Error: {str(e)}"
+        return error(str(e))
 
-def sell_shares(symbol, quantity):
+async def sell_shares(symbol, quantity, request: gr.Request):
     """Sell shares of the specified stock."""
-    global account
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
+        return error("Please create an account first.")
     
     try:
         quantity = int(quantity)
         symbol = symbol.upper()
         
-        price = get_share_price(symbol)
+        price = await prices.get(symbol)
         if price == 0.0:
-            return f"Error: Invalid stock symbol '{symbol}'. Available stocks: AAPL, TSLA, GOOGL"
+            return error(f"Invalid stock symbol '{symbol}'.", available=STOCKS)
         
-        total_value = price * quantity
-        
-        if account.sell_shares(symbol, quantity):
-            return f"Successfully sold {quantity} shares of {symbol} at ${price:.2f} each. Total value: ${total_value:.2f}. New balance: ${account.balance:.2f}"
+        trade = {"symbol": symbol, "quantity": quantity, "price": price, "total": price * quantity}
+        if await account.sell(symbol, quantity, price):
+            return {"action": "sell", **trade, "balance": account.balance}
         else:
-            holdings = account.get_holdings()
-            current_quantity = holdings.get(symbol, 0)
-            return f"Error: Insufficient shares to sell. You have {current_quantity} shares of {symbol}, but tried to sell {quantity}."
+            return error("Insufficient shares.", **trade, held=account.get_holdings().get(symbol, 0))
     except ValueError as e:
-        return f"Error: {str(e)}"
+        return error(str(e))
 
-def get_account_summary():
+async def get_account_summary(request: gr.Request):
     """Get a summary of the account including balance, holdings, and profit/loss."""
-    global account
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
-    
-    summary = []
-    summary.append(f"Cash Balance: ${account.balance:.2f}")
-    
-    portfolio_value = account.get_portfolio_value()
-    summary.append(f"Portfolio Value: ${portfolio_value:.2f}")
+        return error("Please create an account first.")
     
-    profit_loss = account.get_profit_or_loss()
-    summary.append(f"Profit/Loss: ${profit_loss:.2f} ({profit_loss/account.initial_deposit*100:.2f}%)")
-    
-    holdings = account.get_holdings()
-    if holdings:
-        summary.append("\nCurrent Holdings:")
-        for symbol, quantity in holdings.items():
-            price = get_share_price(symbol)
-            value = price * quantity
-            summary.append(f"  {symbol}: {quantity} shares at ${price:.2f} = ${value:.2f}")
-    else:
-        summary.append("\nNo current holdings.")
-    
-    return "\n".join(summary)
+    return await view_of(account).summary()
 
-def get_transaction_history():
-    """Get the transaction history for the account."""
-    global account
+def get_transaction_history(request: gr.Request):
+    """Get the transaction history for the account, one row per transaction."""
+    account = sessions.get(request.session_hash)
     if account is None:
-        return "Error: Please create an account first."
-    
-    transactions = account.get_transactions()
-    if not transactions:
-        return "No transactions recorded."
+        return []
     
-    history = ["Transaction History:"]
-    for i, transaction in enumerate(transactions, 1):
-        t_type = transaction["type"]
-        amount = transaction["amount"]
-        
-        if t_type == "DEPOSIT":
-            history.append(f"{i}. DEPOSIT: ${amount:.2f}")
-        elif t_type == "WITHDRAW":
-            history.append(f"{i}. WITHDRAW: ${amount:.2f}")
-        elif t_type == "BUY":
-            symbol = transaction["symbol"]
-            quantity = transaction["quantity"]
-            price = amount / quantity
-            history.append(f"{i}. BUY: {quantity} shares of {symbol} at ${price:.2f} each, total ${amount:.2f}")
-        elif t_type == "SELL":
-            symbol = transaction["symbol"]
-            quantity = transaction["quantity"]
-            price = amount / quantity
-            history.append(f"{i}. SELL: {quantity} shares of {symbol} at ${price:.2f} each, total ${amount:.2f}")
+    return view_of(account).history()
+
+# Rows of the price table are shared by every session until a price changes
+_price_rows = (None, None)
+
+async def get_current_prices():
+    """Get the current prices of available stocks, one row per stock."""
+    global _price_rows
+    current_prices = await prices.get_many(STOCKS)
+    key = tuple(current_prices.values())
+    if key != _price_rows[0]:
+        _price_rows = (key, [[stock, current_prices[stock]] for stock in STOCKS])
+    return _price_rows[1]
+
+async def refresh_live(last_seen, request: gr.Request):
+    """Push the summary, history and prices to the browser, but only when one of them has changed."""
+    account = sessions.get(request.session_hash)
+    if account is not None:
+        # Valuing the holdings refreshes their prices, so a price move is picked up below
+        summary = await view_of(account).summary()
+    current_prices = await get_current_prices()
     
-    return "\n".join(history)
+    seen = (id(account), account.version if account is not None else None, prices.version)
+    if seen == last_seen:
+        return gr.skip(), gr.skip(), gr.skip(), last_seen
+    if account is None:
+        return gr.skip(), gr.skip(), current_prices, seen
+    return summary, view_of(account).history(), current_prices, seen
 
-def get_current_prices():
-    """Get the current prices of available stocks."""
-    stocks = ["AAPL", "TSLA", "GOOGL"]
-    prices = [f"{stock}: ${get_share_price(stock):.2f}" for stock in stocks]
-    return "Current Stock Prices:\n" + "\n".join(prices)
+def end_session(request: gr.Request):
+    """Free the session's account when its browser tab closes rather than waiting for idle eviction."""
+    sessions.discard(request.session_hash)
 
 # Create the Gradio interface
 with gr.Blocks(title="Trading Simulation Platform") as demo:
@@ -165,36 +174,42 @@ with gr.Blocks(title="Trading Simulation Platform") as demo:
                 gr.Markdown("### Create Account")
                 create_account_input = gr.Textbox(label="Initial Deposit ($)")
                 create_account_button = gr.Button("Create Account")
-                create_account_output = gr.Textbox(label="Result")
+                create_account_output = gr.JSON(label="Result")
                 
                 create_account_button.click(
                     create_account,
                     inputs=create_account_input,
-                    outputs=create_account_output
+                    outputs=create_account_output,
+                    concurrency_limit=TRADE_CONCURRENCY,
+                    concurrency_id="trading"
                 )
             
             with gr.Column():
                 gr.Markdown("### Deposit Funds")
                 deposit_input = gr.Textbox(label="Amount ($)")
                 deposit_button = gr.Button("Deposit")
-                deposit_output = gr.Textbox(label="Result")
+                deposit_output = gr.JSON(label="Result")
                 
                 deposit_button.click(
                     deposit_funds,
                     inputs=deposit_input,
-                    outputs=deposit_output
+                    outputs=deposit_output,
+                    concurrency_limit=TRADE_CONCURRENCY,
+                    concurrency_id="trading"
                 )
             
             with gr.Column():
                 gr.Markdown("### Withdraw Funds")
                 withdraw_input = gr.Textbox(label="Amount ($)")
                 withdraw_button = gr.Button("Withdraw")
-                withdraw_output = gr.Textbox(label="Result")
+                withdraw_output = gr.JSON(label="Result")
                 
                 withdraw_button.click(
                     withdraw_funds,
                     inputs=withdraw_input,
-                    outputs=withdraw_output
+                    outputs=withdraw_output,
+                    concurrency_limit=TRADE_CONCURRENCY,
+                    concurrency_id="trading"
                 )
     
     with gr.Tab("Trading"):
@@ -204,12 +219,14 @@ with gr.Blocks(title="Trading Simulation Platform") as demo:
                 buy_symbol_input = gr.Textbox(label="Stock Symbol (AAPL, TSLA, GOOGL)")
                 buy_quantity_input = gr.Textbox(label="Quantity")
                 buy_button = gr.Button("Buy Shares")
-                buy_output = gr.Textbox(label="Result")
+                buy_output = gr.JSON(label="Result")
                 
                 buy_button.click(
                     buy_shares,
                     inputs=[buy_symbol_input, buy_quantity_input],
-                    outputs=buy_output
+                    outputs=buy_output,
+                    concurrency_limit=TRADE_CONCURRENCY,
+                    concurrency_id="trading"
                 )
             
             with gr.Column():
@@ -217,45 +234,42 @@ with gr.Blocks(title="Trading Simulation Platform") as demo:
                 sell_symbol_input = gr.Textbox(label="Stock Symbol (AAPL, TSLA, GOOGL)")
                 sell_quantity_input = gr.Textbox(label="Quantity")
                 sell_button = gr.Button("Sell Shares")
-                sell_output = gr.Textbox(label="Result")
+                sell_output = gr.JSON(label="Result")
                 
                 sell_button.click(
                     sell_shares,
                     inputs=[sell_symbol_input, sell_quantity_input],
-                    outputs=sell_output
+                    outputs=sell_output,
+                    concurrency_limit=TRADE_CONCURRENCY,
+                    concurrency_id="trading"
                 )
     
     with gr.Tab("Account Summary"):
         with gr.Row():
             with gr.Column():
-                summary_button = gr.Button("Get Account Summary")
-                summary_output = gr.Textbox(label="Account Summary", lines=10)
-                
-                summary_button.click(
-                    get_account_summary,
-                    inputs=[],
-                    outputs=summary_output
-                )
+                summary_output = gr.JSON(label="Account Summary")
             
             with gr.Column():
-                transactions_button = gr.Button("Get Transaction History")
-                transactions_output = gr.Textbox(label="Transaction History", lines=10)
-                
-                transactions_button.click(
-                    get_transaction_history,
-                    inputs=[],
-                    outputs=transactions_output
-                )
+                transactions_output = gr.Dataframe(headers=HISTORY_HEADERS, label="Transaction History", interactive=False, max_height=400)
     
     with gr.Tab("Stock Prices"):
-        prices_button = gr.Button("Get Current Stock Prices")
-        prices_output = gr.Textbox(label="Stock Prices")
-        
-        prices_button.click(
-            get_current_prices,
-            inputs=[],
-            outputs=prices_output
-        )
+        prices_output = gr.Dataframe(headers=PRICE_HEADERS, label="Stock Prices", interactive=False)
+    
+    # Summary, history and prices update themselves; each tick sends nothing unless something changed
+    last_seen = gr.State(None)
+    live_timer = gr.Timer(float(os.environ.get("LIVE_REFRESH_SECONDS", 2)))
+    live_timer.tick(
+        refresh_live,
+        inputs=last_seen,
+        outputs=[summary_output, transactions_output, prices_output, last_seen],
+        concurrency_limit=READ_CONCURRENCY,
+        concurrency_id="read",
+        trigger_mode="once"  # Skip ticks while the previous refresh for this session is still running
+    )
+
+    demo.unload(end_session)
+
+demo.queue(max_size=QUEUE_SIZE)
 
 if __name__ == "__main__":
     demo.launch()
\ No newline at end of file
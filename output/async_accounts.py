@@ -0,0 +1,209 @@
+import asyncio
+import inspect
+import time
+
+from accounts import Account, get_share_price
+
+
+class PriceService:
+    """Async access to share prices for many concurrent callers.
+
+    Concurrent requests for the same symbol share a single lookup, and prices are cached
+    for ttl seconds, so a slow price source is hit at most once per symbol per interval no
+    matter how many sessions are trading.
+    """
+
+    def __init__(self, price_source=get_share_price, ttl: float = 1.0, blocking: bool = False) -> None:
+        """Initializes the service.
+
+        Args:
+            price_source: A function or coroutine function taking a symbol and returning its price.
+            ttl: The number of seconds a fetched price is reused for.
+            blocking: Whether a plain-function price_source blocks (e.g. does network I/O) and
+                should be run in a worker thread instead of on the event loop.
+        """
+        self._source = price_source
+        self._is_async = inspect.iscoroutinefunction(price_source)
+        self.ttl = ttl
+        self.blocking = blocking
+        self._cache = {}  # symbol -> (price, fetched_at)
+        self._in_flight = {}  # symbol -> future of the running lookup
+        self.version = 0  # Incremented whenever a fetched price differs from the one cached before it
+
+    async def get(self, symbol: str) -> float:
+        """Returns the current price of a share.
+
+        Args:
+            symbol: The stock symbol.
+
+        Returns:
+            The share price.
+        """
+        cached = self._cache.get(symbol)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        future = self._in_flight.get(symbol)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(symbol))
+            self._in_flight[symbol] = future
+            future.add_done_callback(lambda done: self._in_flight.pop(symbol, None))
+        # Shield the shared lookup so one cancelled caller doesn't cancel it for everyone else
+        return await asyncio.shield(future)
+
+    async def get_many(self, symbols) -> dict:
+        """Returns the current prices of several shares, looked up concurrently.
+
+        Args:
+            symbols: The stock symbols.
+
+        Returns:
+            A dictionary with stock symbols as keys and prices as values.
+        """
+        symbols = list(symbols)
+        prices = await asyncio.gather(*(self.get(symbol) for symbol in symbols))
+        return dict(zip(symbols, prices))
+
+    async def _fetch(self, symbol: str) -> float:
+        """Looks up a price from the source and caches it."""
+        if self._is_async:
+            price = await self._source(symbol)
+        elif self.blocking:
+            price = await asyncio.to_thread(self._source, symbol)
+        else:
+            price = self._source(symbol)
+        previous = self._cache.get(symbol)
+        if previous is None or previous[0] != price:
+            self.version += 1
+        self._cache[symbol] = (price, time.monotonic())
+        return price
+
+
+class AsyncAccount:
+    """Async facade over an Account.
+
+    Commands are queued per account and applied one at a time in the order they were
+    submitted, so awaiting a slow price can never interleave two trades on the same account.
+    Accounts don't share a queue, so sessions trade concurrently with each other. The
+    worker draining an account's queue exits once it is empty, so idle accounts hold no tasks.
+    """
+
+    def __init__(self, account: Account, prices: PriceService = None) -> None:
+        """Wraps an account.
+
+        Args:
+            account: The account to drive.
+            prices: The price service trades and valuations use.
+        """
+        self.account = account
+        self.prices = prices if prices is not None else PriceService()
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.view = None  # Render cache attached by the app, so it is dropped along with the session
+
+    @property
+    def balance(self) -> float:
+        """The account's cash balance."""
+        return self.account.balance
+
+    @property
+    def initial_deposit(self) -> float:
+        """The account's initial deposit."""
+        return self.account.initial_deposit
+
+    def get_holdings(self) -> dict:
+        """Returns the current holdings of the account."""
+        return self.account.get_holdings()
+
+    @property
+    def version(self) -> int:
+        """The account's change counter; see Account.version."""
+        return self.account.version
+
+    def get_transactions(self, start: int = 0) -> list:
+        """Lists the transactions that have occurred in the account; see Account.get_transactions."""
+        return self.account.get_transactions(start)
+
+    async def deposit(self, amount: float) -> None:
+        """Deposits funds; see Account.deposit."""
+        return await self._submit(self.account.deposit, amount)
+
+    async def withdraw(self, amount: float) -> bool:
+        """Withdraws funds; see Account.withdraw."""
+        return await self._submit(self.account.withdraw, amount)
+
+    async def buy(self, symbol: str, quantity: int, price: float = None) -> bool:
+        """Buys shares; see Account.buy_shares.
+
+        Args:
+            symbol: The stock symbol.
+            quantity: The number of shares to buy.
+            price: A price the caller has already fetched; looked up from the service if not given.
+        """
+        return await self._submit(self._trade, self.account.buy_shares, symbol, quantity, self._price(symbol, price))
+
+    async def sell(self, symbol: str, quantity: int, price: float = None) -> bool:
+        """Sells shares; see Account.sell_shares.
+
+        Args:
+            symbol: The stock symbol.
+            quantity: The number of shares to sell.
+            price: A price the caller has already fetched; looked up from the service if not given.
+        """
+        return await self._submit(self._trade, self.account.sell_shares, symbol, quantity, self._price(symbol, price))
+
+    async def get_portfolio_value(self) -> float:
+        """Calculates the total portfolio value at current prices."""
+        prices = await self.prices.get_many(self.account.holdings)
+        return self.account.get_portfolio_value(prices)
+
+    async def get_profit_or_loss(self) -> float:
+        """Calculates the profit or loss compared to the initial deposit at current prices."""
+        prices = await self.prices.get_many(self.account.holdings)
+        return self.account.get_profit_or_loss(prices)
+
+    def _price(self, symbol: str, price: float = None) -> asyncio.Future:
+        """Returns a future for the trade price, starting the lookup now if one is needed.
+
+        Starting it before the command is queued lets it overlap with commands ahead of it.
+        """
+        if price is None:
+            return asyncio.ensure_future(self.prices.get(symbol))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(price)
+        return future
+
+    @staticmethod
+    async def _trade(method, symbol: str, quantity: int, price) -> bool:
+        """Waits for a prefetched price, then applies the trade."""
+        return method(symbol, quantity, price=await price)
+
+    async def _submit(self, command, *args):
+        """Queues a command and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((command, args, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        """Applies queued commands one at a time until the queue is empty."""
+        while not self._queue.empty():
+            command, args, future = self._queue.get_nowait()
+            if future.cancelled():
+                continue
+            try:
+                result = command(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+            except asyncio.CancelledError:
+                # Nothing else would resolve these, so their callers would wait forever
+                future.cancel()
+                while not self._queue.empty():
+                    self._queue.get_nowait()[2].cancel()
+                raise
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
@@ -0,0 +1,78 @@
+from async_accounts import AsyncAccount, PriceService
+
+
+# Column headers of the rows returned by transaction_row and AccountView.history
+HISTORY_HEADERS = ["#", "Type", "Symbol", "Quantity", "Price", "Amount"]
+
+
+def transaction_row(number: int, transaction: dict) -> list:
+    """Converts one transaction into a row of the transaction history table.
+
+    Args:
+        number: The transaction's 1-based position in the history.
+        transaction: The transaction dictionary.
+
+    Returns:
+        The row, with columns as in HISTORY_HEADERS.
+    """
+    return [number, transaction["type"], transaction["symbol"], transaction["quantity"],
+            transaction["price"], transaction["amount"]]
+
+
+class AccountView:
+    """Caches the summary and transaction history of one account as structured data.
+
+    The summary is rebuilt only when the account's version or the prices of its holdings
+    have changed. The history rows are extended with just the transactions recorded since
+    the last call, so refreshing a large account costs O(new transactions).
+    """
+
+    def __init__(self, account: AsyncAccount, prices: PriceService) -> None:
+        """Initializes an empty view.
+
+        Args:
+            account: The account to render.
+            prices: The price service used to value holdings.
+        """
+        self.account = account
+        self.prices = prices
+        self._summary_key = None
+        self._summary = None
+        self._history_version = None
+        self._history = []
+
+    async def summary(self) -> dict:
+        """Returns the cash balance, portfolio value, profit/loss and holdings."""
+        account = self.account
+        holdings = account.get_holdings()
+        current_prices = await self.prices.get_many(holdings)
+        key = (account.version, tuple(current_prices.items()))
+        if key == self._summary_key:
+            return self._summary
+
+        portfolio_value = account.balance + sum(current_prices[symbol] * quantity for symbol, quantity in holdings.items())
+        profit_loss = portfolio_value - account.initial_deposit
+        summary = {
+            "cash_balance": account.balance,
+            "portfolio_value": portfolio_value,
+            "profit_loss": profit_loss,
+            "profit_loss_percent": profit_loss / account.initial_deposit * 100,
+            "holdings": [
+                {"symbol": symbol, "quantity": quantity, "price": current_prices[symbol],
+                 "value": current_prices[symbol] * quantity}
+                for symbol, quantity in holdings.items()
+            ],
+        }
+
+        self._summary_key = key
+        self._summary = summary
+        return summary
+
+    def history(self) -> list:
+        """Returns the transaction history as rows with columns as in HISTORY_HEADERS."""
+        if self.account.version != self._history_version:
+            new_transactions = self.account.get_transactions(len(self._history))
+            self._history.extend(transaction_row(number, transaction)
+                                 for number, transaction in enumerate(new_transactions, len(self._history) + 1))
+            self._history_version = self.account.version
+        return self._history
@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+from accounts import Account, get_share_price
+
+RiskCheck = namedtuple("RiskCheck", ["passed", "reason"])
+RiskCheck.__doc__ = "The outcome of a pre-trade check: whether the order passes and, if not, why."
+
+_PASSED = RiskCheck(True, None)
+
+
+class RiskEngine:
+    """Pre-trade risk checks for an account.
+
+    The engine keeps its own running view of buying power, positions and gross exposure,
+    updated from each recorded transaction, so checking an order is O(1) and never touches
+    the account or the price source. Positions are marked at the last price seen for each
+    symbol (the last fill, or a price passed to update_price).
+    """
+
+    def __init__(self, account: Account, max_position: int = None, position_limits: dict = None,
+                 max_exposure: float = None, prices: dict = None) -> None:
+        """Attaches the engine to an account; from then on the account rejects orders that fail its checks.
+
+        Args:
+            account: The account to guard.
+            max_position: The maximum number of shares held in any one symbol.
+            position_limits: Per-symbol share limits, overriding max_position for those symbols.
+            max_exposure: The maximum total market value of all holdings.
+            prices: Prices to mark the account's current holdings at; any symbol missing from
+                it is looked up with get_share_price.
+        """
+        self.max_position = max_position
+        self.position_limits = dict(position_limits or {})
+        self.max_exposure = max_exposure
+        self.buying_power = account.balance
+        self.positions = dict(account.holdings)
+        self.marks = {}
+        prices = prices or {}
+        for symbol in self.positions:
+            self.marks[symbol] = prices[symbol] if symbol in prices else get_share_price(symbol)
+        self.exposure = sum(quantity * self.marks[symbol] for symbol, quantity in self.positions.items())
+        account.risk = self
+
+    def position_limit(self, symbol: str):
+        """Returns the share limit for a symbol, or None if it is unlimited."""
+        return self.position_limits.get(symbol, self.max_position)
+
+    def update_price(self, symbol: str, price: float) -> None:
+        """Re-marks a held symbol at a new price, adjusting exposure.
+
+        Args:
+            symbol: The stock symbol.
+            price: The new share price.
+        """
+        quantity = self.positions.get(symbol, 0)
+        self.exposure += quantity * (price - self.marks.get(symbol, price))
+        self.marks[symbol] = price
+
+    def check_order(self, side: str, symbol: str, quantity: int, price: float) -> RiskCheck:
+        """Checks whether an order would pass, without changing any state.
+
+        Args:
+            side: "BUY" or "SELL".
+            symbol: The stock symbol.
+            quantity: The number of shares.
+            price: The share price the order would trade at.
+
+        Returns:
+            A RiskCheck saying whether the order passes and, if not, why.
+
+        Raises:
+            ValueError: If side is not BUY or SELL, or quantity is not positive.
+        """
+        return self._check(side, symbol, quantity, price, self.buying_power,
+                           self.positions.get(symbol, 0), self.marks.get(symbol, price), self.exposure)
+
+    def what_if(self, orders, cumulative: bool = False) -> list:
+        """Checks many candidate orders at once, without changing any state.
+
+        Args:
+            orders: An iterable of (side, symbol, quantity, price) tuples.
+            cumulative: If False, each order is checked against the current state on its own.
+                If True, the orders are treated as a sequence: every order that passes is
+                applied to a scratch copy of the state before the next one is checked.
+
+        Returns:
+            A list with one RiskCheck per order.
+        """
+        if not cumulative:
+            return [self.check_order(*order) for order in orders]
+
+        buying_power = self.buying_power
+        exposure = self.exposure
+        positions = {}  # Scratch overlay; untouched symbols fall through to self.positions
+        marks = {}
+        results = []
+        for side, symbol, quantity, price in orders:
+            position = positions[symbol] if symbol in positions else self.positions.get(symbol, 0)
+            mark = marks[symbol] if symbol in marks else self.marks.get(symbol, price)
+            result = self._check(side, symbol, quantity, price, buying_power, position, mark, exposure)
+            results.append(result)
+            if result.passed:
+                change = quantity if side == "BUY" else -quantity
+                buying_power -= change * price
+                exposure += (position + change) * price - position * mark
+                positions[symbol] = position + change
+                marks[symbol] = price
+        return results
+
+    def on_transaction(self, transaction: dict) -> None:
+        """Updates the running state from a transaction the account has recorded.
+
+        Args:
+            transaction: The transaction dictionary recorded by the account.
+        """
+        t_type = transaction["type"]
+        amount = transaction["amount"]
+        if t_type == "DEPOSIT":
+            self.buying_power += amount
+        elif t_type == "WITHDRAW":
+            self.buying_power -= amount
+        else:
+            symbol = transaction["symbol"]
+            quantity = transaction["quantity"]
+            change = quantity if t_type == "BUY" else -quantity
+            position = self.positions.get(symbol, 0)
+            price = transaction["price"]
+            self.buying_power -= change * price
+            self.exposure += (position + change) * price - position * self.marks.get(symbol, price)
+            self.marks[symbol] = price
+            if position + change:
+                self.positions[symbol] = position + change
+            else:
+                self.positions.pop(symbol, None)
+
+    def _check(self, side: str, symbol: str, quantity: int, price: float, buying_power: float,
+               position: int, mark: float, exposure: float) -> RiskCheck:
+        """Checks an order against the given state."""
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        if side == "SELL":
+            if quantity > position:
+                return RiskCheck(False, f"Insufficient shares: holding {position} {symbol}, selling {quantity}.")
+            return _PASSED
+        if side != "BUY":
+            raise ValueError(f"Unknown order side: {side}")
+
+        cost = price * quantity
+        if cost > buying_power:
+            return RiskCheck(False, f"Insufficient buying power: order costs ${cost:.2f}, available ${buying_power:.2f}.")
+        limit = self.position_limit(symbol)
+        if limit is not None and position + quantity > limit:
+            return RiskCheck(False, f"Position limit exceeded: {symbol} limit is {limit} shares.")
+        if self.max_exposure is not None:
+            new_exposure = exposure + (position + quantity) * price - position * mark
+            if new_exposure > self.max_exposure:
+                return RiskCheck(False, f"Exposure limit exceeded: ${new_exposure:.2f} > ${self.max_exposure:.2f}.")
+        return _PASSED
@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+
+from accounts import Account
+from async_accounts import AsyncAccount, PriceService
+
+
+class SessionRegistry:
+    """Accounts keyed by browser session, with idle eviction.
+
+    Sessions are kept in least-recently-used order, so evicting idle ones only ever looks
+    at the oldest entries. With a backing AccountStore, every account is written through to
+    it under its session id, and an evicted session's account is reloaded on its next request.
+    """
+
+    def __init__(self, prices: PriceService, idle_timeout: float = 1800.0, store=None) -> None:
+        """Initializes an empty registry.
+
+        Args:
+            prices: The price service shared by every session's account.
+            idle_timeout: The number of seconds after its last request a session is evicted.
+            store: An optional AccountStore to persist accounts in.
+        """
+        self.prices = prices
+        self.idle_timeout = idle_timeout
+        self.store = store
+        self._sessions = OrderedDict()  # session_id -> (account, last_used)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, session_id: str, initial_deposit: float) -> AsyncAccount:
+        """Opens a new account for a session, replacing any it already had.
+
+        With a store, the replaced account is deleted from it along with its transactions.
+
+        Args:
+            session_id: The session identifier.
+            initial_deposit: The amount of initial deposit into the account.
+
+        Returns:
+            The session's account.
+
+        Raises:
+            ValueError: If initial deposit is not positive.
+        """
+        self.evict_idle()
+        if self.store is not None:
+            if initial_deposit <= 0:
+                raise ValueError("Initial deposit must be positive.")
+            # The account is stored under the session id, so the one it replaces must not be reloaded
+            self.store.delete_account(session_id)
+            account = Account(initial_deposit, account_id=session_id, store=self.store)
+        else:
+            account = Account(initial_deposit)
+        session = AsyncAccount(account, self.prices)
+        self._sessions[session_id] = (session, time.monotonic())
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id: str):
+        """Returns a session's account, reloading it from the store if it was evicted.
+
+        Args:
+            session_id: The session identifier.
+
+        Returns:
+            The session's account, or None if the session has not created one.
+        """
+        self.evict_idle()
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            session = entry[0]
+        elif self.store is not None:
+            account = self.store.load_account(session_id)
+            if account is None:
+                return None
+            session = AsyncAccount(account, self.prices)
+        else:
+            return None
+        self._sessions[session_id] = (session, time.monotonic())
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def discard(self, session_id: str) -> None:
+        """Drops a session's account from memory, e.g. when its browser tab closes.
+
+        Args:
+            session_id: The session identifier.
+        """
+        self._sessions.pop(session_id, None)
+        if self.store is not None:
+            self.store.flush()
+
+    def evict_idle(self, now: float = None) -> int:
+        """Drops every session that has been idle for longer than idle_timeout.
+
+        Args:
+            now: The current time.monotonic() value.
+
+        Returns:
+            The number of sessions evicted.
+        """
+        if now is None:
+            now = time.monotonic()
+        evicted = 0
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        if evicted and self.store is not None:
+            self.store.flush()
+        return evicted
@@ -0,0 +1,274 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from accounts import Account
+
+# File layout (all little-endian):
+#   header | symbol table | holdings | padding to 8 bytes | amounts | prices | quantities | symbol ids | types
+# Version 1 files have no prices column; their trade prices are derived from amount and quantity.
+# Columns are stored widest first so each one starts 8-byte aligned and can be cast in place.
+SNAPSHOT_MAGIC = b"ACSN"
+SNAPSHOT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)
+
+_HEADER = struct.Struct("<4sHHQIIdd")  # magic, version, flags, transactions, symbols, holdings, balance, initial deposit
+_SYMBOL_LENGTH = struct.Struct("<H")
+_HOLDING = struct.Struct("<iq")
+
+_TRANSACTION_TYPES = ("DEPOSIT", "WITHDRAW", "BUY", "SELL")
+_TYPE_CODES = {name: code for code, name in enumerate(_TRANSACTION_TYPES)}
+_NO_SYMBOL = -1
+_NO_QUANTITY = -(2 ** 63)
+_NO_PRICE = float("nan")
+
+
+class TransactionLog:
+    """List-like transaction history backed by packed columns.
+
+    Rows are only turned into transaction dictionaries when they are accessed, so restoring a
+    snapshot costs the same regardless of how many transactions it holds. Transactions recorded
+    after the restore are kept in an ordinary list behind the packed rows.
+    """
+
+    def __init__(self, types, symbol_ids, quantities, amounts, symbols: list, buffer=None, prices=None) -> None:
+        """Initializes the log over existing columns.
+
+        Args:
+            types: Transaction type codes, one byte per row.
+            symbol_ids: Indexes into symbols, or -1 when the row has no symbol.
+            quantities: Share quantities, or the minimum int64 value when the row has no quantity.
+            amounts: The amount of money involved in each row.
+            symbols: The symbol table referenced by symbol_ids.
+            buffer: The mapped file backing the columns, if any; closed by close().
+            prices: Trade prices, or NaN when the row has no price; None to derive them
+                from amounts and quantities.
+        """
+        self._types = types
+        self._symbol_ids = symbol_ids
+        self._quantities = quantities
+        self._amounts = amounts
+        self._prices = prices
+        self._symbols = symbols
+        self._buffer = buffer
+        self._tail = []
+
+    def __len__(self) -> int:
+        return len(self._types) + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("transaction index out of range")
+        packed = len(self._types)
+        if index >= packed:
+            return self._tail[index - packed]
+        return self._row(index)
+
+    def __iter__(self):
+        for index in range(len(self._types)):
+            yield self._row(index)
+        yield from self._tail
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, TransactionLog)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def _row(self, index: int) -> dict:
+        symbol_id = self._symbol_ids[index]
+        quantity = self._quantities[index]
+        amount = self._amounts[index]
+        if quantity == _NO_QUANTITY:
+            quantity = price = None
+        elif self._prices is None:
+            price = amount / quantity
+        else:
+            price = self._prices[index]
+        return {
+            "type": _TRANSACTION_TYPES[self._types[index]],
+            "symbol": None if symbol_id == _NO_SYMBOL else self._symbols[symbol_id],
+            "quantity": quantity,
+            "amount": amount,
+            "price": price,
+        }
+
+    def append(self, transaction: dict) -> None:
+        """Adds a transaction after the packed rows.
+
+        Args:
+            transaction: The transaction dictionary to add.
+        """
+        self._tail.append(transaction)
+
+    def copy(self) -> list:
+        """Returns every transaction as a plain list of dictionaries."""
+        return list(self)
+
+    def close(self) -> None:
+        """Releases the packed columns and the mapped file backing them, if any."""
+        for column in (self._types, self._symbol_ids, self._quantities, self._amounts, self._prices):
+            if isinstance(column, memoryview):
+                column.release()
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+
+def save_snapshot(account: Account, path: str) -> None:
+    """Writes the account's balance, holdings and transaction log to a binary snapshot file.
+
+    The file is written next to the destination and moved into place, so a crash never
+    leaves a truncated snapshot behind.
+
+    Args:
+        account: The account to snapshot.
+        path: The destination file.
+
+    Raises:
+        ValueError: If the transaction log contains an unknown transaction type.
+    """
+    symbols = []
+    symbol_ids = {}
+    types = array("B")
+    ids = array("i")
+    quantities = array("q")
+    amounts = array("d")
+    prices = array("d")
+
+    transactions = account.transactions
+    pending = transactions
+    if isinstance(transactions, TransactionLog):
+        # Packed rows can be copied column by column; only the tail needs converting.
+        symbols.extend(transactions._symbols)
+        symbol_ids.update((symbol, i) for i, symbol in enumerate(symbols))
+        types.frombytes(memoryview(transactions._types).cast("B"))
+        ids.frombytes(memoryview(transactions._symbol_ids).cast("B"))
+        quantities.frombytes(memoryview(transactions._quantities).cast("B"))
+        amounts.frombytes(memoryview(transactions._amounts).cast("B"))
+        if transactions._prices is not None:
+            prices.frombytes(memoryview(transactions._prices).cast("B"))
+        else:
+            prices.extend(_NO_PRICE if quantity == _NO_QUANTITY else amount / quantity
+                          for amount, quantity in zip(transactions._amounts, transactions._quantities))
+        pending = transactions._tail
+
+    for transaction in pending:
+        code = _TYPE_CODES.get(transaction["type"])
+        if code is None:
+            raise ValueError(f"Unknown transaction type: {transaction['type']}")
+        symbol = transaction["symbol"]
+        if symbol is None:
+            symbol_id = _NO_SYMBOL
+        elif symbol in symbol_ids:
+            symbol_id = symbol_ids[symbol]
+        else:
+            symbol_id = symbol_ids[symbol] = len(symbols)
+            symbols.append(symbol)
+        quantity = transaction["quantity"]
+        types.append(code)
+        ids.append(symbol_id)
+        quantities.append(_NO_QUANTITY if quantity is None else quantity)
+        amounts.append(transaction["amount"])
+        price = transaction["price"]
+        prices.append(_NO_PRICE if price is None else price)
+
+    holdings = []
+    for symbol, quantity in account.holdings.items():
+        if symbol not in symbol_ids:
+            symbol_ids[symbol] = len(symbols)
+            symbols.append(symbol)
+        holdings.append((symbol_ids[symbol], quantity))
+
+    if sys.byteorder != "little":
+        for column in (ids, quantities, amounts, prices):
+            column.byteswap()
+
+    parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(types), len(symbols), len(holdings),
+                          account.balance, account.initial_deposit)]
+    for symbol in symbols:
+        encoded = symbol.encode("utf-8")
+        parts.append(_SYMBOL_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    parts.extend(_HOLDING.pack(symbol_id, quantity) for symbol_id, quantity in holdings)
+    header = b"".join(parts)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(b"\0" * (-len(header) % 8))
+        for column in (amounts, prices, quantities, ids, types):
+            column.tofile(f)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path: str, use_mmap: bool = False) -> Account:
+    """Restores an account from a binary snapshot file.
+
+    Only the header, symbol table and holdings are parsed; the transaction columns are
+    wrapped in a TransactionLog without building per-row objects.
+
+    Args:
+        path: The snapshot file.
+        use_mmap: Map the file into memory instead of reading it, so transaction rows are
+            paged in from disk only when accessed.
+
+    Returns:
+        The restored account.
+
+    Raises:
+        ValueError: If the file is not a snapshot or was written by an unsupported version.
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise ValueError("Not an account snapshot.")
+    magic, version, _flags, count, symbol_count, holding_count, balance, initial_deposit = _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not an account snapshot.")
+    if version not in _READABLE_VERSIONS:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+
+    offset = _HEADER.size
+    symbols = []
+    for _ in range(symbol_count):
+        (length,) = _SYMBOL_LENGTH.unpack_from(view, offset)
+        offset += _SYMBOL_LENGTH.size
+        symbols.append(bytes(view[offset:offset + length]).decode("utf-8"))
+        offset += length
+
+    holdings = {}
+    for _ in range(holding_count):
+        symbol_id, quantity = _HOLDING.unpack_from(view, offset)
+        holdings[symbols[symbol_id]] = quantity
+        offset += _HOLDING.size
+    offset += -offset % 8
+
+    layout = [("d", 8), ("d", 8), ("q", 8), ("i", 4), ("B", 1)]
+    if version == 1:
+        del layout[1]
+    columns = []
+    for typecode, width in layout:
+        column = view[offset:offset + count * width].cast(typecode)
+        if sys.byteorder != "little" and width > 1:
+            column = array(typecode, column.tobytes())
+            column.byteswap()
+        columns.append(column)
+        offset += count * width
+    prices = columns.pop(1) if version > 1 else None
+    amounts, quantities, symbol_ids, types = columns
+
+    transactions = TransactionLog(types, symbol_ids, quantities, amounts, symbols,
+                                  buffer if use_mmap else None, prices)
+    return Account.from_state(balance, initial_deposit, holdings, transactions)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from accounts import Account
+from account_store import AccountStore
+
+
+class TestAccountStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "accounts.db")
+        self.store = AccountStore(self.path, batch_size=3)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_requires_account_id(self):
+        with self.assertRaises(ValueError):
+            Account(1000.0, store=self.store)
+
+    def test_wal_mode_and_indexes(self):
+        mode = self.store._connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+        indexes = {row[1] for row in self.store._connection.execute("PRAGMA index_list(transactions)")}
+        self.assertIn("idx_transactions_account_timestamp", indexes)
+        self.assertIn("idx_transactions_account_symbol", indexes)
+
+    def test_writes_are_batched(self):
+        account = Account(10000.0, account_id="alice", store=self.store)
+        account.deposit(500.0)
+        count = self.store._connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        self.assertEqual(count, 0)  # Still pending
+        account.withdraw(200.0)
+        count = self.store._connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        self.assertEqual(count, 3)  # Batch of 3 committed together
+
+    def test_stored_account_behaves_like_in_memory(self):
+        stored = Account(10000.0, account_id="alice", store=self.store)
+        plain = Account(10000.0)
+        for account in (stored, plain):
+            account.deposit(500.0)
+            account.buy_shares("AAPL", 10)
+            account.sell_shares("AAPL", 4)
+        self.assertEqual(stored.balance, plain.balance)
+        self.assertEqual(len(stored.transactions), 4)
+        self.assertEqual(stored.transactions[-1], plain.transactions[-1])
+        self.assertEqual(stored.get_transactions(), plain.get_transactions())
+        self.assertEqual(stored.get_transactions(2), plain.get_transactions(2))
+        self.assertEqual(self.store.load_account("alice").get_transactions(), plain.get_transactions())
+
+    def test_load_account_from_another_store(self):
+        account = Account(10000.0, account_id="alice", store=self.store)
+        account.buy_shares("TSLA", 2)
+        self.store.flush()
+
+        with AccountStore(self.path) as other:
+            loaded = other.load_account("alice")
+            self.assertEqual(loaded.balance, account.balance)
+            self.assertEqual(loaded.initial_deposit, 10000.0)
+            self.assertEqual(loaded.get_holdings(), {"TSLA": 2})
+            self.assertEqual(len(loaded.get_transactions()), 2)
+            self.assertIsNone(other.load_account("bob"))
+
+    def test_committed_state_matches_committed_transactions(self):
+        self.store.close()
+        self.store = AccountStore(self.path, batch_size=1)
+        Account(1000.0, account_id="alice", store=self.store).buy_shares("AAPL", 2)
+
+        with AccountStore(self.path) as other:
+            rows = other._connection.execute("SELECT type FROM transactions ORDER BY id").fetchall()
+            self.assertEqual([row[0] for row in rows], ["DEPOSIT", "BUY"])
+            loaded = other.load_account("alice")
+            self.assertEqual(loaded.balance, 700.0)
+            self.assertEqual(loaded.get_holdings(), {"AAPL": 2})
+
+    def test_old_pending_writes_are_committed(self):
+        self.store.close()
+        self.store = AccountStore(self.path, batch_size=100, max_delay=0.05)
+        account = Account(1000.0, account_id="alice", store=self.store)
+        time.sleep(0.1)
+        account.deposit(10.0)
+        count = sqlite3.connect(self.path).execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_holdings_at_point_in_time(self):
+        account = Account(10000.0, account_id="alice", store=self.store)
+        account.buy_shares("AAPL", 10)
+        self.store.flush()
+        checkpoint = time.time()
+        time.sleep(0.01)
+        account.sell_shares("AAPL", 10)
+        account.buy_shares("TSLA", 1)
+        self.assertEqual(self.store.get_holdings_at("alice", checkpoint), {"AAPL": 10})
+        self.assertEqual(self.store.get_holdings_at("alice", time.time()), {"TSLA": 1})
+        self.assertEqual(len(self.store.get_transactions("alice", start=checkpoint)), 2)
+
+    def test_symbol_history_is_per_account(self):
+        alice = Account(10000.0, account_id="alice", store=self.store)
+        bob = Account(10000.0, account_id="bob", store=self.store)
+        alice.buy_shares("AAPL", 1)
+        bob.buy_shares("AAPL", 2)
+        alice.buy_shares("TSLA", 1)
+        alice.sell_shares("AAPL", 1)
+        history = self.store.get_symbol_history("alice", "AAPL")
+        self.assertEqual([t["type"] for t in history], ["BUY", "SELL"])
+        self.assertEqual([t["price"] for t in history], [150.0, 150.0])
+
+    def test_price_column_is_added_to_old_databases(self):
+        self.store.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executescript(
+            "CREATE TABLE transactions (id INTEGER PRIMARY KEY, account_id TEXT NOT NULL, timestamp REAL NOT NULL, "
+            "type TEXT NOT NULL, symbol TEXT, quantity INTEGER, amount REAL NOT NULL);"
+            "INSERT INTO transactions (account_id, timestamp, type, symbol, quantity, amount) "
+            "VALUES ('alice', 1.0, 'DEPOSIT', NULL, NULL, 1000.0), ('alice', 2.0, 'BUY', 'AAPL', 4, 600.0);"
+        )
+        connection.commit()
+        connection.close()
+
+        self.store = AccountStore(self.path)
+        prices = [t["price"] for t in self.store.get_transactions("alice")]
+        self.assertEqual(prices, [None, 150.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
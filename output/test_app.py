@@ -0,0 +1,168 @@
+import importlib
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import app
+from async_accounts import PriceService
+from sessions import SessionRegistry
+
+TRADE_HANDLERS = ("create_account", "deposit_funds", "withdraw_funds", "buy_shares", "sell_shares")
+SETTINGS = ("APP_TRADE_CONCURRENCY", "APP_READ_CONCURRENCY", "APP_QUEUE_SIZE")
+
+
+class TestConcurrency(unittest.TestCase):
+    def tearDown(self):
+        importlib.reload(app)
+
+    def load(self, **settings):
+        """Rebuilds the app with only the given concurrency settings in the environment."""
+        environment = {key: value for key, value in os.environ.items() if key not in SETTINGS}
+        with patch.dict(os.environ, {**environment, **settings}, clear=True):
+            return importlib.reload(app)
+
+    def events(self, module):
+        return {fn.name: fn for fn in module.demo.fns.values()}
+
+    def test_trades_and_reads_have_their_own_groups(self):
+        module = self.load()
+        events = self.events(module)
+        for name in TRADE_HANDLERS:
+            self.assertEqual((events[name].concurrency_id, events[name].concurrency_limit), ("trading", 32), name)
+        live = events["refresh_live"]
+        self.assertEqual((live.concurrency_id, live.concurrency_limit, live.trigger_mode), ("read", None, "once"))
+        self.assertIsNone(module.demo._queue.max_size)
+
+    def test_limits_from_the_environment(self):
+        module = self.load(APP_TRADE_CONCURRENCY="4", APP_READ_CONCURRENCY="8", APP_QUEUE_SIZE="100")
+        events = self.events(module)
+        self.assertEqual({events[name].concurrency_limit for name in TRADE_HANDLERS}, {4})
+        self.assertEqual(events["refresh_live"].concurrency_limit, 8)
+        self.assertEqual(module.demo._queue.max_size, 100)
+
+
+class AppTestCase(unittest.IsolatedAsyncioTestCase):
+    """Calls the app's handlers directly, with fresh sessions and prices that tests can move."""
+
+    def setUp(self):
+        self.quotes = {"AAPL": 150.0, "TSLA": 700.0, "GOOGL": 2800.0}
+        prices = PriceService(lambda symbol: self.quotes.get(symbol, 0.0), ttl=0)
+        for name, value in (("prices", prices), ("sessions", SessionRegistry(prices)), ("_price_rows", (None, None))):
+            patcher = patch.object(app, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.request = SimpleNamespace(session_hash="alice")
+
+
+class TestHandlers(AppTestCase):
+    async def test_create_account(self):
+        self.assertEqual(await app.create_account("1000", self.request),
+                         {"action": "create_account", "initial_deposit": 1000.0, "balance": 1000.0})
+        self.assertIn("error", await app.create_account("lots", self.request))
+        self.assertEqual(await app.create_account("-5", self.request), {"error": "Initial deposit must be positive."})
+
+    async def test_handlers_need_an_account(self):
+        for response in (await app.deposit_funds("10", self.request), await app.buy_shares("AAPL", "1", self.request),
+                         await app.get_account_summary(self.request)):
+            self.assertEqual(response, {"error": "Please create an account first."})
+        self.assertEqual(app.get_transaction_history(self.request), [])
+
+    async def test_cash(self):
+        await app.create_account("1000", self.request)
+        self.assertEqual(await app.deposit_funds("250", self.request),
+                         {"action": "deposit", "amount": 250.0, "balance": 1250.0})
+        self.assertEqual(await app.withdraw_funds("50", self.request),
+                         {"action": "withdraw", "amount": 50.0, "balance": 1200.0})
+        self.assertEqual(await app.withdraw_funds("5000", self.request),
+                         {"error": "Insufficient funds.", "amount": 5000.0, "balance": 1200.0})
+
+    async def test_trades(self):
+        await app.create_account("1000", self.request)
+        self.assertEqual(await app.buy_shares("aapl", "2", self.request),
+                         {"action": "buy", "symbol": "AAPL", "quantity": 2, "price": 150.0, "total": 300.0,
+                          "balance": 700.0})
+        self.assertEqual(await app.buy_shares("TSLA", "2", self.request),
+                         {"error": "Insufficient funds.", "symbol": "TSLA", "quantity": 2, "price": 700.0,
+                          "total": 1400.0, "balance": 700.0})
+        self.assertEqual(await app.sell_shares("AAPL", "3", self.request),
+                         {"error": "Insufficient shares.", "symbol": "AAPL", "quantity": 3, "price": 150.0,
+                          "total": 450.0, "held": 2})
+        self.assertEqual(await app.buy_shares("XYZ", "1", self.request),
+                         {"error": "Invalid stock symbol 'XYZ'.", "available": app.STOCKS})
+        self.quotes["AAPL"] = 200.0
+        self.assertEqual((await app.sell_shares("AAPL", "1", self.request))["balance"], 900.0)
+
+    async def test_summary_and_history(self):
+        await app.create_account("1000", self.request)
+        await app.buy_shares("AAPL", "2", self.request)
+        summary = await app.get_account_summary(self.request)
+        self.assertEqual(summary["cash_balance"], 700.0)
+        self.assertEqual(summary["holdings"], [{"symbol": "AAPL", "quantity": 2, "price": 150.0, "value": 300.0}])
+        self.assertEqual(app.get_transaction_history(self.request),
+                         [[1, "DEPOSIT", None, None, None, 1000.0], [2, "BUY", "AAPL", 2, 150.0, 300.0]])
+
+    async def test_price_rows_are_reused_until_a_price_changes(self):
+        rows = await app.get_current_prices()
+        self.assertEqual(rows, [["AAPL", 150.0], ["TSLA", 700.0], ["GOOGL", 2800.0]])
+        self.assertIs(await app.get_current_prices(), rows)
+        self.quotes["TSLA"] = 710.0
+        self.assertEqual((await app.get_current_prices())[1], ["TSLA", 710.0])
+
+    async def test_sessions_are_separate(self):
+        bob = SimpleNamespace(session_hash="bob")
+        await app.create_account("1000", self.request)
+        await app.create_account("500", bob)
+        await app.deposit_funds("1", bob)
+        self.assertEqual((await app.get_account_summary(self.request))["cash_balance"], 1000.0)
+        self.assertEqual((await app.get_account_summary(bob))["cash_balance"], 501.0)
+
+
+class TestLiveRefresh(AppTestCase):
+    async def tick(self, last_seen):
+        *pushed, seen = await app.refresh_live(last_seen, self.request)
+        return pushed, seen
+
+    async def test_only_changes_are_pushed(self):
+        skip = app.gr.skip()
+        pushed, seen = await self.tick(None)
+        self.assertEqual(pushed, [skip, skip, [["AAPL", 150.0], ["TSLA", 700.0], ["GOOGL", 2800.0]]])
+        self.assertEqual(await self.tick(seen), ([skip, skip, skip], seen))
+
+        await app.create_account("1000", self.request)
+        (summary, history, _), seen = await self.tick(seen)
+        self.assertEqual(summary["cash_balance"], 1000.0)
+        self.assertEqual(history, [[1, "DEPOSIT", None, None, None, 1000.0]])
+        self.assertEqual(await self.tick(seen), ([skip, skip, skip], seen))
+
+        await app.buy_shares("AAPL", "2", self.request)
+        (summary, history, _), seen = await self.tick(seen)
+        self.assertEqual(summary["cash_balance"], 700.0)
+        self.assertEqual(len(history), 2)
+
+    async def test_price_moves_are_pushed(self):
+        await app.create_account("1000", self.request)
+        await app.buy_shares("AAPL", "2", self.request)
+        _, seen = await self.tick(None)
+        self.quotes["AAPL"] = 160.0
+        (summary, _, prices), seen = await self.tick(seen)
+        self.assertEqual(summary["portfolio_value"], 1020.0)
+        self.assertEqual(prices[0], ["AAPL", 160.0])
+        self.assertEqual((await self.tick(seen))[0], [app.gr.skip()] * 3)
+
+    async def test_new_account_is_pushed_even_at_the_same_version(self):
+        await app.create_account("1000", self.request)
+        _, seen = await self.tick(None)
+        await app.create_account("500", self.request)
+        (summary, _, _), _ = await self.tick(seen)
+        self.assertEqual(summary["cash_balance"], 500.0)
+
+    async def test_end_session(self):
+        await app.create_account("1000", self.request)
+        app.end_session(self.request)
+        self.assertEqual(len(app.sessions), 0)
+        self.assertEqual(await app.get_account_summary(self.request), {"error": "Please create an account first."})
+
+
+if __name__ == "__main__":
+    unittest.main()
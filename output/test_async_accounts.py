@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from accounts import Account
+from async_accounts import AsyncAccount, PriceService
+
+
+class SlowPrices:
+    """Async price source with injected latency that counts its lookups."""
+
+    def __init__(self, prices, delay=0.01):
+        self.prices = prices
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, symbol):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.prices.get(symbol, 0.0)
+
+
+class TestPriceService(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_lookups_are_coalesced(self):
+        source = SlowPrices({"AAPL": 150.0})
+        prices = PriceService(source.__call__)
+        results = await asyncio.gather(*(prices.get("AAPL") for _ in range(100)))
+        self.assertEqual(results, [150.0] * 100)
+        self.assertEqual(source.calls, 1)
+
+    async def test_prices_are_cached_for_ttl(self):
+        source = SlowPrices({"AAPL": 150.0}, delay=0)
+        prices = PriceService(source.__call__, ttl=0)
+        await prices.get("AAPL")
+        await prices.get("AAPL")
+        self.assertEqual(source.calls, 2)
+
+    async def test_version_changes_only_when_a_price_moves(self):
+        quotes = {"AAPL": 150.0}
+        prices = PriceService(lambda symbol: quotes[symbol], ttl=0)
+        await prices.get("AAPL")
+        version = prices.version
+        await prices.get("AAPL")
+        self.assertEqual(prices.version, version)
+        quotes["AAPL"] = 155.0
+        await prices.get("AAPL")
+        self.assertEqual(prices.version, version + 1)
+
+    async def test_get_many(self):
+        prices = PriceService()
+        self.assertEqual(await prices.get_many(["AAPL", "TSLA"]), {"AAPL": 150.0, "TSLA": 700.0})
+
+    async def test_blocking_source_runs_in_thread(self):
+        prices = PriceService(lambda symbol: 42.0, blocking=True)
+        self.assertEqual(await prices.get("XYZ"), 42.0)
+
+
+class TestAsyncAccount(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.source = SlowPrices({"AAPL": 150.0, "TSLA": 700.0})
+        self.prices = PriceService(self.source.__call__)
+        self.account = AsyncAccount(Account(1000.0), self.prices)
+
+    async def test_trades_use_service_prices(self):
+        self.assertTrue(await self.account.buy("AAPL", 2))
+        self.assertEqual(self.account.balance, 700.0)
+        self.assertTrue(await self.account.sell("AAPL", 1))
+        self.assertEqual(self.account.get_holdings(), {"AAPL": 1})
+        self.assertEqual(await self.account.get_portfolio_value(), 1000.0)
+        self.assertEqual(await self.account.get_profit_or_loss(), 0.0)
+
+    async def test_commands_apply_in_submission_order(self):
+        # The buy waits on a slow price, but the withdraw submitted after it must not jump ahead
+        buy = asyncio.ensure_future(self.account.buy("TSLA", 1))
+        await asyncio.sleep(0)
+        withdraw = asyncio.ensure_future(self.account.withdraw(500.0))
+        self.assertEqual(await asyncio.gather(buy, withdraw), [True, False])
+        self.assertEqual(self.account.balance, 300.0)
+        types = [t["type"] for t in self.account.get_transactions()]
+        self.assertEqual(types, ["DEPOSIT", "BUY"])
+
+    async def test_errors_are_raised_to_the_caller(self):
+        with self.assertRaises(ValueError):
+            await self.account.deposit(-5.0)
+        await self.account.deposit(5.0)
+        self.assertEqual(self.account.balance, 1005.0)
+
+    async def test_cancelled_worker_resolves_pending_commands(self):
+        blocker = asyncio.Event()
+
+        async def blocked():
+            await blocker.wait()
+
+        running = asyncio.ensure_future(self.account._submit(blocked))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(self.account.deposit(5.0))
+        await asyncio.sleep(0)
+        self.account._worker.cancel()
+        for pending in (running, queued):
+            with self.assertRaises(asyncio.CancelledError):
+                await asyncio.wait_for(pending, timeout=1.0)
+        self.assertEqual(self.account.balance, 1000.0)
+        # A new command starts a fresh worker
+        await self.account.deposit(5.0)
+        self.assertEqual(self.account.balance, 1005.0)
+
+    async def test_accounts_trade_concurrently(self):
+        accounts = [AsyncAccount(Account(1000.0), self.prices) for _ in range(50)]
+        results = await asyncio.gather(*(a.buy("AAPL", 1) for a in accounts))
+        self.assertTrue(all(results))
+        self.assertEqual(self.source.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
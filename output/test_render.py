@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+from accounts import Account
+from async_accounts import AsyncAccount, PriceService
+from render import HISTORY_HEADERS, AccountView, transaction_row
+
+
+class TestTransactionRow(unittest.TestCase):
+    def test_cash_and_trades(self):
+        deposit = {"type": "DEPOSIT", "symbol": None, "quantity": None, "amount": 100.0, "price": None}
+        self.assertEqual(transaction_row(1, deposit), [1, "DEPOSIT", None, None, None, 100.0])
+        buy = {"type": "BUY", "symbol": "AAPL", "quantity": 2, "amount": 300.0, "price": 150.0}
+        self.assertEqual(transaction_row(2, buy), [2, "BUY", "AAPL", 2, 150.0, 300.0])
+        self.assertEqual(len(transaction_row(2, buy)), len(HISTORY_HEADERS))
+
+
+class TestAccountView(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.quotes = {"AAPL": 150.0}
+        self.prices = PriceService(lambda symbol: self.quotes.get(symbol, 0.0), ttl=0)
+        self.account = AsyncAccount(Account(1000.0), self.prices)
+        self.view = AccountView(self.account, self.prices)
+
+    async def test_summary(self):
+        await self.account.buy("AAPL", 2)
+        summary = await self.view.summary()
+        self.assertEqual(summary["cash_balance"], 700.0)
+        self.assertEqual(summary["portfolio_value"], 1000.0)
+        self.assertEqual(summary["profit_loss"], 0.0)
+        self.assertEqual(summary["holdings"], [{"symbol": "AAPL", "quantity": 2, "price": 150.0, "value": 300.0}])
+
+    async def test_summary_is_cached_until_account_or_prices_change(self):
+        first = await self.view.summary()
+        self.assertIs(await self.view.summary(), first)
+
+        await self.account.deposit(10.0)
+        second = await self.view.summary()
+        self.assertIsNot(second, first)
+        self.assertEqual(second["cash_balance"], 1010.0)
+
+        await self.account.buy("AAPL", 1)
+        third = await self.view.summary()
+        self.quotes["AAPL"] = 200.0
+        fourth = await self.view.summary()
+        self.assertIsNot(fourth, third)
+        self.assertEqual(fourth["holdings"][0]["price"], 200.0)
+
+    async def test_history_appends_only_new_transactions(self):
+        await self.account.deposit(50.0)
+        history = self.view.history()
+        self.assertEqual(history, [[1, "DEPOSIT", None, None, None, 1000.0], [2, "DEPOSIT", None, None, None, 50.0]])
+
+        await self.account.buy("AAPL", 1)
+        with patch("render.transaction_row", wraps=transaction_row) as converter:
+            history = self.view.history()
+        self.assertEqual(converter.call_count, 1)
+        self.assertEqual(history[-1], [3, "BUY", "AAPL", 1, 150.0, 150.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from accounts import Account
+from risk import RiskCheck, RiskEngine
+
+
+class TestRiskEngine(unittest.TestCase):
+    def setUp(self):
+        self.account = Account(10000.0)
+        self.account.buy_shares("AAPL", 10)  # 1500 at 150
+        self.risk = RiskEngine(self.account, max_position=20, position_limits={"TSLA": 3}, max_exposure=5000.0)
+
+    def test_initial_state_from_account(self):
+        self.assertIs(self.account.risk, self.risk)
+        self.assertEqual(self.risk.buying_power, 8500.0)
+        self.assertEqual(self.risk.positions, {"AAPL": 10})
+        self.assertEqual(self.risk.exposure, 1500.0)
+
+    def test_check_order(self):
+        self.assertEqual(self.risk.check_order("BUY", "AAPL", 5, 150.0), RiskCheck(True, None))
+        self.assertFalse(self.risk.check_order("BUY", "AAPL", 11, 150.0).passed)  # Position limit
+        self.assertFalse(self.risk.check_order("BUY", "TSLA", 4, 700.0).passed)  # Per-symbol limit
+        self.assertFalse(self.risk.check_order("BUY", "GOOGL", 2, 2800.0).passed)  # Exposure limit
+        self.assertFalse(self.risk.check_order("BUY", "GOOGL", 4, 2800.0).passed)  # Buying power
+        self.assertTrue(self.risk.check_order("SELL", "AAPL", 10, 150.0).passed)
+        self.assertFalse(self.risk.check_order("SELL", "AAPL", 11, 150.0).passed)
+        with self.assertRaises(ValueError):
+            self.risk.check_order("HOLD", "AAPL", 1, 150.0)
+
+    def test_check_order_has_no_side_effects(self):
+        self.risk.check_order("BUY", "AAPL", 5, 150.0)
+        self.assertEqual(self.risk.buying_power, 8500.0)
+        self.assertEqual(self.risk.positions, {"AAPL": 10})
+
+    def test_account_rejects_orders_failing_checks(self):
+        self.assertFalse(self.account.buy_shares("TSLA", 4))
+        self.assertEqual(self.account.holdings, {"AAPL": 10})
+        self.assertTrue(self.account.buy_shares("TSLA", 3))
+        self.assertEqual(self.risk.positions, {"AAPL": 10, "TSLA": 3})
+        self.assertEqual(self.risk.exposure, 3600.0)
+
+    def test_engine_is_the_only_pre_trade_check(self):
+        checked = []
+        check_order = self.risk.check_order
+        self.risk.check_order = lambda *order: checked.append(check_order(*order)) or checked[-1]
+        self.assertFalse(self.account.buy_shares("GOOGL", 4))
+        self.assertFalse(self.account.sell_shares("TSLA", 1))
+        self.assertEqual([result.reason.split(":")[0] for result in checked],
+                         ["Insufficient buying power", "Insufficient shares"])
+
+    def test_state_tracks_transactions(self):
+        self.account.deposit(500.0)
+        self.account.sell_shares("AAPL", 10)
+        self.assertEqual(self.risk.buying_power, self.account.balance)
+        self.assertEqual(self.risk.positions, {})
+        self.assertEqual(self.risk.exposure, 0.0)
+
+    def test_update_price_remarks_exposure(self):
+        self.risk.update_price("AAPL", 400.0)
+        self.assertEqual(self.risk.exposure, 4000.0)
+        self.assertFalse(self.risk.check_order("BUY", "AAPL", 3, 400.0).passed)
+
+    def test_what_if(self):
+        orders = [("BUY", "AAPL", 10, 150.0), ("BUY", "AAPL", 10, 150.0), ("SELL", "AAPL", 15, 150.0)]
+        independent = self.risk.what_if(orders)
+        self.assertEqual([r.passed for r in independent], [True, True, False])
+        cumulative = self.risk.what_if(orders, cumulative=True)
+        self.assertEqual([r.passed for r in cumulative], [True, False, True])
+        self.assertEqual(self.risk.positions, {"AAPL": 10})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from account_store import AccountStore
+from async_accounts import PriceService
+from sessions import SessionRegistry
+
+
+class TestSessionRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sessions = SessionRegistry(PriceService(), idle_timeout=60.0)
+
+    async def test_sessions_have_separate_accounts(self):
+        alice = self.sessions.create("alice", 1000.0)
+        bob = self.sessions.create("bob", 500.0)
+        await alice.buy("AAPL", 2)
+        self.assertEqual(self.sessions.get("alice").balance, 700.0)
+        self.assertEqual(self.sessions.get("bob").balance, 500.0)
+        self.assertIs(self.sessions.get("bob"), bob)
+        self.assertIsNone(self.sessions.get("carol"))
+
+    def test_invalid_deposit(self):
+        with self.assertRaises(ValueError):
+            self.sessions.create("alice", 0.0)
+        self.assertEqual(len(self.sessions), 0)
+
+    def test_idle_sessions_are_evicted(self):
+        self.sessions.create("alice", 1000.0)
+        self.sessions.create("bob", 1000.0)
+        _, alice_used = self.sessions._sessions["alice"]
+        self.assertEqual(self.sessions.evict_idle(alice_used + 30.0), 0)
+        self.assertEqual(self.sessions.evict_idle(alice_used + 3600.0), 2)
+        self.assertEqual(len(self.sessions), 0)
+
+    def test_discard(self):
+        self.sessions.create("alice", 1000.0)
+        self.sessions.discard("alice")
+        self.sessions.discard("alice")
+        self.assertIsNone(self.sessions.get("alice"))
+
+
+class TestSessionRegistryWithStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = AccountStore(os.path.join(self.tmpdir.name, "accounts.db"))
+        self.sessions = SessionRegistry(PriceService(), idle_timeout=60.0, store=self.store)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    async def test_evicted_session_is_reloaded(self):
+        account = self.sessions.create("alice", 1000.0)
+        await account.buy("AAPL", 2)
+        self.sessions.discard("alice")
+        self.assertEqual(len(self.sessions), 0)
+
+        reloaded = self.sessions.get("alice")
+        self.assertIsNot(reloaded, account)
+        self.assertEqual(reloaded.balance, 700.0)
+        self.assertEqual(reloaded.get_holdings(), {"AAPL": 2})
+        self.assertEqual(len(reloaded.get_transactions()), 2)
+        self.assertIsNone(self.sessions.get("bob"))
+
+    async def test_new_account_replaces_the_stored_one(self):
+        old = self.sessions.create("alice", 1000.0)
+        await old.buy("AAPL", 2)
+        self.sessions.create("alice", 500.0)
+        self.sessions.discard("alice")
+
+        reloaded = self.sessions.get("alice")
+        self.assertEqual(reloaded.balance, 500.0)
+        self.assertEqual(reloaded.get_holdings(), {})
+        self.assertEqual([t["type"] for t in reloaded.get_transactions()], ["DEPOSIT"])
+
+    def test_invalid_deposit_keeps_the_stored_account(self):
+        self.sessions.create("alice", 1000.0)
+        with self.assertRaises(ValueError):
+            self.sessions.create("alice", 0.0)
+        self.sessions.discard("alice")
+        self.assertEqual(self.sessions.get("alice").balance, 1000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from accounts import Account
+from snapshot import TransactionLog, load_snapshot, save_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "account.snap")
+        self.account = Account(10000.0)
+        self.account.deposit(500.0)
+        self.account.withdraw(200.0)
+        self.account.buy_shares("AAPL", 10)
+        self.account.buy_shares("TSLA", 2)
+        self.account.sell_shares("AAPL", 4)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameAccount(self, restored, original):
+        self.assertEqual(restored.balance, original.balance)
+        self.assertEqual(restored.initial_deposit, original.initial_deposit)
+        self.assertEqual(restored.get_holdings(), original.get_holdings())
+        self.assertEqual(restored.get_transactions(), original.get_transactions())
+
+    def test_round_trip(self):
+        save_snapshot(self.account, self.path)
+        restored = load_snapshot(self.path)
+        self.assertIsInstance(restored.transactions, TransactionLog)
+        self.assertSameAccount(restored, self.account)
+
+    def test_round_trip_with_mmap(self):
+        save_snapshot(self.account, self.path)
+        restored = load_snapshot(self.path, use_mmap=True)
+        self.assertSameAccount(restored, self.account)
+        restored.transactions.close()
+
+    def test_indexing_restored_transactions(self):
+        save_snapshot(self.account, self.path)
+        transactions = load_snapshot(self.path).transactions
+        self.assertEqual(len(transactions), 6)
+        self.assertEqual(transactions[0], {"type": "DEPOSIT", "symbol": None, "quantity": None,
+                                           "amount": 10000.0, "price": None})
+        self.assertEqual(transactions[-1]["type"], "SELL")
+        self.assertEqual(transactions[-1]["quantity"], 4)
+        self.assertEqual(transactions[-1]["price"], 150.0)
+        self.assertEqual(transactions[3:5], self.account.transactions[3:5])
+        with self.assertRaises(IndexError):
+            transactions[6]
+
+    def test_restored_account_keeps_trading(self):
+        save_snapshot(self.account, self.path)
+        restored = load_snapshot(self.path, use_mmap=True)
+        self.account.buy_shares("GOOGL", 1)
+        restored.buy_shares("GOOGL", 1)
+        self.assertSameAccount(restored, self.account)
+
+        # Re-snapshotting a restored account copies the packed rows and the new tail
+        other_path = os.path.join(self.tmpdir.name, "again.snap")
+        save_snapshot(restored, other_path)
+        restored.transactions.close()
+        self.assertSameAccount(load_snapshot(other_path), self.account)
+
+    def test_version_1_derives_prices(self):
+        save_snapshot(self.account, self.path)
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        # Drop the prices column (6 rows of 8 bytes after the amounts) and mark the file as version 1
+        columns = len(data) - 6 * (8 + 8 + 8 + 4 + 1)
+        del data[columns + 48:columns + 96]
+        data[4:6] = b"\x01\x00"
+        with open(self.path, "wb") as f:
+            f.write(data)
+        self.assertSameAccount(load_snapshot(self.path), self.account)
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot at all, just some bytes")
+        with self.assertRaises(ValueError):
+            load_snapshot(self.path)
+
+    def test_unsupported_version(self):
+        save_snapshot(self.account, self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(b"\xff\x00")
+        with self.assertRaises(ValueError):
+            load_snapshot(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""A local history of crew runs, with latency, token, retry and test trends.
+
+Every generation run adds a row to the runs table of HISTORY_FILE, a SQLite database, and
+one row per task to its tasks table. A run row holds the duration, models, tokens and
+test results, and a hash of agents.yaml and tasks.yaml. A task row holds the task's
+duration, agent, model, tokens and retries. There are two kinds of retry:
+- guardrail retries: the task's output was rejected and the agent asked again;
+- agent retries: the agent's execution raised and was restarted, up to its
+  max_retry_limit.
+
+track_task_usage() registers event bus handlers that measure each task's tokens and agent
+retries as the difference between its start and end.
+
+The report shows p50/p95 durations and mean tokens per task, and test pass rates and
+durations per configuration. It flags latency regressions: tasks whose median duration
+under the current configuration exceeds the previous configuration's by more than
+REGRESSION_RATIO, once both have at least MIN_RUNS runs.
+
+    analytics --last 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+from crewai.utilities.events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent, crewai_event_bus
+
+from engineering_team.artifacts import git_output
+from engineering_team.stats import percentile
+
+HISTORY_FILE = ".run_history.sqlite3"
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "config")
+CONFIG_FILES = ("agents.yaml", "tasks.yaml")
+REGRESSION_RATIO = 1.25
+MIN_RUNS = 3
+
+# Unknown values are None, such as the tokens of a job in multi-module mode
+TaskRecord = namedtuple("TaskRecord", "name agent model duration guardrail_retries agent_retries "
+                                      "prompt_tokens completion_tokens")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    config TEXT NOT NULL,
+    git_commit TEXT,
+    mode TEXT NOT NULL,
+    module TEXT,
+    models TEXT NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    tests_run INTEGER,
+    tests_failed INTEGER,
+    artifacts TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    agent TEXT,
+    model TEXT,
+    duration REAL,
+    guardrail_retries INTEGER,
+    agent_retries INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_by_name ON tasks (name, run_id);
+"""
+
+
+def config_hash(directory=CONFIG_DIR):
+    """A short hash of agents.yaml and tasks.yaml, identifying the configuration a run used."""
+    digest = hashlib.sha256()
+    for name in CONFIG_FILES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# {id(task): (agent's token summary, agent's executions) at the start}, and the differences at the end
+_task_starts = {}
+_task_usage = {}
+
+
+def _agent_counters(agent):
+    summary = agent._token_process.get_summary()
+    return summary.prompt_tokens, summary.completion_tokens, agent._times_executed
+
+
+def _on_task_started(task, event):
+    if task.agent is not None:
+        _task_starts[id(task)] = _agent_counters(task.agent)
+
+
+def _on_task_finished(task, event):
+    start = _task_starts.pop(id(task), None)
+    if start is not None:
+        _task_usage[id(task)] = tuple(end - begin for end, begin in zip(_agent_counters(task.agent), start))
+
+
+_registered = False
+
+
+def track_task_usage():
+    """Registers the token and retry tracking handlers on crewAI's event bus, once per process."""
+    global _registered
+    if not _registered:
+        crewai_event_bus.on(TaskStartedEvent)(_on_task_started)
+        crewai_event_bus.on(TaskCompletedEvent)(_on_task_finished)
+        crewai_event_bus.on(TaskFailedEvent)(_on_task_finished)
+        _registered = True
+
+
+def task_records(tasks, agents_config):
+    """TaskRecords for the tasks of a finished crew run; agents are named by their key in agents_config."""
+    roles = {config["role"].strip(): name for name, config in agents_config.items()}
+    records = []
+    for task in tasks:
+        agent = task.agent
+        prompt_tokens, completion_tokens, agent_retries = _task_usage.pop(id(task), (None, None, None))
+        records.append(TaskRecord(
+            task.name, roles.get(agent.role.strip(), agent.role) if agent else None,
+            getattr(getattr(agent, "llm", None), "model", None), task.execution_duration,
+            task.retry_count, agent_retries, prompt_tokens, completion_tokens))
+    return records
+
+
+class RunHistory:
+    """The runs database."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def record(self, started, duration, mode, module, tasks, prompt_tokens=None, completion_tokens=None,
+               tests_run=None, tests_failed=None, artifacts=None, config=None, git_commit=None):
+        """Adds a run and its TaskRecords. Returns the run's id."""
+        models = sorted({task.model for task in tasks if task.model})
+        db = self._connect()
+        try:
+            with db:
+                run_id = db.execute(
+                    "INSERT INTO runs (started, duration, config, git_commit, mode, module, models, prompt_tokens, "
+                    "completion_tokens, tests_run, tests_failed, artifacts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (started, duration, config or config_hash(), git_commit or git_output("rev-parse", "HEAD"), mode, module, json.dumps(models),
+                     prompt_tokens, completion_tokens, tests_run, tests_failed, artifacts)).lastrowid
+                db.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               [(run_id, *task) for task in tasks])
+            return run_id
+        finally:
+            db.close()
+
+    def runs(self, last=None):
+        """Runs, oldest first; only the last ones if given."""
+        db = self._connect()
+        try:
+            rows = db.execute("SELECT * FROM runs ORDER BY id DESC" + (" LIMIT ?" if last else ""),
+                              (last,) if last else ()).fetchall()
+            return rows[::-1]
+        finally:
+            db.close()
+
+    def tasks(self, run_ids):
+        db = self._connect()
+        try:
+            return db.execute(f"SELECT * FROM tasks WHERE run_id IN ({','.join('?' * len(run_ids))}) "
+                              "ORDER BY run_id", list(run_ids)).fetchall()
+        finally:
+            db.close()
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return statistics.mean(values) if values else None
+
+
+def _format(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def regressions(runs, tasks, ratio=REGRESSION_RATIO, min_runs=MIN_RUNS):
+    """Tasks, and the run as a whole, whose median duration grew by more than ratio with the latest configuration.
+
+    The latest configuration is compared with the one in use before it.
+
+    Returns:
+        [(name, previous median, current median)]
+    """
+    current = runs[-1]["config"]
+    previous = next((run["config"] for run in reversed(runs) if run["config"] != current), None)
+    if previous is None:
+        return []
+    config_of = {run["id"]: run["config"] for run in runs}
+    durations = {}  # {name: {config: [seconds]}}
+    for run in runs:
+        durations.setdefault("(run)", {}).setdefault(run["config"], []).append(run["duration"])
+    for task in tasks:
+        if task["duration"] is not None:
+            durations.setdefault(task["name"], {}).setdefault(config_of[task["run_id"]], []).append(task["duration"])
+    flagged = []
+    for name, by_config in durations.items():
+        before, after = by_config.get(previous, []), by_config.get(current, [])
+        if len(before) >= min_runs and len(after) >= min_runs:
+            old, new = statistics.median(before), statistics.median(after)
+            if new > old * ratio:
+                flagged.append((name, old, new))
+    return flagged
+
+
+def format_report(history, last=None):
+    """Renders task latency and tokens, results per configuration, recent runs and latency regressions."""
+    runs = history.runs(last)
+    if not runs:
+        return "No runs recorded"
+    tasks = history.tasks([run["id"] for run in runs])
+    lines = [f"{'task':<22}{'runs':>6}{'p50 s':>8}{'p95 s':>8}{'retries':>9}{'prompt tok':>12}{'compl tok':>11}"]
+    for name in dict.fromkeys(task["name"] for task in tasks):
+        own = [task for task in tasks if task["name"] == name]
+        durations = sorted(task["duration"] for task in own if task["duration"] is not None)
+        retries = _mean([(task["guardrail_retries"] or 0) + (task["agent_retries"] or 0) for task in own
+                         if task["guardrail_retries"] is not None or task["agent_retries"] is not None])
+        lines.append(f"{name:<22}{len(own):>6}{_format(percentile(durations, 0.5) if durations else None, '.1f'):>8}"
+                     f"{_format(percentile(durations, 0.95) if durations else None, '.1f'):>8}{_format(retries, '.2f'):>9}"
+                     f"{_format(_mean(task['prompt_tokens'] for task in own), '.0f'):>12}"
+                     f"{_format(_mean(task['completion_tokens'] for task in own), '.0f'):>11}")
+    lines.append("")
+    lines.append(f"{'config':<14}{'first run':<18}{'runs':>6}{'p50 s':>8}{'tests passed':>14}")
+    for config in dict.fromkeys(run["config"] for run in runs):
+        own = [run for run in runs if run["config"] == config]
+        tested = [run for run in own if run["tests_run"]]
+        passed = (sum(run["tests_run"] - run["tests_failed"] for run in tested) / sum(run["tests_run"] for run in tested)
+                  if tested else None)
+        lines.append(f"{config:<14}{time.strftime('%Y-%m-%d %H:%M', time.localtime(own[0]['started'])):<18}"
+                     f"{len(own):>6}{statistics.median(run['duration'] for run in own):>8.1f}{_format(passed, '.0%'):>14}")
+    lines.append("")
+    lines.append(f"{'run':>5}  {'started':<18}{'mode':<14}{'seconds':>9}{'tokens':>9}{'tests':>9}  models")
+    for run in runs:
+        tokens = None if run["prompt_tokens"] is None else run["prompt_tokens"] + (run["completion_tokens"] or 0)
+        tests = f"{run['tests_run'] - run['tests_failed']}/{run['tests_run']}" if run["tests_run"] is not None else "-"
+        lines.append(f"{run['id']:>5}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(run['started'])):<18}"
+                     f"{run['mode']:<14}{run['duration']:>9.1f}{_format(tokens, 'd'):>9}{tests:>9}  "
+                     f"{', '.join(json.loads(run['models']))}")
+    flagged = regressions(runs, tasks)
+    if flagged:
+        lines.append("")
+        lines.append(f"Latency regressions since configuration {runs[-1]['config']}:")
+        for name, old, new in flagged:
+            lines.append(f"  {name}: median {old:.1f}s -> {new:.1f}s ({new / old - 1:+.0%})")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on recorded crew runs.")
+    parser.add_argument("--history", default=HISTORY_FILE, help="history database (default: %(default)s)")
+    parser.add_argument("--last", type=int, help="only the last N runs")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.history):
+        print(f"No history at {args.history}", file=sys.stderr)
+        return 1
+    print(format_report(RunHistory(args.history), args.last))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
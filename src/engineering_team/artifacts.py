@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+"""A content-addressed store of generated outputs, with one manifest per run.
+
+Every file of a snapshotted tree, and every task's raw output, is stored once under
+STORE_DIR/blobs by its sha256. A run's manifest in STORE_DIR/runs maps its file paths and
+task names to those digests. Runs that produce the same file share its blob, so keeping
+every run costs only what changed, and the store can be shared by every branch of a
+checkout.
+
+Because manifests hold digests, two runs are compared without reading any files.
+Restoring a run rewrites only the files whose content differs from the target directory.
+Runs are named by their id, by a unique prefix of it, or as latest, latest~1 and so on.
+
+Several processes, such as the job queue's workers, may share a store. gc therefore
+leaves alone temporary files and blobs written or reused within GC_GRACE_SECONDS, which
+may belong to a snapshot whose manifest is not written yet.
+
+    artifacts snapshot output --label baseline
+    artifacts list
+    artifacts diff latest~1 latest --patch
+    artifacts restore latest~1 --to output
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+STORE_DIR = ".artifacts"
+# Directories that hold nothing generated
+SKIP_DIRS = {"__pycache__", ".pytest_cache"}
+SKIP_FILES = {".test_results_cache.json"}
+# Longer than any snapshot takes, from its first blob to its manifest
+GC_GRACE_SECONDS = 3600
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path, data):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def git_output(*args):
+    """The output of a git command in the current directory, or None if it fails."""
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ArtifactStore:
+    """Blobs by sha256 and run manifests, in directory."""
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def _run_path(self, run_id):
+        return os.path.join(self.directory, "runs", f"{run_id}.json")
+
+    def put(self, data):
+        """Stores data unless a blob with the same content exists. Returns its digest.
+
+        An existing blob's modification time is refreshed, so gc sees it as in use.
+        """
+        digest = _digest(data)
+        path = self._blob_path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, data)
+        return digest
+
+    def get(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def snapshot(self, root="output", label=None, tasks=None):
+        """Stores the files below root, and optionally task outputs, as a new run.
+
+        Args:
+            tasks: {task name: raw output}
+
+        Returns:
+            The run's id.
+        """
+        files = {}
+        for directory, subdirectories, names in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if name not in SKIP_DIRS)
+            for name in sorted(names):
+                if name in SKIP_FILES:
+                    continue
+                path = os.path.join(directory, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root).replace(os.sep, "/")] = self.put(f.read())
+        manifest = {
+            "created": time.time(),
+            "label": label,
+            "root": root,
+            "git": {"commit": git_output("rev-parse", "HEAD"), "branch": git_output("rev-parse", "--abbrev-ref", "HEAD")},
+            "files": files,
+            "tasks": {name: self.put(raw.encode("utf-8")) for name, raw in (tasks or {}).items()},
+        }
+        content = _digest(json.dumps([files, manifest["tasks"]], sort_keys=True).encode("utf-8"))
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(manifest['created']))}-{content[:8]}"
+        manifest["id"] = run_id
+        os.makedirs(os.path.dirname(self._run_path(run_id)), exist_ok=True)
+        _atomic_write(self._run_path(run_id), json.dumps(manifest, indent=2).encode("utf-8"))
+        return run_id
+
+    def runs(self):
+        """All run manifests, oldest first."""
+        directory = os.path.join(self.directory, "runs")
+        if not os.path.isdir(directory):
+            return []
+        manifests = []
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name)) as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: (manifest["created"], manifest["id"]))
+
+    def manifest(self, ref):
+        """The manifest of a run given as an id, a unique id prefix, latest or latest~N.
+
+        Raises:
+            KeyError: If no single run matches.
+        """
+        runs = self.runs()
+        if ref == "latest" or ref.startswith("latest~"):
+            back = int(ref.partition("~")[2] or 0)
+            if back < len(runs):
+                return runs[-1 - back]
+            raise KeyError(f"There are only {len(runs)} runs")
+        matches = [manifest for manifest in runs if manifest["id"].startswith(ref)]
+        if len(matches) != 1:
+            raise KeyError(f"{len(matches)} runs match {ref!r}")
+        return matches[0]
+
+    def diff(self, old, new):
+        """Compares two runs' files and task outputs by digest.
+
+        Returns:
+            {"added": [paths], "removed": [paths], "changed": [paths]}, where task outputs
+            appear as "task:<name>".
+        """
+        def entries(manifest):
+            return {**manifest["files"], **{f"task:{name}": digest for name, digest in manifest["tasks"].items()}}
+
+        before, after = entries(old), entries(new)
+        return {
+            "added": sorted(set(after) - set(before)),
+            "removed": sorted(set(before) - set(after)),
+            "changed": sorted(path for path in set(before) & set(after) if before[path] != after[path]),
+        }
+
+    def patch(self, old, new, path):
+        """A unified diff of one changed file or task output between two runs."""
+        def lines(manifest):
+            if path.startswith("task:"):
+                digest = manifest["tasks"].get(path[5:])
+            else:
+                digest = manifest["files"].get(path)
+            return self.get(digest).decode("utf-8", errors="replace").splitlines(keepends=True) if digest else []
+
+        return "".join(difflib.unified_diff(lines(old), lines(new), f"{old['id']}/{path}", f"{new['id']}/{path}"))
+
+    def restore(self, manifest, target, clean=False):
+        """Makes target's files match a run's, writing only those whose content differs.
+
+        Args:
+            clean: Also delete files below target that the run does not have.
+
+        Returns:
+            {"written": count, "unchanged": count, "deleted": count}
+        """
+        counts = {"written": 0, "unchanged": 0, "deleted": 0}
+        for relative, digest in manifest["files"].items():
+            path = os.path.join(target, *relative.split("/"))
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    if _digest(f.read()) == digest:
+                        counts["unchanged"] += 1
+                        continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.get(digest))
+            counts["written"] += 1
+        if clean:
+            for directory, subdirectories, names in os.walk(target):
+                subdirectories[:] = [name for name in subdirectories if name not in SKIP_DIRS]
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if name not in SKIP_FILES and os.path.relpath(path, target).replace(os.sep, "/") not in manifest["files"]:
+                        os.remove(path)
+                        counts["deleted"] += 1
+        return counts
+
+    def gc(self, grace=GC_GRACE_SECONDS):
+        """Deletes blobs no run refers to and that were not written or reused in the last grace seconds.
+
+        Returns:
+            How many blobs were deleted.
+        """
+        # Listed before reading the manifests, so a snapshot finishing in between keeps its blobs
+        cutoff = time.time() - grace
+        candidates = []
+        for directory, _, names in os.walk(os.path.join(self.directory, "blobs")):
+            candidates.extend(os.path.join(directory, name) for name in names if not name.endswith(".tmp"))
+        referenced = set()
+        for manifest in self.runs():
+            referenced.update(manifest["files"].values())
+            referenced.update(manifest["tasks"].values())
+        deleted = 0
+        for path in candidates:
+            if os.path.basename(path) in referenced:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    deleted += 1
+            except FileNotFoundError:
+                pass  # Deleted by another gc
+        return deleted
+
+
+def format_runs(store):
+    """Lists the runs with their label, commit, and how many files each shares with the run before it."""
+    lines = [f"{'run':<26}{'label':<16}{'commit':<10}{'files':>6}{'tasks':>6}{'new':>5}"]
+    seen = set()
+    for manifest in store.runs():
+        digests = set(manifest["files"].values()) | set(manifest["tasks"].values())
+        lines.append(f"{manifest['id']:<26}{(manifest['label'] or '')[:15]:<16}{(manifest['git']['commit'] or '')[:8]:<10}"
+                     f"{len(manifest['files']):>6}{len(manifest['tasks']):>6}{len(digests - seen):>5}")
+        seen |= digests
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store, compare and restore generated outputs.")
+    parser.add_argument("--store", default=STORE_DIR, help="store directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="store a directory as a new run")
+    snapshot.add_argument("root", nargs="?", default="output")
+    snapshot.add_argument("--label")
+    commands.add_parser("list", help="list runs")
+    diff = commands.add_parser("diff", help="compare two runs")
+    diff.add_argument("old")
+    diff.add_argument("new", nargs="?", default="latest")
+    diff.add_argument("--patch", action="store_true", help="show the changes to each changed file")
+    restore = commands.add_parser("restore", help="make a directory match a run")
+    restore.add_argument("run")
+    restore.add_argument("--to", default="output", help="target directory (default: %(default)s)")
+    restore.add_argument("--clean", action="store_true", help="delete files the run does not have")
+    gc = commands.add_parser("gc", help="delete blobs no run refers to")
+    gc.add_argument("--grace", type=float, default=GC_GRACE_SECONDS,
+                    help="keep blobs written or reused within this many seconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.store)
+    try:
+        if args.command == "snapshot":
+            print(store.snapshot(args.root, args.label))
+        elif args.command == "list":
+            print(format_runs(store))
+        elif args.command == "diff":
+            old, new = store.manifest(args.old), store.manifest(args.new)
+            changes = store.diff(old, new)
+            for kind, sign in (("added", "+"), ("removed", "-"), ("changed", "~")):
+                for path in changes[kind]:
+                    print(f"{sign} {path}")
+            if args.patch:
+                for path in changes["changed"]:
+                    print(store.patch(old, new, path))
+        elif args.command == "restore":
+            manifest = store.manifest(args.run)
+            counts = store.restore(manifest, args.to, args.clean)
+            print(f"{manifest['id']}: {counts['written']} written, {counts['unchanged']} unchanged, "
+                  f"{counts['deleted']} deleted")
+        else:
+            print(f"{store.gc(args.grace)} blobs deleted")
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
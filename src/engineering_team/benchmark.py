@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""Microbenchmarks for the Account hot paths of generated trading modules.
+
+Each generated accounts.py (output/ and the example_output_* directories) exposes the same
+operations under slightly different names and signatures; AccountAdapter papers over that
+so one workload runs against all of them. Timings follow the pyperf approach: every
+operation is calibrated to run for roughly min_time per sample, several samples are taken,
+and the fastest per-call time is kept.
+
+    benchmark                                  # benchmark every variant found in the cwd
+    benchmark --save-baseline bench.json       # record a baseline
+    benchmark --baseline bench.json            # exit 1 if anything regressed
+"""
+import argparse
+import gc
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+DEFAULT_SIZES = (1, 1_000, 1_000_000)
+DEFAULT_TOLERANCE = 1.25
+OPERATIONS = ("transactions", "holdings", "portfolio_value", "deposit", "withdraw", "buy", "sell")
+
+# Each operation and the method names the generated variants use for it, in order of preference
+METHOD_NAMES = {
+    "deposit": ("deposit", "deposit_funds"),
+    "withdraw": ("withdraw", "withdraw_funds"),
+    "buy": ("buy_shares",),
+    "sell": ("sell_shares",),
+    "portfolio_value": ("get_portfolio_value", "calculate_portfolio_value", "portfolio_value"),
+    "profit_or_loss": ("get_profit_or_loss", "calculate_profit_or_loss", "profit_or_loss"),
+    "holdings": ("get_holdings", "report_holdings"),
+    "transactions": ("get_transactions", "report_transactions"),
+}
+
+
+def find_variants(root="."):
+    """Returns {name: path to accounts.py} for output/ and every example_output_* directory under root."""
+    variants = {}
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, "accounts.py")
+        if (name == "output" or name.startswith("example_output")) and os.path.isfile(path):
+            variants[name] = path
+    return variants
+
+
+def load_module(path, name):
+    """Imports a generated module from a file path under a unique module name."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AccountAdapter:
+    """Drives any generated Account through one interface.
+
+    Method names are resolved from METHOD_NAMES; constructor arguments are filled in by
+    parameter name, and methods that take the price function as an argument are passed
+    the module's own get_share_price.
+    """
+
+    def __init__(self, module, initial_deposit):
+        self.module = module
+        self.price_function = module.get_share_price
+        cls = module.Account
+        args = []
+        funded = False
+        for param in list(inspect.signature(cls.__init__).parameters.values())[1:]:
+            if param.default is not inspect.Parameter.empty:
+                continue
+            if "deposit" in param.name:
+                args.append(initial_deposit)
+                funded = True
+            else:
+                args.append("benchmark")
+        self.account = cls(*args)
+        self._methods = {}
+        for operation, names in METHOD_NAMES.items():
+            for name in names:
+                method = getattr(self.account, name, None)
+                if callable(method):
+                    self._methods[operation] = self._bind(method)
+                    break
+        if not funded:
+            self.deposit(initial_deposit)
+
+    def _bind(self, method):
+        if "get_share_price" in inspect.signature(method).parameters:
+            price_function = self.price_function
+            return lambda *args: method(*args, price_function)
+        return method
+
+    def supports(self, operation):
+        return operation in self._methods
+
+    def deposit(self, amount):
+        return self._methods["deposit"](amount)
+
+    def withdraw(self, amount):
+        return self._methods["withdraw"](amount)
+
+    def buy(self, symbol, quantity):
+        return self._methods["buy"](symbol, quantity)
+
+    def sell(self, symbol, quantity):
+        return self._methods["sell"](symbol, quantity)
+
+    def portfolio_value(self):
+        return self._methods["portfolio_value"]()
+
+    def profit_or_loss(self):
+        return self._methods["profit_or_loss"]()
+
+    def holdings(self):
+        return self._methods["holdings"]()
+
+    def transactions(self):
+        return self._methods["transactions"]()
+
+
+def populate(adapter, count):
+    """Brings the account's ledger up to roughly count transactions with a deposit/buy/sell/withdraw mix."""
+    cycles, remainder = divmod(max(count - 1, 0), 4)
+    deposit, withdraw, buy, sell = adapter.deposit, adapter.withdraw, adapter.buy, adapter.sell
+    for _ in range(cycles):
+        deposit(1000.0)
+        buy("AAPL", 1)
+        sell("AAPL", 1)
+        withdraw(500.0)
+    for _ in range(remainder):
+        deposit(1000.0)
+
+
+def time_call(fn, min_time=0.02, repeat=5, max_number=1000):
+    """Returns the fastest per-call time of fn in seconds over repeat calibrated samples."""
+    # Warm up (caches, allocator, branch predictors) for up to a tenth of min_time, then calibrate
+    calls = 0
+    start = time.perf_counter()
+    while calls < max_number and time.perf_counter() - start < min_time / 10:
+        fn()
+        calls += 1
+    once = max((time.perf_counter() - start) / calls, 1e-7)
+    number = int(min(max(min_time / once, 1), max_number))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def measure_memory(module, size):
+    """Returns the bytes allocated per transaction while building a ledger of size transactions."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        adapter = AccountAdapter(module, 1e12)
+        populate(adapter, size)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / max(size, 1)
+
+
+def benchmark_module(module, sizes=DEFAULT_SIZES, memory=True, min_time=0.02, repeat=5):
+    """Benchmarks one generated module.
+
+    Returns:
+        {str(size): {"operations": {operation: seconds per call}, "memory_per_transaction": bytes}}
+    """
+    results = {}
+    for size in sizes:
+        adapter = AccountAdapter(module, 1e12)
+        populate(adapter, size)
+        # Keep enough shares around that timing sells never runs out of them
+        adapter.buy("AAPL", 1_000_000)
+        timers = {
+            "transactions": adapter.transactions,
+            "holdings": adapter.holdings,
+            "portfolio_value": adapter.portfolio_value,
+            "deposit": lambda: adapter.deposit(1.0),
+            "withdraw": lambda: adapter.withdraw(1.0),
+            "buy": lambda: adapter.buy("AAPL", 1),
+            "sell": lambda: adapter.sell("AAPL", 1),
+        }
+        # Reads run first so they see the requested ledger size rather than one grown by the write timings
+        operations = {}
+        for operation in OPERATIONS:
+            if adapter.supports(operation):
+                operations[operation] = time_call(timers[operation], min_time=min_time, repeat=repeat)
+        entry = {"operations": operations}
+        if memory:
+            entry["memory_per_transaction"] = measure_memory(module, size)
+        results[str(size)] = entry
+    return results
+
+
+def run_benchmarks(variants, sizes=DEFAULT_SIZES, memory=True, min_time=0.02, repeat=5):
+    """Benchmarks every variant; variants maps a name to the path of its accounts.py."""
+    results = {}
+    for name, path in variants.items():
+        module = load_module(path, f"benchmark_{name}_accounts")
+        results[name] = benchmark_module(module, sizes, memory=memory, min_time=min_time, repeat=repeat)
+    return results
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Lists every timing or memory figure more than tolerance times its baseline value."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, entry in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                continue
+            for operation, seconds in entry["operations"].items():
+                reference = base["operations"].get(operation)
+                if reference and seconds > reference * tolerance:
+                    regressions.append(f"{name} n={size} {operation}: {seconds * 1e6:.2f}us vs baseline {reference * 1e6:.2f}us")
+            memory = entry.get("memory_per_transaction")
+            reference = base.get("memory_per_transaction")
+            if memory is not None and reference and memory > reference * tolerance:
+                regressions.append(f"{name} n={size} memory: {memory:.0f}B/tx vs baseline {reference:.0f}B/tx")
+    return regressions
+
+
+def format_results(results):
+    """Renders benchmark results as a plain-text table."""
+    header = ["variant", "n"] + list(OPERATIONS) + ["B/tx"]
+    rows = [header]
+    for name, sizes in results.items():
+        for size, entry in sizes.items():
+            operations = entry["operations"]
+            row = [name, size]
+            row += [f"{operations[op] * 1e6:.2f}us" if op in operations else "-" for op in OPERATIONS]
+            memory = entry.get("memory_per_transaction")
+            row.append("-" if memory is None else f"{memory:.0f}")
+            rows.append(row)
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Account hot paths of generated modules.")
+    parser.add_argument("--root", default=".", help="directory containing output/ and example_output_*/")
+    parser.add_argument("--variant", action="append", help="only benchmark these variants (repeatable)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated ledger sizes (default: %(default)s)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory per transaction measurement")
+    parser.add_argument("--baseline", help="compare against this baseline JSON and exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown factor allowed before a result counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    variants = find_variants(args.root)
+    if args.variant:
+        variants = {name: path for name, path in variants.items() if name in args.variant}
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run_benchmarks(variants, sizes, memory=not args.no_memory)
+    print(format_results(results))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
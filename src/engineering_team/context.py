@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""Context shaping between crew tasks.
+
+The frontend and test engineers only need the interface of the generated module, not its
+implementation. public_api() reduces a module to its public classes, functions and
+constants: signatures and docstrings, with bodies replaced by "...". Small module-level
+functions keep their bodies, since helpers such as a test get_share_price() define values
+the tests depend on. The crew passes that summary downstream in place of the full source
+(see EngineeringTeam.interface_task).
+
+count_tokens() and the reports below measure what this saves:
+- context_report compares the full and compacted context offline, for an existing module;
+- format_task_report lists each task's context size and duration after a crew run.
+
+    context_report --module output/accounts.py
+"""
+import argparse
+import ast
+import functools
+import re
+import sys
+
+# Tasks that receive the module interface rather than its source
+INTERFACE_TASKS = ("frontend_task", "test_task")
+
+# Module-level functions whose body, after the docstring, spans at most this many lines are kept whole
+HELPER_LINES = 10
+
+_FENCE = re.compile(r"^\s*```[\w+-]*\s*\n(.*?)\n\s*```\s*$", re.DOTALL)
+
+
+def strip_code_fences(text):
+    """Returns the code inside a single markdown code fence, or text unchanged if it is not fenced."""
+    match = _FENCE.match(text)
+    return match.group(1) if match else text
+
+
+def _is_public(name):
+    return not name.startswith("_") or name == "__init__"
+
+
+def _stub(function):
+    """Replaces a function's body with its docstring, if any, followed by "..."."""
+    body = []
+    docstring = ast.get_docstring(function, clean=False)
+    if docstring is not None:
+        body.append(ast.Expr(ast.Constant(docstring)))
+    body.append(ast.Expr(ast.Constant(Ellipsis)))
+    function.body = body
+    return function
+
+
+def _is_helper(function):
+    """Whether a function is short enough to keep its body, e.g. one returning fixed test prices."""
+    body = function.body
+    if ast.get_docstring(function, clean=False) is not None:
+        body = body[1:]
+    return not body or body[-1].end_lineno - body[0].lineno + 1 <= HELPER_LINES
+
+
+def public_api(source):
+    """Summarizes a module as its public constants, functions and classes without their bodies.
+
+    Small module-level functions are kept with their bodies.
+
+    Returns:
+        The summary as Python source, or source unchanged if it cannot be parsed.
+    """
+    try:
+        tree = ast.parse(strip_code_fences(source))
+    except SyntaxError:
+        return source
+    body = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and _is_public(node.name):
+            body.append(node if _is_helper(node) else _stub(node))
+        elif isinstance(node, ast.ClassDef) and _is_public(node.name):
+            members = []
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    if _is_public(item.name):
+                        members.append(_stub(item))
+                elif isinstance(item, (ast.Assign, ast.AnnAssign)) or (
+                        isinstance(item, ast.Expr) and isinstance(item.value, ast.Constant)):
+                    members.append(item)  # Class attributes and the class docstring
+            node.body = members or [ast.Expr(ast.Constant(Ellipsis))]
+            body.append(node)
+        elif isinstance(node, ast.Assign) and all(
+                isinstance(target, ast.Name) and target.id.isupper() for target in node.targets):
+            body.append(node)
+    return ast.unparse(ast.Module(body=body, type_ignores=[]))
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken's cl100k_base encoding, or None if tiktoken or its data file is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """Counts tokens with tiktoken's cl100k_base encoding, or estimates 4 characters per token without it."""
+    encoding = _encoding()
+    return len(text) // 4 if encoding is None else len(encoding.encode(text))
+
+
+def message_text(messages):
+    """The text of chat messages, whether their content is a string or a list of content blocks."""
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def context_report(source):
+    """Compares the context each interface task receives with and without compaction.
+
+    Returns:
+        {task name: (tokens of the full source, tokens of the interface)}
+    """
+    full = count_tokens(source)
+    compact = count_tokens(public_api(source))
+    return {task: (full, compact) for task in INTERFACE_TASKS}
+
+
+def format_task_report(tasks):
+    """Renders the context size and duration of each task of a finished crew run."""
+    lines = [f"{'task':<16}{'context tokens':>16}{'seconds':>10}"]
+    for index, task in enumerate(tasks):
+        # As in a sequential crew: a task without explicit context gets every earlier output
+        sources = task.context or tasks[:index]
+        context = "\n".join(t.output.raw for t in sources if t.output is not None)
+        duration = task.execution_duration
+        lines.append(f"{task.name or '?':<16}{count_tokens(context):>16}"
+                     f"{'-' if duration is None else f'{duration:.1f}':>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the context saved by passing a module's interface.")
+    parser.add_argument("--module", default="output/accounts.py", help="generated module (default: %(default)s)")
+    parser.add_argument("--show", action="store_true", help="print the interface summary")
+    args = parser.parse_args(argv)
+    with open(args.module) as f:
+        source = f.read()
+    if args.show:
+        print(public_api(source))
+        print()
+    print(f"{'task':<16}{'full source':>14}{'interface':>12}{'saved':>8}")
+    for task, (full, compact) in context_report(source).items():
+        print(f"{task:<16}{full:>14}{compact:>12}{1 - compact / max(full, 1):>8.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,25 @@
-from crewai import Agent, Crew, Process, Task
+from crewai import LLM, Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.tasks.task_output import TaskOutput
 
+from engineering_team.analytics import track_task_usage
+from engineering_team.context import public_api
+from engineering_team.hedging import HedgedLLM, HedgeStats, hedge_llm_calls
+from engineering_team.prompt_cache import PromptCacheStats, PromptCachingLLM, track_prompt_caching
+from engineering_team.ratelimit import share_connections
+from engineering_team.speculative import affected, design_interface, format_drift, interface_drift, signatures
+from engineering_team.streaming import check_python, stream_code_outputs
+
+
+def _register_handlers():
+    """Registers the crew's event bus handlers; each registration happens once per process."""
+    # First, so a chunk of a cancelled hedged call never reaches the code streamer
+    hedge_llm_calls()
+    stream_code_outputs()
+    share_connections()
+    track_prompt_caching()
+    track_task_usage()
 
 
 @CrewBase
@@ -10,10 +29,43 @@ class EngineeringTeam():
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
+    def __init__(self, speculative=False, hedge_stats=None, prompt_cache_stats=None):
+        """
+        Args:
+            speculative: Start the frontend and test tasks from the interface in the design,
+                alongside code_task, and patch their output afterwards where the module's
+                interface turned out different.
+            hedge_stats, prompt_cache_stats: Stats to record into, to share them between
+                the teams building the modules of a package.
+        """
+        self.speculative = speculative
+        self._carriers = {}
+        self.design_interface = None
+        self.hedge_stats = hedge_stats or HedgeStats()
+        self.prompt_cache_stats = prompt_cache_stats or PromptCacheStats()
+
+    def llm(self, name: str, stream: bool = True) -> LLM:
+        """The LLM of agent `name`, hedged with its fallback_llm from agents.yaml if it has one.
+
+        Hedging uses each task's llm_latency_slo from tasks.yaml and records into hedge_stats.
+        Both models' calls go through the process-wide rate limiter, with their stable prompt
+        prefixes marked for provider caching and cache use recorded into prompt_cache_stats.
+        """
+        config = self.agents_config[name]
+        primary = PromptCachingLLM(model=config['llm'], stream=stream, agent=name, stats=self.prompt_cache_stats)
+        if not config.get('fallback_llm'):
+            return primary
+        slos = {task: task_config['llm_latency_slo'] for task, task_config in self.tasks_config.items()
+                if 'llm_latency_slo' in task_config}
+        fallback = PromptCachingLLM(model=config['fallback_llm'], stream=stream, agent=name,
+                                    stats=self.prompt_cache_stats)
+        return HedgedLLM(primary, fallback, slos=slos, stats=self.hedge_stats)
+
     @agent
     def engineering_lead(self) -> Agent:
         return Agent(
             config=self.agents_config['engineering_lead'],
+            llm=self.llm('engineering_lead', stream=False),
             verbose=True,
         )
 
@@ -21,6 +73,7 @@ class EngineeringTeam():
     def backend_engineer(self) -> Agent:
         return Agent(
             config=self.agents_config['backend_engineer'],
+            llm=self.llm('backend_engineer'),
             verbose=True,
             allow_code_execution=True,
             code_execution_mode="safe",  # Uses Docker for safety
@@ -32,6 +85,7 @@ class EngineeringTeam():
     def frontend_engineer(self) -> Agent:
         return Agent(
             config=self.agents_config['frontend_engineer'],
+            llm=self.llm('frontend_engineer'),
             verbose=True,
         )
     
@@ -39,6 +93,7 @@ class EngineeringTeam():
     def test_engineer(self) -> Agent:
         return Agent(
             config=self.agents_config['test_engineer'],
+            llm=self.llm('test_engineer'),
             verbose=True,
             allow_code_execution=True,
             code_execution_mode="safe",  # Uses Docker for safety
@@ -49,33 +104,159 @@ class EngineeringTeam():
     @task
     def design_task(self) -> Task:
         return Task(
-            config=self.tasks_config['design_task']
+            config=self.tasks_config['design_task'],
+            callback=self.publish_design_interface if self.speculative else None,
         )
 
     @task
     def code_task(self) -> Task:
         return Task(
             config=self.tasks_config['code_task'],
+            callback=self.publish_interface,
+            guardrail=check_python,
+            async_execution=self.speculative,
         )
 
     @task
     def frontend_task(self) -> Task:
         return Task(
             config=self.tasks_config['frontend_task'],
+            context=[self.interface_task()],
+            guardrail=check_python,
+            async_execution=self.speculative,
         )
 
     @task
     def test_task(self) -> Task:
         return Task(
             config=self.tasks_config['test_task'],
-        )   
+            context=[self.interface_task()],
+            guardrail=check_python,
+            async_execution=self.speculative,
+        )
+
+    def _carrier(self, name, description, expected_output) -> Task:
+        """A task that is never executed and only passes on the output the crew sets for it."""
+        if name not in self._carriers:
+            self._carriers[name] = Task(description=description, expected_output=expected_output)
+        return self._carriers[name]
+
+    def interface_task(self) -> Task:
+        """Carries the public interface of the generated module to the tasks that build on it.
+
+        It is never executed and is not one of the crew's tasks; publish_interface sets its
+        output when code_task finishes, so downstream tasks get signatures and docstrings
+        instead of the full source as context. In speculative mode publish_design_interface
+        sets it first, from the design.
+        """
+        return self._carrier(
+            'interface',
+            "Public interface of the module written by code_task",
+            "The module's public classes and functions with signatures and docstrings",
+        )
+
+    def drift_task(self, target: Task) -> Task:
+        """Carries the interface differences that a speculative task's output depends on to its patch task."""
+        return self._carrier(
+            f'drift:{target.name}',
+            "Differences between the interface in the design and the module written by code_task",
+            "The signatures that differ, as described in the design and as in the module",
+        )
+
+    def _publish(self, carrier: Task, raw: str, agent: str) -> None:
+        carrier.output = TaskOutput(description=carrier.description, raw=raw, agent=agent)
+
+    def publish_interface(self, output: TaskOutput) -> None:
+        """code_task callback: summarizes the generated module for interface_task."""
+        self._publish(self.interface_task(), public_api(output.raw), output.agent)
+
+    def publish_design_interface(self, output: TaskOutput) -> None:
+        """design_task callback in speculative mode: extracts the designed interface for interface_task.
+
+        A design without recognizable signatures is passed on whole.
+        """
+        self.design_interface = design_interface(output.raw)
+        self._publish(self.interface_task(), self.design_interface or output.raw, output.agent)
+
+    def patch_condition(self, target: Task):
+        """Builds the condition of target's patch task: whether its speculative output uses interface drift.
+
+        When it does, the drift it depends on is published to drift_task(target).
+        """
+        def needs_patch(_previous_output: TaskOutput) -> bool:
+            code = self.code_task().output.raw
+            if signatures(self.design_interface or ''):
+                needed = affected(interface_drift(self.design_interface, code), target.output.raw)
+            else:
+                needed = {'interface': "The design listed no signatures, so every use of the module must be checked"}
+            if needed:
+                self._publish(self.drift_task(target), format_drift(needed), target.output.agent)
+            return bool(needed)
+        return needs_patch
+
+    def patch_task(self, name: str, target: Task) -> ConditionalTask:
+        """Revises target's speculative output where it depends on the module's actual interface.
+
+        Skipped when the design's interface held for everything target's output uses.
+        """
+        return ConditionalTask(
+            name=name,
+            config=self.tasks_config[name],
+            condition=self.patch_condition(target),
+            context=[target, self.interface_task(), self.drift_task(target)],
+            guardrail=check_python,
+        )
 
     @crew
     def crew(self) -> Crew:
         """Creates the research crew"""
+        _register_handlers()
+        tasks = self.tasks
+        if self.speculative:
+            tasks = tasks + [
+                self.patch_task('patch_frontend_task', self.frontend_task()),
+                self.patch_task('patch_test_task', self.test_task()),
+            ]
         return Crew(
             agents=self.agents,
-            tasks=self.tasks,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
+
+    def optimization_crew(self) -> Crew:
+        """Creates a crew in which the backend engineer revises the module using the quality gate's findings.
+
+        optimize_task is deliberately not a @task, so it is left out of the main crew.
+        """
+        _register_handlers()
+        return Crew(
+            agents=[self.backend_engineer()],
+            tasks=[Task(name='optimize_task', config=self.tasks_config['optimize_task'], guardrail=check_python)],
+            process=Process.sequential,
+            verbose=True,
+        )
+
+    def _single_task_crew(self, agent: Agent, name: str, **kwargs) -> Crew:
+        _register_handlers()
+        return Crew(
+            agents=[agent],
+            tasks=[Task(name=name, config=self.tasks_config[name], **kwargs)],
             process=Process.sequential,
             verbose=True,
-        )
\ No newline at end of file
+        )
+
+    def planning_crew(self) -> Crew:
+        """Creates a crew in which the engineering lead designs a package of several modules and plans them.
+
+        See project.build_project for how the plan is carried out.
+        """
+        return self._single_task_crew(self.engineering_lead(), 'plan_task')
+
+    def module_code_crew(self) -> Crew:
+        """Creates a crew in which the backend engineer writes one module of a planned package."""
+        return self._single_task_crew(self.backend_engineer(), 'module_code_task', guardrail=check_python)
+
+    def module_test_crew(self) -> Crew:
+        """Creates a crew in which the test engineer writes the unit tests of one module of a planned package."""
+        return self._single_task_crew(self.test_engineer(), 'module_test_task', guardrail=check_python)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""Differential testing and benchmarking of the generated Account variants.
+
+Every variant (output/ and the example_output_* directories) implements the same spec
+behind a different API. One seeded workload is replayed against each of them through
+benchmark.AccountAdapter, and after every step the observable state is compared with a
+reference variant:
+- whether the operation was accepted,
+- the balance,
+- the holdings,
+- the portfolio value,
+- the profit or loss,
+- the number of transactions.
+
+The workload mixes valid operations with ones the spec says must be refused: overdrawing,
+buying more than the balance allows, and selling shares that are not held. The same
+workload is then timed and its retained memory measured, so correctness and cost land in
+one table.
+
+    differential                       # compare every variant with output/
+    differential --reference example_output_mini --steps 5000
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from engineering_team.benchmark import AccountAdapter, find_variants, load_module
+
+DEFAULT_STEPS = 2_000
+INITIAL_DEPOSIT = 10_000.0
+# Every variant ships its own test prices; all of them are given these so trades cost the same
+PRICES = {"AAPL": 150.0, "TSLA": 700.0, "GOOGL": 2800.0}
+SYMBOLS = tuple(PRICES)
+OBSERVED = ("accepted", "balance", "holdings", "portfolio_value", "profit_or_loss", "transactions")
+
+# Floats are compared after rounding, since variants may sum in a different order
+PRECISION = 6
+
+
+def make_workload(steps, seed=0):
+    """Builds a reproducible list of (operation, args) steps, including ones that must be refused."""
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(steps):
+        operation = rng.choices(("deposit", "withdraw", "buy", "sell"), (2, 2, 3, 3))[0]
+        if operation == "deposit":
+            args = (float(rng.randint(1, 5_000)),)
+        elif operation == "withdraw":
+            # Up to twice the initial deposit, so some withdrawals would overdraw
+            args = (float(rng.randint(1, int(2 * INITIAL_DEPOSIT))),)
+        else:
+            args = (rng.choice(SYMBOLS), rng.randint(1, 10))
+        workload.append((operation, args))
+    return workload
+
+
+def apply(adapter, operation, args):
+    """Performs one step, normalizing the variants' ways of refusing it.
+
+    Variants refuse an operation either by returning False or by raising; both count as not
+    accepted.
+    """
+    try:
+        result = getattr(adapter, operation)(*args)
+    except Exception:
+        return False
+    return result is not False
+
+
+def observe(adapter, accepted):
+    """Captures the state the spec defines after a step, in a form comparable across variants."""
+    holdings = adapter.holdings() if adapter.supports("holdings") else None
+    if holdings is not None:
+        holdings = {symbol: quantity for symbol, quantity in holdings.items() if quantity}
+    balance = getattr(adapter.account, "balance", None)
+    return {
+        "accepted": accepted,
+        "balance": None if balance is None else round(balance, PRECISION),
+        "holdings": holdings,
+        "portfolio_value": round(adapter.portfolio_value(), PRECISION) if adapter.supports("portfolio_value") else None,
+        "profit_or_loss": round(adapter.profit_or_loss(), PRECISION) if adapter.supports("profit_or_loss") else None,
+        "transactions": len(adapter.transactions()) if adapter.supports("transactions") else None,
+    }
+
+
+def get_share_price(symbol):
+    """The price function installed in every variant under test."""
+    return PRICES.get(symbol, 0.0)
+
+
+def load_variant(path, name):
+    """Imports a variant and replaces its price function, which its methods look up as a module global."""
+    module = load_module(path, name)
+    module.get_share_price = get_share_price
+    return module
+
+
+def trace(module, workload):
+    """Replays the workload against a fresh account and returns the state observed after each step."""
+    adapter = AccountAdapter(module, INITIAL_DEPOSIT)
+    return [observe(adapter, apply(adapter, operation, args)) for operation, args in workload]
+
+
+def compare(reference, traced):
+    """Compares a variant's trace with the reference trace.
+
+    Returns:
+        ({field: number of steps on which it differed}, first divergence or None), where a
+        divergence is (step, field, expected, actual). Fields a variant does not support are
+        not compared.
+    """
+    mismatches = {}
+    first = None
+    for step, (expected, actual) in enumerate(zip(reference, traced)):
+        for field in OBSERVED:
+            if actual[field] is None or expected[field] is None or actual[field] == expected[field]:
+                continue
+            mismatches[field] = mismatches.get(field, 0) + 1
+            if first is None:
+                first = (step, field, expected[field], actual[field])
+    return mismatches, first
+
+
+def measure(module, workload, repeat=3):
+    """Times the workload without observation and measures the memory its account retains.
+
+    Returns:
+        (steps per second, bytes retained per recorded transaction)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        adapter = AccountAdapter(module, INITIAL_DEPOSIT)
+        start = time.perf_counter()
+        for operation, args in workload:
+            apply(adapter, operation, args)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        adapter = AccountAdapter(module, INITIAL_DEPOSIT)
+        for operation, args in workload:
+            apply(adapter, operation, args)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    recorded = len(adapter.transactions()) if adapter.supports("transactions") else len(workload)
+    return len(workload) / best, retained / max(recorded, 1)
+
+
+def run(variants, reference, steps=DEFAULT_STEPS, seed=0):
+    """Checks every variant against the reference and measures it on the same workload.
+
+    Returns:
+        {variant: {"mismatches", "first_divergence", "throughput", "memory_per_transaction"}}
+    """
+    workload = make_workload(steps, seed)
+    modules = {name: load_variant(path, f"differential_{name}_accounts") for name, path in variants.items()}
+    reference_trace = trace(modules[reference], workload)
+    results = {}
+    for name, module in modules.items():
+        mismatches, first = compare(reference_trace, trace(module, workload))
+        throughput, memory = measure(module, workload)
+        if first is not None:
+            step, field, expected, actual = first
+            operation, args = workload[step]
+            first = {"step": step, "operation": operation, "args": args, "field": field,
+                     "expected": expected, "actual": actual}
+        results[name] = {"mismatches": mismatches, "first_divergence": first,
+                         "throughput": throughput, "memory_per_transaction": memory}
+    return results
+
+
+def format_results(results, reference):
+    """Renders the comparison as a table followed by each variant's first divergence."""
+    header = ["variant", "equivalent", "differing steps by field", "ops/s", "B/tx"]
+    rows = [header]
+    for name, result in results.items():
+        mismatches = result["mismatches"]
+        rows.append([
+            name + (" (reference)" if name == reference else ""),
+            "yes" if not mismatches else "no",
+            ", ".join(f"{field}={count}" for field, count in mismatches.items()) or "-",
+            f"{result['throughput']:.0f}",
+            f"{result['memory_per_transaction']:.0f}",
+        ])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows]
+    for name, result in results.items():
+        first = result["first_divergence"]
+        if first is not None:
+            lines.append(f"{name}: first differs at step {first['step']} {first['operation']}{first['args']}: "
+                         f"{first['field']} {first['actual']!r}, {reference} has {first['expected']!r}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check generated Account variants for equivalence and compare their cost.")
+    parser.add_argument("--root", default=".", help="directory containing output/ and example_output_*/")
+    parser.add_argument("--reference", default="output", help="variant the others are compared with (default: %(default)s)")
+    parser.add_argument("--variant", action="append", help="only compare these variants (repeatable)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="workload length (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the workload")
+    args = parser.parse_args(argv)
+
+    variants = find_variants(args.root)
+    if args.reference not in variants:
+        parser.error(f"reference variant '{args.reference}' not found")
+    if args.variant:
+        variants = {name: path for name, path in variants.items() if name in args.variant or name == args.reference}
+    results = run(variants, args.reference, args.steps, args.seed)
+    print(format_results(results, args.reference))
+    return 0 if all(not result["mismatches"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
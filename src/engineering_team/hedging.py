@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+"""Hedged LLM calls with per-task latency SLOs.
+
+A HedgedLLM wraps an agent's model (the primary) and a fallback_llm from agents.yaml. Each
+call goes to the primary first. If no answer has arrived after the hedge delay, the same
+messages go to the fallback as well. The first valid answer wins, and the loser is
+cancelled. Both models always stream, even for an agent that does not, so a losing call is
+stopped at its next chunk rather than running, and being billed, to the end. Cancellation
+is per call: a loser still finishing an earlier call stays cancelled while the same model
+answers the next one.
+
+The hedge delay is the p95 latency of the primary's earlier calls in the same task, once
+there are MIN_SAMPLES of them, capped by the task's llm_latency_slo from tasks.yaml
+(DEFAULT_SLO if it has none). Until then it is the SLO itself. HedgeStats counts calls,
+hedges and wins per task for format_report.
+
+FakeLLM is a local provider with injected latency, so hedging can be exercised without
+network access:
+
+    hedging --calls 200 --tail-rate 0.1
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import LLM
+from crewai.utilities.events import LLMStreamChunkEvent, TaskStartedEvent, crewai_event_bus
+
+from engineering_team.stats import percentile
+
+DEFAULT_SLO = 120.0
+MIN_SAMPLES = 5
+HEDGE_PERCENTILE = 0.95
+
+# winner: "primary" or "fallback"; elapsed: seconds until the winning answer
+CallRecord = namedtuple("CallRecord", "task elapsed hedged winner")
+
+# The cancellation flag of the hedged attempt running on this thread; chunks are emitted on it
+_attempt = threading.local()
+
+
+class HedgeCancelled(Exception):
+    """Raised from the event bus to stop a streaming call that lost the race."""
+
+
+class HedgeStats:
+    """Latencies and outcomes of hedged calls, per task. Shared by the HedgedLLMs of a crew."""
+
+    def __init__(self):
+        self.records = []
+        self.primary_latencies = {}  # {task: [seconds of each primary call, at least, if it lost]}
+        self._lock = threading.Lock()
+
+    def add_primary_latency(self, task, seconds):
+        """Records how long the primary took, or had run for when it lost a race."""
+        with self._lock:
+            self.primary_latencies.setdefault(task, []).append(seconds)
+
+    def record(self, task, elapsed, hedged, winner):
+        with self._lock:
+            self.records.append(CallRecord(task, elapsed, hedged, winner))
+
+    def hedge_delay(self, task, slo):
+        """Seconds to wait for the primary before hedging: its p95 in this task, at most slo."""
+        with self._lock:
+            latencies = sorted(self.primary_latencies.get(task, ()))
+        if len(latencies) < MIN_SAMPLES:
+            return slo
+        return min(slo, percentile(latencies, HEDGE_PERCENTILE))
+
+    def summary(self):
+        """Per-task hedging outcomes.
+
+        The time saved by a fallback win is estimated as the mean of the primary's recorded
+        latencies in that task that exceeded the win's elapsed time, minus that time; wins
+        with no such recorded latency count as no saving, so the estimate is conservative.
+
+        Returns:
+            {task: {"calls", "hedged", "fallback_wins", "p50", "p95", "saved"}}
+        """
+        with self._lock:
+            records = list(self.records)
+            latencies = {task: list(values) for task, values in self.primary_latencies.items()}
+        summary = {}
+        for task in dict.fromkeys(record.task for record in records):
+            own = [record for record in records if record.task == task]
+            elapsed = sorted(record.elapsed for record in own)
+            saved = 0.0
+            for record in own:
+                if record.winner == "fallback":
+                    slower = [seconds for seconds in latencies.get(task, ()) if seconds > record.elapsed]
+                    if slower:
+                        saved += statistics.mean(slower) - record.elapsed
+            summary[task] = {
+                "calls": len(own),
+                "hedged": sum(record.hedged for record in own),
+                "fallback_wins": sum(record.winner == "fallback" for record in own),
+                "p50": percentile(elapsed, 0.5),
+                "p95": percentile(elapsed, 0.95),
+                "saved": saved,
+            }
+        return summary
+
+
+class HedgedLLM(LLM):
+    """An LLM that races a fallback model against a slow primary.
+
+    The crew sees the primary's model name, stop words and context window; both models get
+    the stop words the agent sets on this LLM. Both are switched to streaming.
+    """
+
+    def __init__(self, primary, fallback, slos=None, default_slo=DEFAULT_SLO, stats=None,
+                 valid=lambda response: bool(response and str(response).strip())):
+        super().__init__(model=primary.model, stream=primary.stream)
+        self.primary = primary
+        self.fallback = fallback
+        for llm in (primary, fallback):
+            llm.stream = True  # So a losing call can be stopped at its next chunk
+        self.slos = slos or {}
+        self.default_slo = default_slo
+        self.stats = stats or HedgeStats()
+        self.valid = valid
+        self.task = None  # Name of the task the agent is working on, set by hedge_llm_calls
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        task = self.task or "?"
+        delay = self.stats.hedge_delay(task, self.slos.get(task, self.default_slo))
+        for llm in (self.primary, self.fallback):
+            llm.stop = self.stop
+
+        def attempt(llm, cancelled):
+            _attempt.cancelled = cancelled
+            try:
+                start = time.perf_counter()
+                response = llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+                return response, time.perf_counter() - start
+            finally:
+                _attempt.cancelled = None
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        start = time.perf_counter()
+        cancels = {}  # {future: its attempt's cancellation flag}
+
+        def submit(llm):
+            cancelled = threading.Event()
+            future = pool.submit(attempt, llm, cancelled)
+            cancels[future] = cancelled
+            return future
+
+        owners = {submit(self.primary): self.primary}
+        pending = set(owners)
+        hedged = False
+        failure = None
+        try:
+            while pending:
+                timeout = None if hedged else max(0.0, delay - (time.perf_counter() - start))
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    llm = owners[future]
+                    try:
+                        response, seconds = future.result()
+                    except Exception as e:
+                        failure = e
+                        continue
+                    if llm is self.primary:
+                        self.stats.add_primary_latency(task, seconds)
+                    if self.valid(response):
+                        elapsed = time.perf_counter() - start
+                        winner = "primary" if llm is self.primary else "fallback"
+                        if self.primary in (owners[loser] for loser in pending):
+                            # It would have taken longer still; counting it keeps slow calls in the p95
+                            self.stats.add_primary_latency(task, elapsed)
+                        self.stats.record(task, elapsed, hedged, winner)
+                        return response
+                    failure = ValueError(f"{llm.model} returned an invalid response: {response!r}")
+                if not hedged:
+                    # Only the primary was running: it is past the hedge delay, or it failed
+                    hedged = True
+                    future = submit(self.fallback)
+                    owners[future] = self.fallback
+                    pending.add(future)
+            raise failure
+        finally:
+            for future in pending:
+                cancels[future].set()
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+def _on_task_started(task, event):
+    llm = getattr(task.agent, "llm", None)
+    if isinstance(llm, HedgedLLM):
+        llm.task = task.name
+
+
+def _on_chunk(llm, event):
+    cancelled = getattr(_attempt, "cancelled", None)
+    if cancelled is not None and cancelled.is_set():
+        raise HedgeCancelled(f"{llm.model} lost the race")
+
+
+_registered = False
+
+
+def hedge_llm_calls():
+    """Registers the task tracking and cancellation handlers on crewAI's event bus, once per process.
+
+    Register them before any other chunk handler, so a cancelled call's chunk stops it before
+    anything consumes the chunk.
+    """
+    global _registered
+    if not _registered:
+        crewai_event_bus.on(TaskStartedEvent)(_on_task_started)
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_chunk)
+        _registered = True
+
+
+def format_report(stats):
+    """Renders hedge rate, latency and estimated savings per task."""
+    lines = [f"{'task':<20}{'calls':>7}{'hedged':>8}{'fallback':>10}{'p50 s':>8}{'p95 s':>8}{'saved s':>9}"]
+    for task, row in stats.summary().items():
+        lines.append(f"{task:<20}{row['calls']:>7}{row['hedged'] / row['calls']:>8.0%}{row['fallback_wins']:>10}"
+                     f"{row['p50']:>8.2f}{row['p95']:>8.2f}{row['saved']:>9.1f}")
+    return "\n".join(lines)
+
+
+class FakeLLM(LLM):
+    """A local provider that streams a canned response over an injected latency.
+
+    Args:
+        latency: Callable taking a random.Random and returning the seconds a call takes.
+        fail_rate: Fraction of calls that raise instead of answering.
+    """
+
+    def __init__(self, model, latency, response="Thought: done\nFinal Answer: done", fail_rate=0.0, seed=0):
+        super().__init__(model=model, stream=True)
+        self.latency = latency
+        self.response = response
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        seconds = self.latency(self.rng)
+        if self.rng.random() < self.fail_rate:
+            time.sleep(seconds / 2)
+            raise ConnectionError(f"{self.model} failed")
+        chunks = self.response.split(" ")
+        for index, chunk in enumerate(chunks):
+            time.sleep(seconds / len(chunks))
+            # Emitted like a real streaming call, so a lost race stops it here
+            crewai_event_bus.emit(self, LLMStreamChunkEvent(chunk=chunk if index == 0 else " " + chunk))
+        return self.response
+
+
+def tail_latency(median, tail, tail_rate):
+    """A latency distribution: usually around median, but tail seconds for a tail_rate fraction of calls."""
+    def latency(rng):
+        return tail if rng.random() < tail_rate else rng.uniform(0.5 * median, 1.5 * median)
+    return latency
+
+
+def simulate(calls, slo, median=0.02, tail=0.5, tail_rate=0.05, fallback_median=0.04, seed=0):
+    """Runs the same calls against a fake primary alone and hedged with a fake fallback.
+
+    Returns:
+        (sorted latencies without hedging, sorted latencies with hedging, HedgeStats)
+    """
+    with crewai_event_bus.scoped_handlers():
+        # Only the cancellation handler, without the console listener echoing every chunk
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_chunk)
+        return _simulate(calls, slo, median, tail, tail_rate, fallback_median, seed)
+
+
+def _simulate(calls, slo, median, tail, tail_rate, fallback_median, seed):
+    messages = [{"role": "user", "content": "ping"}]
+    alone = FakeLLM("fake/primary", tail_latency(median, tail, tail_rate), seed=seed)
+    baseline = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        alone.call(messages)
+        baseline.append(time.perf_counter() - start)
+
+    stats = HedgeStats()
+    hedged = HedgedLLM(FakeLLM("fake/primary", tail_latency(median, tail, tail_rate), seed=seed),
+                       FakeLLM("fake/fallback", tail_latency(fallback_median, tail, tail_rate), seed=seed + 1),
+                       slos={"simulated_task": slo}, stats=stats)
+    hedged.task = "simulated_task"
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        hedged.call(messages)
+        latencies.append(time.perf_counter() - start)
+    time.sleep(tail)  # Lets the last cancelled call reach its next chunk and stop
+    return sorted(baseline), sorted(latencies), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate hedged LLM calls against local fake providers.")
+    parser.add_argument("--calls", type=int, default=100, help="calls per configuration (default: %(default)s)")
+    parser.add_argument("--slo", type=float, default=0.2, help="latency SLO in seconds (default: %(default)s)")
+    parser.add_argument("--median", type=float, default=0.02, help="primary's typical latency (default: %(default)s)")
+    parser.add_argument("--tail", type=float, default=0.5, help="primary's tail latency (default: %(default)s)")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="fraction of slow calls (default: %(default)s)")
+    parser.add_argument("--fallback-median", type=float, default=0.04, help="fallback's typical latency (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+    baseline, latencies, stats = simulate(args.calls, args.slo, args.median, args.tail, args.tail_rate,
+                                          args.fallback_median, args.seed)
+    print(format_report(stats))
+    print()
+    print(f"{'':<10}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'total s':>9}")
+    for name, values in (("primary", baseline), ("hedged", latencies)):
+        print(f"{name:<10}{percentile(values, 0.5):>8.3f}{percentile(values, 0.95):>8.3f}"
+              f"{percentile(values, 0.99):>8.3f}{sum(values):>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
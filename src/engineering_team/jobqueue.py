@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+"""A durable local queue of generation jobs, and a worker daemon that runs them.
+
+Jobs are rows of a SQLite database in QUEUE_DIR. Each one holds a spec (requirements,
+module and class name) and a priority. A job is queued, running, succeeded, failed or
+cancelled.
+
+A worker runs up to --slots jobs at once. Each job runs in its own process, with
+QUEUE_DIR/jobs/<id> as its working directory, so concurrent crews keep their output/
+directories apart. To claim a job, a worker takes a lease on it, and renews the lease every
+HEARTBEAT seconds while the job runs. If a worker dies, its leases expire and other workers
+(or the same one, restarted) pick the jobs up again. A job that fails is retried with
+exponential backoff until it has been attempted max_attempts times. Cancelling a running
+job stops its process at the next heartbeat.
+
+All workers on the machine share the rate limiter's buckets through QUEUE_DIR (see
+ratelimit.STATE_ENV), so a larger farm waits for capacity rather than tripping 429s.
+
+    jobqueue submit --requirements spec.txt --module accounts.py --class Account --priority 5
+    jobqueue worker --slots 4
+    jobqueue status
+    jobqueue cancel 12
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from engineering_team.analytics import HISTORY_FILE
+from engineering_team.artifacts import STORE_DIR
+from engineering_team.knowledge import INDEX_DIR, KNOWLEDGE_DIR
+from engineering_team.ratelimit import STATE_ENV
+
+QUEUE_DIR = ".job_queue"
+LEASE_SECONDS = 60
+HEARTBEAT = 5
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 30
+SLOTS = 2
+
+STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_priority ON jobs (state, priority DESC, id);
+"""
+
+
+class JobQueue:
+    """The jobs database. Every method is a single transaction, so any number of processes can share it."""
+
+    def __init__(self, directory=QUEUE_DIR):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, "jobs.sqlite3")
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            # WAL lets status readers run alongside the workers' writes; it persists in the file
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            # Taking the write lock up front keeps two workers from claiming the same job
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def workdir(self, job_id):
+        return os.path.join(self.directory, "jobs", str(job_id))
+
+    def submit(self, spec, priority=0, max_attempts=MAX_ATTEMPTS):
+        """Queues a job; higher priorities run first. Returns its id."""
+        with self._transaction() as db:
+            return db.execute("INSERT INTO jobs (spec, priority, max_attempts, submitted) VALUES (?, ?, ?, ?)",
+                              (json.dumps(spec), priority, max_attempts, time.time())).lastrowid
+
+    def _recover(self, db, now):
+        """Requeues running jobs whose lease expired, or fails them if they are out of attempts."""
+        db.execute("UPDATE jobs SET state = 'failed', finished = ?, error = 'lease expired', worker = NULL "
+                   "WHERE state = 'running' AND lease_until < ? AND attempts >= max_attempts", (now, now))
+        db.execute("UPDATE jobs SET state = 'queued', error = 'lease expired', worker = NULL "
+                   "WHERE state = 'running' AND lease_until < ?", (now,))
+
+    def claim(self, worker, lease=LEASE_SECONDS):
+        """Leases the queued job with the highest priority, oldest first, to worker.
+
+        Returns:
+            The job's row, or None if no job is ready.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            self._recover(db, now)
+            job = db.execute("SELECT id FROM jobs WHERE state = 'queued' AND not_before <= ? "
+                             "ORDER BY priority DESC, id LIMIT 1", (now,)).fetchone()
+            if job is None:
+                return None
+            db.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, worker = ?, lease_until = ?, "
+                       "started = ? WHERE id = ?", (worker, now + lease, now, job["id"]))
+            return db.execute("SELECT * FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+
+    def heartbeat(self, job_id, worker, lease=LEASE_SECONDS):
+        """Renews worker's lease on a job. Returns False if the job was cancelled or the lease lost."""
+        with self._transaction() as db:
+            return db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND state = 'running' AND worker = ?",
+                              (time.time() + lease, job_id, worker)).rowcount == 1
+
+    def complete(self, job_id, worker):
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = 'succeeded', finished = ?, error = NULL, worker = NULL "
+                       "WHERE id = ? AND state = 'running' AND worker = ?", (time.time(), job_id, worker))
+
+    def fail(self, job_id, worker, error, backoff=RETRY_BACKOFF):
+        """Records a failed attempt: the job is retried after an exponential backoff, or fails for good."""
+        now = time.time()
+        with self._transaction() as db:
+            job = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = 'running' AND worker = ?",
+                             (job_id, worker)).fetchone()
+            if job is None:
+                return
+            if job["attempts"] < job["max_attempts"]:
+                db.execute("UPDATE jobs SET state = 'queued', worker = NULL, error = ?, not_before = ? WHERE id = ?",
+                           (error, now + backoff * 2 ** (job["attempts"] - 1), job_id))
+            else:
+                db.execute("UPDATE jobs SET state = 'failed', worker = NULL, error = ?, finished = ? WHERE id = ?",
+                           (error, now, job_id))
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False if it had already finished or does not exist."""
+        with self._transaction() as db:
+            return db.execute("UPDATE jobs SET state = 'cancelled', finished = ?, worker = NULL "
+                              "WHERE id = ? AND state IN ('queued', 'running')", (time.time(), job_id)).rowcount == 1
+
+    def jobs(self, job_id=None):
+        """All jobs, newest first, or the one with job_id."""
+        with self._transaction() as db:
+            self._recover(db, time.time())
+            if job_id is not None:
+                return db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchall()
+            return db.execute("SELECT * FROM jobs ORDER BY id DESC").fetchall()
+
+
+def format_jobs(jobs):
+    """Renders jobs with their state, attempts and timings, followed by counts per state."""
+    lines = [f"{'id':>5}  {'state':<10}{'priority':>9}{'attempts':>10}{'wait s':>9}{'run s':>9}  module / error"]
+    now = time.time()
+    for job in jobs:
+        spec = json.loads(job["spec"])
+        waited = (job["started"] or job["finished"] or now) - job["submitted"]
+        ran = (job["finished"] or now) - job["started"] if job["started"] else 0.0
+        detail = spec.get("module_name", "")
+        if job["error"]:
+            detail += f" / {job['error'].splitlines()[-1]}"
+        lines.append(f"{job['id']:>5}  {job['state']:<10}{job['priority']:>9}"
+                     f"{job['attempts']:>6}/{job['max_attempts']:<3}{waited:>9.1f}{ran:>9.1f}  {detail}")
+    counts = {state: sum(job["state"] == state for job in jobs) for state in STATES}
+    lines.append(", ".join(f"{count} {state}" for state, count in counts.items() if count))
+    return "\n".join(lines)
+
+
+class Worker:
+    """Runs queued jobs, each in a subprocess, up to slots at a time.
+
+    Args:
+        command: Callable from a job's row to the argv of the process that runs it.
+    """
+
+    def __init__(self, queue, slots=SLOTS, lease=LEASE_SECONDS, heartbeat=HEARTBEAT, command=None, backoff=RETRY_BACKOFF):
+        self.queue = queue
+        self.slots = slots
+        self.lease = lease
+        self.heartbeat = heartbeat
+        self.backoff = backoff
+        self.command = command or (lambda job: [sys.executable, "-m", "engineering_team.jobqueue",
+                                                "--queue", queue.directory, "run", str(job["id"])])
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = {}  # {job id: Popen}
+        self.stopping = False
+
+    def _start(self, job):
+        workdir = self.queue.workdir(job["id"])
+        os.makedirs(workdir, exist_ok=True)
+        env = {**os.environ}
+        env.setdefault(STATE_ENV, os.path.join(self.queue.directory, "rate_limits.json"))
+        with open(os.path.join(workdir, f"attempt_{job['attempts']}.log"), "w") as log:
+            # In a session of its own, so a Ctrl-C meant for the worker leaves running jobs to finish
+            self.running[job["id"]] = subprocess.Popen(self.command(job), cwd=workdir, env=env, stdout=log,
+                                                       stderr=subprocess.STDOUT, start_new_session=True)
+
+    def _check(self):
+        """Records finished jobs, renews the leases of running ones and stops those that were cancelled."""
+        for job_id, process in list(self.running.items()):
+            code = process.poll()
+            if code is None:
+                if not self.queue.heartbeat(job_id, self.name, self.lease):
+                    process.terminate()
+                    process.wait()
+                    del self.running[job_id]
+                continue
+            del self.running[job_id]
+            if code == 0:
+                self.queue.complete(job_id, self.name)
+            else:
+                self.queue.fail(job_id, self.name, f"exited with status {code}", self.backoff)
+
+    def run(self, until_idle=False):
+        """Claims and runs jobs until stopped (SIGTERM or SIGINT), or, with until_idle, until none are left.
+
+        Once stopped, it claims nothing new and waits for its running jobs to finish.
+        """
+        while True:
+            while not self.stopping and len(self.running) < self.slots:
+                job = self.queue.claim(self.name, self.lease)
+                if job is None:
+                    break
+                self._start(job)
+            self._check()
+            if not self.running and (self.stopping or until_idle and not self._waiting()):
+                return
+            time.sleep(self.heartbeat if self.running else min(self.heartbeat, 1))
+
+    def _waiting(self):
+        return any(job["state"] == "queued" for job in self.queue.jobs())
+
+    def stop(self, *_):
+        self.stopping = True
+
+
+def _exit_with_parent(interval=1.0):
+    """Exits once the process that started this one is gone, so a crashed worker's jobs don't run on beside their retries."""
+    parent = os.getppid()
+
+    def watch():
+        while os.getppid() == parent:
+            time.sleep(interval)
+        os._exit(1)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def run_job(queue, job_id):
+    """Runs a job's generation in the current directory (the job's working directory)."""
+    # Imported here so the worker itself doesn't load crewAI
+    from engineering_team.main import generate
+
+    _exit_with_parent()
+    spec = json.loads(queue.jobs(job_id)[0]["spec"])
+    generate(spec["requirements"], spec["module_name"], spec["class_name"],
+             spec.get("knowledge_dir", KNOWLEDGE_DIR), spec.get("index_dir", INDEX_DIR), spec.get("store_dir", STORE_DIR),
+             spec.get("history_file", HISTORY_FILE))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue generation jobs and run them with a worker pool.")
+    parser.add_argument("--queue", default=QUEUE_DIR, help="queue directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="queue a generation job")
+    submit.add_argument("--requirements", required=True, help="file with the requirements")
+    submit.add_argument("--module", required=True, help="module name, such as accounts.py")
+    submit.add_argument("--class", dest="class_name", required=True, help="class name, such as Account")
+    submit.add_argument("--priority", type=int, default=0, help="higher runs first (default: %(default)s)")
+    submit.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="default: %(default)s")
+    status = commands.add_parser("status", help="show jobs")
+    status.add_argument("job", type=int, nargs="?")
+    cancel = commands.add_parser("cancel", help="cancel a queued or running job")
+    cancel.add_argument("job", type=int)
+    worker = commands.add_parser("worker", help="run jobs until stopped")
+    worker.add_argument("--slots", type=int, default=SLOTS, help="jobs run at once (default: %(default)s)")
+    worker.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease seconds (default: %(default)s)")
+    worker.add_argument("--until-idle", action="store_true", help="exit once the queue is empty")
+    run = commands.add_parser("run", help="run one job in the current directory (used by workers)")
+    run.add_argument("job", type=int)
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.queue)
+    if args.command == "submit":
+        with open(args.requirements) as f:
+            spec = {"requirements": f.read(), "module_name": args.module, "class_name": args.class_name,
+                    "knowledge_dir": os.path.abspath(KNOWLEDGE_DIR), "index_dir": os.path.abspath(INDEX_DIR),
+                    "store_dir": os.path.abspath(STORE_DIR), "history_file": os.path.abspath(HISTORY_FILE)}
+        print(queue.submit(spec, args.priority, args.max_attempts))
+    elif args.command == "status":
+        jobs = queue.jobs(args.job)
+        if not jobs:
+            print(f"No job {args.job}" if args.job is not None else "No jobs", file=sys.stderr)
+            return 1
+        print(format_jobs(jobs))
+    elif args.command == "cancel":
+        if not queue.cancel(args.job):
+            print(f"Job {args.job} is not queued or running", file=sys.stderr)
+            return 1
+    elif args.command == "worker":
+        daemon = Worker(queue, args.slots, args.lease)
+        signal.signal(signal.SIGTERM, daemon.stop)
+        signal.signal(signal.SIGINT, daemon.stop)
+        daemon.run(args.until_idle)
+    else:
+        run_job(queue, args.job)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+"""A persistent vector index over knowledge/, for retrieving only the snippets a run needs.
+
+KnowledgeIndex splits each file in knowledge/ into overlapping chunks, embeds them and
+keeps the result in INDEX_DIR:
+- manifest.json: the embedder, the current generation, and each file's content hash and
+  range of rows;
+- chunks-<generation>.json: the text and file of each row;
+- vectors-<generation>.npy: one normalized vector per row, read memory-mapped.
+An update writes a new generation and then replaces the manifest, so interrupted updates
+leave a consistent index. Several processes, such as the job queue's workers, may share
+one index: updates hold an exclusive lock on INDEX_DIR/lock and start from the latest
+manifest, and readers load under a shared lock, memory-mapping the vectors right away so a
+later update deleting their generation does not affect them.
+
+update() re-embeds only files whose content hash changed and drops the rows of deleted
+files, so a kickoff with an unchanged knowledge base embeds nothing. search() ranks the
+chunks by cosine similarity to a query. The crew gets the top matches for its
+requirements as the {knowledge} input (see relevant_knowledge) rather than every file.
+
+hash_embedding is a local, deterministic embedder for tests and offline use; runs embed
+with EMBEDDING_MODEL through litellm.
+
+    knowledge --query "portfolio valuation" --local
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+KNOWLEDGE_DIR = "knowledge"
+INDEX_DIR = ".knowledge_index"
+EXTENSIONS = (".txt", ".md")
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHUNK_CHARS = 800
+CHUNK_OVERLAP = 100
+TOP_K = 4
+# Chunks scoring below this are left out even if fewer than k remain
+MIN_SCORE = 0.1
+HASH_DIMENSIONS = 256
+
+_WORD = re.compile(r"\w+")
+
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Splits text into chunks of at most size characters, overlapping by overlap, preferably at line breaks."""
+    chunks = []
+    start = 0
+    text = text.strip()
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            # Break after the last newline or space in the second half of the chunk, if any
+            cut = max(text.rfind("\n", start + size // 2, end), text.rfind(" ", start + size // 2, end))
+            if cut > start:
+                end = cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end == len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def hash_embedding(texts, dimensions=HASH_DIMENSIONS):
+    """Embeds texts by hashing their lowercased words into signed buckets: local and deterministic."""
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.sha256(word.encode("utf-8")).digest()
+            vectors[row, int.from_bytes(digest[:4], "little") % dimensions] += 1 if digest[4] & 1 else -1
+    return vectors
+
+
+hash_embedding.name = f"hash-{HASH_DIMENSIONS}"
+
+
+def litellm_embedding(model=EMBEDDING_MODEL):
+    """An embedder calling a provider's embedding model through litellm."""
+    def embed(texts):
+        import litellm
+
+        response = litellm.embedding(model=model, input=list(texts))
+        return np.array([item["embedding"] for item in response.data], dtype=np.float32)
+    embed.name = model
+    return embed
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _atomic_write(path, mode, write):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, mode) as f:
+        write(f)
+    os.replace(temporary, path)
+
+
+class KnowledgeIndex:
+    """The chunks of a knowledge directory and their embeddings, persisted and updated incrementally.
+
+    Args:
+        directory: The knowledge base; files with EXTENSIONS anywhere below it are indexed.
+        index_dir: Where the index is kept.
+        embed: Callable from a list of texts to an array of vectors, with a name attribute
+            identifying it; an index built by another embedder is rebuilt.
+    """
+
+    def __init__(self, directory=KNOWLEDGE_DIR, index_dir=INDEX_DIR, embed=None):
+        self.directory = directory
+        self.index_dir = index_dir
+        self.embed = embed or litellm_embedding()
+        with self._locked(fcntl.LOCK_SH):
+            self._load()
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    @contextmanager
+    def _locked(self, operation):
+        """Holds a shared or exclusive lock on the index, between processes."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._path("lock"), "a") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Reads the latest generation; an index built by another embedder counts as empty."""
+        self.manifest = {"embedder": None, "generation": None, "files": {}}
+        self.chunks = []
+        self.vectors = None  # Memory-mapped from vectors-<generation>.npy
+        try:
+            with open(self._path("manifest.json")) as f:
+                manifest = json.load(f)
+            if manifest["embedder"] != self.embed.name:
+                return
+            with open(self._path(f"chunks-{manifest['generation']}.json")) as f:
+                chunks = json.load(f)
+            vectors = np.load(self._path(f"vectors-{manifest['generation']}.npy"), mmap_mode="r") if chunks else None
+        except (OSError, ValueError, KeyError):
+            return
+        self.manifest, self.chunks, self.vectors = manifest, chunks, vectors
+
+    def _files(self):
+        """{path relative to directory: sha256 of its content} for the files to index."""
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                if name.endswith(EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        files[os.path.relpath(path, self.directory)] = hashlib.sha256(f.read()).hexdigest()
+        return files
+
+    def update(self):
+        """Brings the index up to date with the directory, embedding only new and changed files.
+
+        Returns:
+            {"reused": files, "embedded": files, "removed": files, "chunks": chunks embedded}
+        """
+        with self._locked(fcntl.LOCK_EX):
+            # Another process may have updated the index since it was loaded
+            self._load()
+            return self._update()
+
+    def _update(self):
+        files = self._files()
+        known = self.manifest["files"]
+        stats = {"reused": 0, "embedded": 0, "removed": len(set(known) - set(files)), "chunks": 0}
+        chunks = []
+        parts = []
+        entries = {}
+        for name, digest in sorted(files.items()):
+            entry = known.get(name)
+            if entry and entry["sha256"] == digest:
+                start, end = entry["rows"]
+                rows = self.chunks[start:end]
+                # A file without chunks has no rows, and an index of only such files no vectors
+                vectors = np.asarray(self.vectors[start:end]) if rows else None
+                stats["reused"] += 1
+            else:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    rows = [{"file": name, "text": text} for text in chunk_text(f.read())]
+                vectors = _normalize(np.asarray(self.embed([row["text"] for row in rows]), dtype=np.float32)) \
+                    if rows else None
+                stats["embedded"] += 1
+                stats["chunks"] += len(rows)
+            entries[name] = {"sha256": digest, "rows": [len(chunks), len(chunks) + len(rows)]}
+            chunks.extend(rows)
+            if rows:
+                parts.append(vectors)
+        if stats["embedded"] or stats["removed"] or self.manifest["embedder"] != self.embed.name:
+            self._save({"embedder": self.embed.name, "files": entries}, chunks,
+                       np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32))
+        return stats
+
+    def _save(self, manifest, chunks, vectors):
+        os.makedirs(self.index_dir, exist_ok=True)
+        generation = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        manifest = {**manifest, "generation": generation}
+        _atomic_write(self._path(f"vectors-{generation}.npy"), "wb", lambda f: np.save(f, vectors))
+        _atomic_write(self._path(f"chunks-{generation}.json"), "w", lambda f: json.dump(chunks, f))
+        _atomic_write(self._path("manifest.json"), "w", lambda f: json.dump(manifest, f))
+        for name in os.listdir(self.index_dir):
+            if name.startswith(("vectors-", "chunks-")) and generation not in name:
+                os.remove(self._path(name))
+        self.manifest, self.chunks, self.vectors = manifest, chunks, vectors if chunks else None
+
+    def search(self, query, k=TOP_K, min_score=MIN_SCORE):
+        """The k chunks most similar to query.
+
+        Returns:
+            [(score, file, text)], best first.
+        """
+        if not self.chunks:
+            return []
+        query_vector = _normalize(np.asarray(self.embed([query]), dtype=np.float32))[0]
+        scores = self.vectors @ query_vector
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(float(scores[row]), self.chunks[row]["file"], self.chunks[row]["text"])
+                for row in best if scores[row] >= min_score]
+
+
+def format_snippets(results):
+    """Renders search results as the text given to agents."""
+    return "\n\n".join(f"[{file}]\n{text}" for _, file, text in results)
+
+
+def relevant_knowledge(query, directory=KNOWLEDGE_DIR, k=TOP_K, embed=None, index_dir=INDEX_DIR):
+    """The knowledge base's snippets most relevant to query, after updating its index; "" if there is none."""
+    if not os.path.isdir(directory):
+        return ""
+    index = KnowledgeIndex(directory, index_dir, embed)
+    index.update()
+    return format_snippets(index.search(query, k))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the knowledge index and search it.")
+    parser.add_argument("--directory", default=KNOWLEDGE_DIR, help="knowledge base (default: %(default)s)")
+    parser.add_argument("--index", default=INDEX_DIR, help="index directory (default: %(default)s)")
+    parser.add_argument("--query", help="text to find relevant snippets for")
+    parser.add_argument("-k", type=int, default=TOP_K, help="snippets to return (default: %(default)s)")
+    parser.add_argument("--local", action="store_true", help="embed with the local hash embedding")
+    args = parser.parse_args(argv)
+    index = KnowledgeIndex(args.directory, args.index, hash_embedding if args.local else None)
+    stats = index.update()
+    print(f"{len(index.chunks)} chunks from {len(index.manifest['files'])} files: {stats['embedded']} files "
+          f"embedded ({stats['chunks']} chunks), {stats['reused']} reused, {stats['removed']} removed")
+    if args.query:
+        for score, file, text in index.search(args.query, args.k):
+            print(f"\n{score:.2f} {file}\n{text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
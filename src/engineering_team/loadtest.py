@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""Headless load-test harness for the Gradio handlers of generated apps.
+
+Imports an app.py and calls its handler functions directly, without a browser or HTTP
+server, from many simulated users at once. The generated apps name and shape their
+handlers differently, so calls are made by operation (deposit, buy, summary, ...) and
+resolved to each app's handler through HANDLER_NAMES, with arguments filled in by
+parameter name. Calls are gated by the per-group concurrency limits an app gives Gradio
+(TRADE_CONCURRENCY and READ_CONCURRENCY), if it declares any.
+
+Users follow scripted profiles (see PROFILES) mixed in the proportions given by --mix.
+The report records throughput, a latency histogram and p50/p99 per operation, and the
+memory the run left allocated. With --variant all, every app variant is run in its own
+subprocess and the results are compared side by side.
+
+    loadtest --app-dir output --users 1000 --ops 20
+    loadtest --variant all --mix trader=0.3,viewer=0.7
+"""
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from engineering_team.stats import percentile
+
+# Each operation and the handler names the generated apps use for it, in order of preference
+HANDLER_NAMES = {
+    "create_account": ("create_account",),
+    "deposit": ("deposit_funds", "deposit"),
+    "withdraw": ("withdraw_funds", "withdraw"),
+    "buy": ("buy_shares", "buy_stock"),
+    "sell": ("sell_shares", "sell_stock"),
+    "summary": ("get_account_summary", "get_account_info", "get_portfolio", "view_portfolio"),
+    "history": ("get_transaction_history", "get_transactions", "list_transactions", "view_transactions"),
+    "prices": ("get_current_prices", "check_price"),
+}
+TRADE_OPERATIONS = ("create_account", "deposit", "withdraw", "buy", "sell")
+OPERATIONS = tuple(HANDLER_NAMES)
+
+# Relative weights of the operations each kind of user performs after creating an account
+PROFILES = {
+    "balanced": {"deposit": 2, "withdraw": 1, "buy": 3, "sell": 2, "summary": 4, "history": 2, "prices": 1},
+    "trader": {"deposit": 1, "withdraw": 1, "buy": 6, "sell": 5, "summary": 1, "prices": 2},
+    "viewer": {"summary": 6, "history": 4, "prices": 2},
+}
+DEFAULT_MIX = {"balanced": 1.0}
+SYMBOLS = ("AAPL", "TSLA", "GOOGL")
+
+# Latency histogram buckets: upper bounds doubling from 1us to ~17s
+HISTOGRAM_BOUNDS = [1e-6 * 2 ** i for i in range(25)]
+
+
+def find_app_variants(root="."):
+    """Returns {name: directory} for output/ and every example_output_* directory under root with an app.py."""
+    variants = {}
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if (name == "output" or name.startswith("example_output")) and os.path.isfile(os.path.join(directory, "app.py")):
+            variants[name] = directory
+    return variants
+
+
+def load_app(app_dir):
+    """Imports app.py from app_dir, with app_dir first on sys.path so its sibling modules resolve."""
+    app_dir = os.path.abspath(app_dir)
+    sys.path.insert(0, app_dir)
+    spec = importlib.util.spec_from_file_location("loadtest_app", os.path.join(app_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def resolve_handlers(app):
+    """Maps each operation the app supports to its handler function."""
+    handlers = {}
+    for operation, names in HANDLER_NAMES.items():
+        for name in names:
+            handler = getattr(app, name, None)
+            if callable(handler):
+                handlers[operation] = handler
+                break
+    return handlers
+
+
+def parse_mix(text):
+    """Parses "trader=0.3,viewer=0.7" into {profile: proportion}."""
+    mix = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        if name not in PROFILES:
+            raise ValueError(f"Unknown user profile '{name}'; choose from {', '.join(PROFILES)}")
+        mix[name] = float(share or 1)
+    return mix
+
+
+def _coerce(param, value):
+    """Converts a generated input value to the type a handler parameter is annotated with."""
+    if param.annotation in (int, float):
+        return param.annotation(value)
+    return str(value)
+
+
+def arguments_for(handler, operation, session_id, rng):
+    """Builds plausible user input for a handler from its parameter names."""
+    args = []
+    for param in inspect.signature(handler).parameters.values():
+        name = param.name
+        if name == "request":
+            args.append(SimpleNamespace(session_hash=session_id))
+        elif "deposit" in name or operation == "create_account" and name == "amount":
+            args.append(_coerce(param, 10000))
+        elif "user" in name:
+            args.append(_coerce(param, session_id))
+        elif "amount" in name:
+            args.append(_coerce(param, rng.randint(1, 500)))
+        elif "symbol" in name:
+            args.append(_coerce(param, rng.choice(SYMBOLS)))
+        elif "quantity" in name:
+            args.append(_coerce(param, rng.randint(1, 3)))
+        elif param.default is inspect.Parameter.empty:
+            args.append("")
+    return args
+
+
+def histogram(values):
+    """Counts values into HISTOGRAM_BOUNDS buckets; returns {upper bound in seconds: count} for non-empty buckets."""
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in values:
+        bucket = 0 if value <= HISTOGRAM_BOUNDS[0] else math.ceil(math.log2(value / HISTOGRAM_BOUNDS[0]))
+        counts[min(bucket, len(HISTOGRAM_BOUNDS))] += 1
+    bounds = HISTOGRAM_BOUNDS + [math.inf]
+    return {bounds[i]: count for i, count in enumerate(counts) if count}
+
+
+class LoadGenerator:
+    """Runs simulated users against an app module's handlers and records per-operation latency."""
+
+    def __init__(self, app, mix=None, seed=0):
+        self.app = app
+        self.handlers = resolve_handlers(app)
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.seed = seed
+        self.latencies = {}  # operation -> list of seconds
+        self.errors = 0
+        trade_limit = getattr(app, "TRADE_CONCURRENCY", None)
+        read_limit = getattr(app, "READ_CONCURRENCY", None)
+        self._limits = {
+            "trading": asyncio.Semaphore(trade_limit) if trade_limit else None,
+            "read": asyncio.Semaphore(read_limit) if read_limit else None,
+        }
+
+    async def call(self, operation, session_id, rng):
+        """Performs one operation as the given session and records how long it took."""
+        handler = self.handlers[operation]
+        args = arguments_for(handler, operation, session_id, rng)
+        limit = self._limits["trading" if operation in TRADE_OPERATIONS else "read"]
+        if limit is not None:
+            await limit.acquire()
+        start = time.perf_counter()
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception:
+            self.errors += 1
+            result = None
+        finally:
+            elapsed = time.perf_counter() - start
+            if limit is not None:
+                limit.release()
+        self.latencies.setdefault(operation, []).append(elapsed)
+        return result
+
+    def profile_for(self, index):
+        """Picks the profile of the index-th user so the population matches the mix proportions."""
+        total = sum(self.mix.values())
+        position = (index * 0.6180339887 % 1) * total  # Low-discrepancy spread over users
+        for name, share in self.mix.items():
+            if position < share:
+                return name
+            position -= share
+        return name
+
+    async def user(self, index, ops):
+        """Simulates one user: create an account, then perform ops operations drawn from its profile."""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        session_id = f"loadtest-{index}"
+        weights = {op: weight for op, weight in PROFILES[self.profile_for(index)].items() if op in self.handlers}
+        await self.call("create_account", session_id, rng)
+        for operation in rng.choices(list(weights), list(weights.values()), k=ops):
+            await self.call(operation, session_id, rng)
+            # Yield so users interleave the way concurrent requests would
+            await asyncio.sleep(0)
+
+    async def run(self, users, ops):
+        """Runs users concurrent users and returns the wall-clock duration in seconds."""
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user(index, ops) for index in range(users)))
+        return time.perf_counter() - start
+
+    def report(self, duration, memory=None):
+        """Summarizes throughput, per-operation latency and, if measured, memory growth."""
+        operations = {}
+        total = 0
+        for operation in OPERATIONS:
+            values = sorted(self.latencies.get(operation, ()))
+            if not values:
+                continue
+            total += len(values)
+            operations[operation] = {
+                "calls": len(values),
+                "p50": percentile(values, 0.50),
+                "p99": percentile(values, 0.99),
+                "max": values[-1],
+                "histogram": {str(bound): count for bound, count in histogram(values).items()},
+            }
+        return {
+            "duration": duration,
+            "calls": total,
+            "throughput": total / duration if duration else 0.0,
+            "errors": self.errors,
+            "memory": memory,
+            "operations": operations,
+        }
+
+
+def run_load_test(app_dir, users, ops, mix=None, seed=0, measure_memory=True):
+    """Loads an app and runs a load test against it in this process; returns the report."""
+    if measure_memory:
+        tracemalloc.start()
+    app = load_app(app_dir)
+    generator = LoadGenerator(app, mix=mix, seed=seed)
+    before = tracemalloc.get_traced_memory()[0] if measure_memory else 0
+    duration = asyncio.run(generator.run(users, ops))
+    memory = None
+    if measure_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"growth": current - before, "peak": peak - before, "per_user": (current - before) / max(users, 1)}
+    return generator.report(duration, memory)
+
+
+def run_variants(variants, users, ops, mix_text, seed, measure_memory):
+    """Runs each app variant in its own subprocess, so their modules and global state stay apart."""
+    reports = {}
+    for name, directory in variants.items():
+        command = [sys.executable, "-m", "engineering_team.loadtest", "--app-dir", directory,
+                   "--users", str(users), "--ops", str(ops), "--mix", mix_text, "--seed", str(seed), "--json"]
+        if not measure_memory:
+            command.append("--no-memory")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            reports[name] = {"failed": completed.stderr.strip().splitlines()[-1:] or ["unknown error"]}
+            continue
+        reports[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return reports
+
+
+def format_report(report):
+    """Renders one load test report as plain text, with a latency histogram per operation."""
+    lines = [
+        f"{report['calls']} calls in {report['duration']:.2f}s "
+        f"({report['throughput']:.0f} calls/s, {report['errors']} errors)",
+    ]
+    memory = report.get("memory")
+    if memory:
+        lines.append(f"memory: +{memory['growth'] / 1024:.0f} KiB retained "
+                     f"({memory['per_user']:.0f} B/user), peak +{memory['peak'] / 1024:.0f} KiB")
+    lines.append(f"{'operation':<16}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, stats in report["operations"].items():
+        lines.append(f"{operation:<16}{stats['calls']:>8}{stats['p50'] * 1e3:>10.3f}"
+                     f"{stats['p99'] * 1e3:>10.3f}{stats['max'] * 1e3:>10.3f}")
+    for operation, stats in report["operations"].items():
+        peak = max(stats["histogram"].values())
+        lines.append(f"\n{operation} latency")
+        for bound, count in stats["histogram"].items():
+            label = "inf" if bound == "inf" else f"{float(bound) * 1e3:.3f}"
+            lines.append(f"  <= {label:>10} ms {count:>8} {'#' * max(1, round(40 * count / peak))}")
+    return "\n".join(lines)
+
+
+def format_comparison(reports):
+    """Renders a side-by-side table of several variants' reports."""
+    columns = [op for op in OPERATIONS if any(op in r.get("operations", {}) for r in reports.values())]
+    header = ["variant", "calls/s", "errors", "KiB retained"] + [f"{op} p50/p99 ms" for op in columns]
+    rows = [header]
+    for name, report in reports.items():
+        if "failed" in report:
+            rows.append([name, "failed: " + " ".join(report["failed"])])
+            continue
+        memory = report.get("memory")
+        row = [name, f"{report['throughput']:.0f}", str(report["errors"]),
+               "-" if not memory else f"{memory['growth'] / 1024:.0f}"]
+        for op in columns:
+            stats = report["operations"].get(op)
+            row.append("-" if stats is None else f"{stats['p50'] * 1e3:.3f}/{stats['p99'] * 1e3:.3f}")
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows if i < len(row)) for i in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive generated apps' Gradio handlers with simulated users.")
+    parser.add_argument("--app-dir", default="output", help="directory containing app.py (default: %(default)s)")
+    parser.add_argument("--variant", action="append",
+                        help="compare these app variants, each in its own process; 'all' for every one found")
+    parser.add_argument("--root", default=".", help="directory containing output/ and example_output_*/")
+    parser.add_argument("--users", type=int, default=1000, help="concurrent simulated users (default: %(default)s)")
+    parser.add_argument("--ops", type=int, default=20, help="operations per user after creating an account (default: %(default)s)")
+    parser.add_argument("--mix", default="balanced=1",
+                        help=f"user profile proportions, e.g. trader=0.3,viewer=0.7; profiles: {', '.join(PROFILES)}")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the user scripts")
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring memory growth")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    if args.variant:
+        variants = find_app_variants(args.root)
+        if "all" not in args.variant:
+            variants = {name: path for name, path in variants.items() if name in args.variant}
+        reports = run_variants(variants, args.users, args.ops, args.mix, args.seed, not args.no_memory)
+        print(json.dumps(reports) if args.json else format_comparison(reports))
+        return 0
+
+    report = run_load_test(args.app_dir, args.users, args.ops, mix, args.seed, not args.no_memory)
+    print(json.dumps(report) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,18 @@
 import sys
 import warnings
 import os
+import time
 from datetime import datetime
 
+from engineering_team.analytics import HISTORY_FILE, RunHistory, TaskRecord, task_records
+from engineering_team.artifacts import STORE_DIR, ArtifactStore
+from engineering_team.context import format_task_report
 from engineering_team.crew import EngineeringTeam
+from engineering_team.hedging import format_report
+from engineering_team.knowledge import INDEX_DIR, KNOWLEDGE_DIR, relevant_knowledge
+from engineering_team.project import build_project, format_schedule
+from engineering_team.prompt_cache import format_report as format_cache_report
+from engineering_team.quality_gate import optimize
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -25,20 +34,76 @@ The system should prevent the user from withdrawing funds that would leave them
 """
 module_name = "accounts.py"
 class_name = "Account"
+# Rounds in which the backend engineer may revise the module after the quality gate has tested and benchmarked it
+optimization_rounds = 2
+# Start the frontend and tests from the design's interface while the module is written, patching them if it differs
+speculative = False
+# Let the engineering lead split the work into a package of modules, written and tested by parallel crews
+multi_module = False
+package_name = "trading"
 
 
 def run():
     """
     Run the research crew.
     """
+    generate(requirements, module_name, class_name)
+
+
+def generate(requirements, module_name, class_name, knowledge_dir=KNOWLEDGE_DIR, index_dir=INDEX_DIR,
+             store_dir=STORE_DIR, history_file=HISTORY_FILE):
+    """Generates, tests and optimizes a module in ./output, or a package in multi_module mode.
+
+    The resulting output/ tree is then stored as a run in the artifact store in store_dir,
+    and the run's timings, tokens and test results are recorded in history_file.
+    """
+    started = time.time()
+    os.makedirs('output', exist_ok=True)
     inputs = {
         'requirements': requirements,
         'module_name': module_name,
-        'class_name': class_name
+        'class_name': class_name,
+        # Only the snippets of knowledge/ closest to the requirements, not the whole knowledge base
+        'knowledge': relevant_knowledge(requirements, knowledge_dir, index_dir=index_dir) or 'None'
     }
 
+    if multi_module:
+        jobs, results, team = build_project(inputs, package_name)
+        print(format_schedule(jobs, results))
+        print(format_report(team.hedge_stats))
+        print(format_cache_report(team.prompt_cache_stats))
+        artifacts = ArtifactStore(store_dir).snapshot('output', label=package_name)
+        print(f"Stored as run {artifacts}")
+        records = [TaskRecord(job.name, None, None, results[job.name].end - results[job.name].start,
+                              None, None, None, None) for job in jobs]
+        RunHistory(history_file).record(started, time.time() - started, 'multi_module', package_name, records,
+                                        artifacts=artifacts)
+        return
+
     # Create and run the crew
-    result = EngineeringTeam().crew().kickoff(inputs=inputs)
+    team = EngineeringTeam(speculative=speculative)
+    crew = team.crew()
+    result = crew.kickoff(inputs=inputs)
+    print(format_task_report(crew.tasks))
+    print(format_report(team.hedge_stats))
+    print(format_cache_report(team.prompt_cache_stats))
+
+    # Feed test and benchmark findings back to the backend engineer, keeping the fastest passing version
+    def optimization_round(code, feedback):
+        team.optimization_crew().kickoff(inputs={**inputs, 'code': code, 'feedback': feedback})
+
+    gate = optimize(optimization_round, os.path.join('output', module_name),
+                    os.path.join('output', f'test_{module_name}'), optimization_rounds)
+
+    # The final files, and each task's raw output as the crew produced it
+    tasks = {task.name: task.output.raw for task in crew.tasks if task.output}
+    artifacts = ArtifactStore(store_dir).snapshot('output', label=module_name, tasks=tasks)
+    print(f"Stored as run {artifacts}")
+    usage = crew.usage_metrics
+    RunHistory(history_file).record(
+        started, time.time() - started, 'speculative' if speculative else 'sequential', module_name,
+        task_records(crew.tasks, team.agents_config), usage.prompt_tokens if usage else None,
+        usage.completion_tokens if usage else None, gate.tests_run, gate.failures, artifacts)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""Multi-module packages, built by parallel per-module crews.
+
+In this mode the engineering lead designs a package of several modules (plan_task) and ends
+the design with a module plan: a yaml block listing each module's file, main class and the
+modules it imports. build_project turns the plan into jobs:
+- code:<module>, in which the backend engineer writes the module, given the design and the
+  public interface of the modules it depends on, so it waits for their code jobs;
+- test:<module>, in which the test engineer writes its tests from its interface, so it
+  waits only for the module's own code job.
+
+run_jobs starts every job as soon as the jobs it depends on have finished, so the wall time
+follows the plan's critical path rather than the number of modules. A job whose
+dependency failed is skipped. Finally assemble_package writes the package's __init__.py.
+
+Without arguments, the CLI replays a sample plan with fixed job durations and compares the
+schedule's wall time with running the jobs one after another; with a design file, it
+replays that design's plan:
+
+    project --workers 4
+    project output/trading_design.md --code 0.3 --test 0.2
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+from engineering_team.context import public_api, strip_code_fences
+from engineering_team.crew import EngineeringTeam
+
+# name and depends_on are file names, such as accounts.py
+Module = namedtuple("Module", "name class_name description depends_on")
+Job = namedtuple("Job", "name depends_on run")
+# start and end are seconds since the schedule started; error is None for a job that succeeded
+JobResult = namedtuple("JobResult", "start end error")
+
+WORKERS = 4
+
+_YAML_BLOCK = re.compile(r"```ya?ml[ \t]*\n(.*?)\n[ \t]*```", re.DOTALL)
+
+SAMPLE_PLAN = """
+```yaml
+modules:
+  - name: pricing.py
+    class: PriceService
+    description: Share prices, with a test implementation for AAPL, TSLA and GOOGL
+    depends_on: []
+  - name: persistence.py
+    class: Store
+    description: Saves and loads accounts and their transactions
+    depends_on: []
+  - name: accounts.py
+    class: Account
+    description: Deposits, withdrawals, trades and the checks that keep them valid
+    depends_on: [pricing.py, persistence.py]
+  - name: reporting.py
+    class: Reporter
+    description: Holdings, portfolio value and profit or loss over time
+    depends_on: [accounts.py, pricing.py]
+```
+"""
+
+
+def _file_name(name):
+    name = str(name).strip()
+    return name if name.endswith(".py") else f"{name}.py"
+
+
+def parse_module_plan(design):
+    """Reads the module plan from the last yaml block of a design that has a modules list.
+
+    Returns:
+        [Module] in an order in which every module comes after those it depends on.
+
+    Raises:
+        ValueError: If there is no plan, or it has unknown dependencies or a cycle.
+    """
+    for block in reversed(_YAML_BLOCK.findall(design)):
+        try:
+            plan = yaml.safe_load(block)
+        except yaml.YAMLError:
+            continue
+        if isinstance(plan, dict) and isinstance(plan.get("modules"), list):
+            break
+    else:
+        raise ValueError("The design has no module plan")
+    modules = [
+        Module(_file_name(entry["name"]), entry.get("class") or entry.get("class_name"),
+               entry.get("description", ""), tuple(_file_name(name) for name in entry.get("depends_on") or ()))
+        for entry in plan["modules"]
+    ]
+    return dependency_order(modules)
+
+
+def dependency_order(modules):
+    """Orders modules so that each comes after the modules it depends on, keeping the plan's order otherwise.
+
+    Raises:
+        ValueError: If a module depends on one that is not in the plan, or the dependencies form a cycle.
+    """
+    names = {module.name for module in modules}
+    for module in modules:
+        unknown = set(module.depends_on) - names
+        if unknown:
+            raise ValueError(f"{module.name} depends on modules missing from the plan: {', '.join(sorted(unknown))}")
+    ordered = []
+    placed = set()
+    remaining = list(modules)
+    while remaining:
+        ready = [module for module in remaining if set(module.depends_on) <= placed]
+        if not ready:
+            raise ValueError(f"Circular imports between {', '.join(module.name for module in remaining)}")
+        ordered.extend(ready)
+        placed.update(module.name for module in ready)
+        remaining = [module for module in remaining if module.name not in placed]
+    return ordered
+
+
+def module_jobs(modules, write_code, write_tests):
+    """The code and test jobs of a plan, in dependency order; write_code and write_tests take a Module."""
+    jobs = []
+    for module in modules:
+        jobs.append(Job(f"code:{module.name}", tuple(f"code:{name}" for name in module.depends_on),
+                        lambda module=module: write_code(module)))
+    for module in modules:
+        jobs.append(Job(f"test:{module.name}", (f"code:{module.name}",), lambda module=module: write_tests(module)))
+    return jobs
+
+
+def run_jobs(jobs, workers=WORKERS):
+    """Runs each job once the jobs it depends on have succeeded, up to workers at a time.
+
+    Jobs must come after the jobs they depend on. A job whose dependency failed or was
+    skipped is skipped itself.
+
+    Returns:
+        {job name: JobResult}
+    """
+    results = {}
+    start = time.perf_counter()
+    pending = list(jobs)
+    running = {}
+
+    def now():
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            waiting = []
+            for job in pending:
+                failed = [name for name in job.depends_on if name in results and results[name].error]
+                if failed:
+                    results[job.name] = JobResult(now(), now(), f"skipped: {failed[0]} did not succeed")
+                elif all(name in results for name in job.depends_on):
+                    running[pool.submit(job.run)] = (job, now())
+                else:
+                    waiting.append(job)
+            pending = waiting
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, started = running.pop(future)
+                error = future.exception()
+                results[job.name] = JobResult(started, now(), None if error is None else f"{type(error).__name__}: {error}")
+    return results
+
+
+def critical_path(jobs, results):
+    """The chain of dependent jobs with the longest total duration.
+
+    Returns:
+        (seconds, [job names])
+    """
+    longest = {}  # {job name: (seconds, path)} of the longest chain ending with the job
+    for job in jobs:
+        result = results[job.name]
+        before = max((longest[name] for name in job.depends_on), default=(0.0, []))
+        longest[job.name] = (before[0] + result.end - result.start, before[1] + [job.name])
+    return max(longest.values(), default=(0.0, []))
+
+
+def assemble_package(directory, package, modules):
+    """Writes the package's __init__.py, exporting the main class of each module that was written."""
+    lines = [f'"""The {package} package."""']
+    exported = []
+    for module in modules:
+        if os.path.exists(os.path.join(directory, module.name)):
+            lines.append(f"from .{module.name[:-3]} import {module.class_name}")
+            exported.append(module.class_name)
+    lines.append("")
+    lines.append(f"__all__ = {exported!r}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "__init__.py"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def format_schedule(jobs, results):
+    """Renders each job's timing and outcome, and the wall time against running the jobs in turn."""
+    lines = [f"{'job':<32}{'start s':>9}{'end s':>9}  outcome"]
+    for job in jobs:
+        result = results[job.name]
+        lines.append(f"{job.name:<32}{result.start:>9.2f}{result.end:>9.2f}  {result.error or 'ok'}")
+    wall = max((result.end for result in results.values()), default=0.0)
+    sequential = sum(result.end - result.start for result in results.values())
+    length, path = critical_path(jobs, results)
+    lines.append(f"wall {wall:.2f}s, one after another {sequential:.2f}s, "
+                 f"critical path {length:.2f}s: {' -> '.join(path)}")
+    return "\n".join(lines)
+
+
+def build_project(inputs, package, workers=WORKERS):
+    """Designs, plans and builds a package in output/<package> with one crew per job.
+
+    Args:
+        inputs: The crew inputs: requirements and knowledge.
+
+    Returns:
+        (the jobs, their JobResults, the lead's EngineeringTeam, whose stats all the crews share)
+    """
+    lead = EngineeringTeam()
+    inputs = {**inputs, "package": package}
+    design = lead.planning_crew().kickoff(inputs=inputs).raw
+    modules = parse_module_plan(design)
+    sources = {}
+
+    def team():
+        # Each job gets its own agents; the stats are shared
+        return EngineeringTeam(hedge_stats=lead.hedge_stats, prompt_cache_stats=lead.prompt_cache_stats)
+
+    def module_inputs(module):
+        return {**inputs, "design": design, "module_name": module.name, "class_name": module.class_name}
+
+    def write_code(module):
+        dependencies = "\n\n".join(f"# {package}/{name}\n{public_api(sources[name])}" for name in module.depends_on)
+        result = team().module_code_crew().kickoff(inputs={**module_inputs(module), "dependencies": dependencies or "None"})
+        sources[module.name] = strip_code_fences(result.raw)
+
+    def write_tests(module):
+        team().module_test_crew().kickoff(inputs={**module_inputs(module), "interface": public_api(sources[module.name])})
+
+    jobs = module_jobs(modules, write_code, write_tests)
+    results = run_jobs(jobs, workers)
+    assemble_package(os.path.join("output", package), package, modules)
+    return jobs, results, lead
+
+
+def simulate(design=SAMPLE_PLAN, code_seconds=0.2, test_seconds=0.1, workers=WORKERS):
+    """Schedules a design's plan with jobs that only sleep for a fixed duration.
+
+    Returns:
+        (jobs, {job name: JobResult})
+    """
+    modules = parse_module_plan(design)
+    jobs = module_jobs(modules, lambda module: time.sleep(code_seconds), lambda module: time.sleep(test_seconds))
+    return jobs, run_jobs(jobs, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the schedule of a package's module plan.")
+    parser.add_argument("design", nargs="?", help="design ending with a module plan (default: a sample plan)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="jobs run at once (default: %(default)s)")
+    parser.add_argument("--code", type=float, default=0.2, help="seconds per code job (default: %(default)s)")
+    parser.add_argument("--test", type=float, default=0.1, help="seconds per test job (default: %(default)s)")
+    args = parser.parse_args(argv)
+    design = SAMPLE_PLAN
+    if args.design:
+        with open(args.design) as f:
+            design = f.read()
+    try:
+        jobs, results = simulate(design, args.code, args.test, args.workers)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(format_schedule(jobs, results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
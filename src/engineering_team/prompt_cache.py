@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+"""Provider-side caching of the prompt prefixes the agents resend on every call.
+
+crewAI sends each call as a system message, made of the agent's role, backstory, goal and
+answer format, followed by the task prompt and, later in the agent's loop, its earlier
+turns. The agent definitions in agents.yaml no longer mention the module or class name, so
+the system message is the same for every spec of a batch. The task prompt is the same for
+every call of one task. Providers can cache both:
+- Anthropic caches up to explicit breakpoints, at most MAX_BREAKPOINTS per request.
+  mark_cache_breakpoints() puts them after the system message, after the task prompt and
+  after the latest turn.
+- OpenAI caches prefixes of 1024 tokens or more by itself; the layout is all it needs.
+
+PromptCachingLLM marks the breakpoints and records, per agent, the prompt tokens read from
+the provider's cache and the time to the first streamed token. SimulatedProvider models
+both kinds of caching locally, so the effect can be measured without an API key:
+
+    prompt_cache --specs 20
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import yaml
+from crewai.utilities import I18N
+from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+from litellm.integrations.custom_logger import CustomLogger
+
+from engineering_team.context import count_tokens, message_text
+from engineering_team.ratelimit import RateLimitedLLM
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "config")
+CACHE_CONTROL = {"type": "ephemeral"}
+# Anthropic rejects requests with more cache breakpoints than this
+MAX_BREAKPOINTS = 4
+
+# Provider behaviour assumed by SimulatedProvider, in tokens of CHARS_PER_TOKEN characters
+CHARS_PER_TOKEN = 4
+MIN_CACHED_TOKENS = 1024
+AUTOMATIC_CACHE_STEP = 128
+BASE_TTFT = 0.3
+PREFILL_SECONDS_PER_TOKEN = 0.0002
+CACHED_PREFILL_SECONDS_PER_TOKEN = 0.00002
+CACHED_TOKEN_PRICE = 0.1
+CACHE_WRITE_PRICE = 1.25
+
+
+def uses_breakpoints(model):
+    """Whether a model's provider caches only up to marked breakpoints (Anthropic) rather than automatically."""
+    return model.startswith("anthropic/") or model.startswith("claude")
+
+
+def mark_cache_breakpoints(messages, model):
+    """Marks the ends of the system message, the task prompt and the latest turn as cache breakpoints.
+
+    Messages are returned unchanged for providers that cache automatically. The marked
+    messages get their content as a single text block carrying cache_control. Breakpoints
+    the messages already carry count towards MAX_BREAKPOINTS; past it, the latest turn and
+    then the task prompt are left unmarked.
+    """
+    if not uses_breakpoints(model) or isinstance(messages, str):
+        return messages
+    existing = sum(1 for message in messages if isinstance(message["content"], list)
+                   for block in message["content"] if isinstance(block, dict) and "cache_control" in block)
+    marked = set()
+    system = next((i for i, message in enumerate(messages) if message["role"] == "system"), None)
+    # After the system message: crewAI puts a placeholder user message before it for Anthropic
+    after = 0 if system is None else system + 1
+    prompt = next((i for i in range(after, len(messages)) if messages[i]["role"] != "system"), None)
+    for index in (system, prompt, len(messages) - 1):
+        if index is not None and isinstance(messages[index]["content"], str) \
+                and len(marked) + existing < MAX_BREAKPOINTS:
+            marked.add(index)
+    return [
+        {**message, "content": [{"type": "text", "text": message["content"], "cache_control": CACHE_CONTROL}]}
+        if index in marked else message
+        for index, message in enumerate(messages)
+    ]
+
+
+def _field(value, name):
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def cached_tokens(usage):
+    """Prompt tokens a provider served from its cache, from an OpenAI- or Anthropic-style usage report."""
+    if usage is None:
+        return 0
+    details = _field(usage, "prompt_tokens_details")
+    cached = _field(details, "cached_tokens") if details is not None else None
+    return int(cached or _field(usage, "cache_read_input_tokens") or 0)
+
+
+class PromptCacheStats:
+    """Per-agent prompt sizes, cache reads and times to first token."""
+
+    def __init__(self):
+        self.agents = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent, prompt_tokens, cached, ttft, cost=None):
+        """Adds one call; cost is its prompt price in uncached tokens, by default at CACHED_TOKEN_PRICE for cached ones."""
+        with self._lock:
+            row = self.agents.setdefault(agent, {"calls": 0, "hits": 0, "prompt_tokens": 0,
+                                                 "cached_tokens": 0, "ttft": 0.0, "cost": 0.0})
+            row["calls"] += 1
+            row["hits"] += bool(cached)
+            row["prompt_tokens"] += prompt_tokens
+            row["cached_tokens"] += cached
+            row["ttft"] += ttft
+            row["cost"] += prompt_tokens - cached * (1 - CACHED_TOKEN_PRICE) if cost is None else cost
+
+
+def format_report(stats):
+    """Renders hit rate, cached share of prompt tokens, mean time to first token and relative prompt cost per agent."""
+    lines = [f"{'agent':<20}{'calls':>7}{'hit rate':>10}{'cached':>9}{'ttft s':>9}{'cost':>7}"]
+    for agent, row in stats.agents.items():
+        tokens = max(row["prompt_tokens"], 1)
+        lines.append(f"{agent:<20}{row['calls']:>7}{row['hits'] / row['calls']:>10.0%}"
+                     f"{row['cached_tokens'] / tokens:>9.0%}{row['ttft'] / row['calls']:>9.2f}"
+                     f"{row['cost'] / tokens:>7.0%}")
+    return "\n".join(lines)
+
+
+class _UsageRecorder(CustomLogger):
+    """Keeps the usage report of a call; crewAI passes it to callbacks for streaming and non-streaming calls alike."""
+
+    def __init__(self):
+        super().__init__()
+        self.usage = None
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self.usage = _field(response_obj, "usage")
+
+
+class PromptCachingLLM(RateLimitedLLM):
+    """A rate-limited LLM that marks cache breakpoints and records cache use for its agent."""
+
+    def __init__(self, *args, agent=None, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.agent = agent or self.model
+        self.stats = stats or PromptCacheStats()
+        self._first_token = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        recorder = _UsageRecorder()
+        self._first_token = None
+        start = time.perf_counter()
+        response = super().call(messages, tools, [*(callbacks or []), recorder], available_functions)
+        ttft = (self._first_token or time.perf_counter()) - start
+        prompt_tokens = _field(recorder.usage, "prompt_tokens") or count_tokens(message_text(messages))
+        self.stats.record(self.agent, prompt_tokens, cached_tokens(recorder.usage), ttft)
+        return response
+
+    def _format_messages_for_provider(self, messages):
+        # Marked here rather than in call(), whose events only accept plain string content
+        return mark_cache_breakpoints(super()._format_messages_for_provider(messages), self.model)
+
+
+def _on_chunk(llm, event):
+    if isinstance(llm, PromptCachingLLM) and llm._first_token is None:
+        llm._first_token = time.perf_counter()
+
+
+_registered = False
+
+
+def track_prompt_caching():
+    """Registers the time-to-first-token handler on crewAI's event bus, once per process."""
+    global _registered
+    if not _registered:
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_chunk)
+        _registered = True
+
+
+class SimulatedProvider:
+    """A local model of provider prompt caching, latency and price.
+
+    With breakpoints, the longest prefix ending at a block boundary that an earlier call
+    marked is read from the cache, and longer marked prefixes are written to it.
+    Automatically, the longest prefix seen before is read, in steps of
+    AUTOMATIC_CACHE_STEP tokens. Either way only prefixes of at least
+    MIN_CACHED_TOKENS count.
+
+    Raises:
+        ValueError: From complete(), for more than MAX_BREAKPOINTS breakpoints, as Anthropic does.
+    """
+
+    def __init__(self, caching=True):
+        self.caching = caching
+        self._cache = set()
+
+    def _key(self, text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def complete(self, model, messages):
+        """Returns (prompt tokens, cached tokens, time to first token, cost relative to the uncached prompt)."""
+        text = ""
+        ends = []  # Character offsets of the ends of blocks, and of those marked as breakpoints
+        marks = []
+        for message in messages:
+            content = message["content"]
+            blocks = content if isinstance(content, list) else [{"text": content}]
+            for block in blocks:
+                text += block["text"]
+                ends.append(len(text))
+                if "cache_control" in block:
+                    marks.append(len(text))
+        if len(marks) > MAX_BREAKPOINTS:
+            raise ValueError(f"{len(marks)} cache breakpoints; at most {MAX_BREAKPOINTS} are allowed")
+        minimum = MIN_CACHED_TOKENS * CHARS_PER_TOKEN
+        if uses_breakpoints(model):
+            # Reads also find prefixes an earlier call marked, such as the previous latest turn
+            reads = [end for end in ends if end >= minimum]
+            writes = [end for end in marks if end >= minimum]
+        else:
+            step = AUTOMATIC_CACHE_STEP * CHARS_PER_TOKEN
+            reads = writes = list(range(minimum, len(text) + 1, step))
+        cached = 0
+        written = 0
+        if self.caching:
+            cached = max((end for end in reads if self._key(text[:end]) in self._cache), default=0)
+            for end in writes:
+                if end > cached:
+                    self._cache.add(self._key(text[:end]))
+                    written = end
+        prompt_tokens = len(text) // CHARS_PER_TOKEN
+        cached_tokens = cached // CHARS_PER_TOKEN
+        uncached = prompt_tokens - cached_tokens
+        ttft = BASE_TTFT + uncached * PREFILL_SECONDS_PER_TOKEN + cached_tokens * CACHED_PREFILL_SECONDS_PER_TOKEN
+        # Anthropic charges extra for the part of the prompt it writes to the cache
+        write_surcharge = (CACHE_WRITE_PRICE - 1) * max(0, written - cached) // CHARS_PER_TOKEN \
+            if uses_breakpoints(model) else 0
+        cost = uncached + cached_tokens * CACHED_TOKEN_PRICE + write_surcharge
+        return prompt_tokens, cached_tokens, ttft, cost
+
+
+# Stand-ins for the text that differs between specs and tasks
+_SPEC = ("Spec {index}: a system for {domain} where users create records, update them and list their history; "
+         "it must validate every change and report totals at any time. ")
+_CONTEXT_CHARS = {"design_task": 0, "code_task": 8_000, "frontend_task": 2_500, "test_task": 2_500}
+_TURN = "Thought: I will check my work against the requirements before answering.\nObservation: {note}\n"
+
+
+def _prompts(agents, tasks, index, task_name):
+    """The system and task messages crewAI would send for one task of one spec (without tools)."""
+    i18n = I18N()
+    inputs = {"requirements": _SPEC.format(index=index, domain=f"domain {index}") * 8,
+              "module_name": f"module_{index}.py", "class_name": f"Model{index}",
+              "knowledge": "None"}
+    task = tasks[task_name]
+    agent = agents[task["agent"]]
+    system = i18n.slice("role_playing").format(
+        role=agent["role"].format(**inputs), backstory=agent["backstory"].format(**inputs),
+        goal=agent["goal"].format(**inputs)) + i18n.slice("no_tools")
+    prompt = task["description"].format(**inputs) + "\n" + i18n.slice("expected_output").format(
+        expected_output=task["expected_output"].format(**inputs))
+    context = (f"output of the previous task for spec {index}. " * 200)[:_CONTEXT_CHARS[task_name]]
+    if context:
+        prompt = i18n.slice("task_with_context").format(task=prompt, context=context)
+    return agent, [{"role": "system", "content": system},
+                   {"role": "user", "content": i18n.slice("task").format(input=prompt)}]
+
+
+def simulate(specs, calls_per_task=3, caching=True):
+    """Runs the crew's four main tasks for a batch of specs against a SimulatedProvider.
+
+    Each task makes calls_per_task calls, each adding a turn to the conversation as the
+    agent's loop does.
+
+    Returns:
+        PromptCacheStats keyed by agent.
+    """
+    with open(os.path.join(CONFIG_DIR, "agents.yaml")) as f:
+        agents = yaml.safe_load(f)
+    with open(os.path.join(CONFIG_DIR, "tasks.yaml")) as f:
+        tasks = yaml.safe_load(f)
+    provider = SimulatedProvider(caching)
+    stats = PromptCacheStats()
+    for index in range(specs):
+        for task_name in _CONTEXT_CHARS:
+            agent_name = tasks[task_name]["agent"]
+            agent, messages = _prompts(agents, tasks, index, task_name)
+            for call in range(calls_per_task):
+                sent = mark_cache_breakpoints(messages, agent["llm"]) if caching else messages
+                prompt_tokens, cached, ttft, cost = provider.complete(agent["llm"], sent)
+                stats.record(agent_name, prompt_tokens, cached, ttft, cost)
+                messages = messages + [{"role": "assistant", "content": _TURN.format(note=f"call {call}") * 20}]
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate provider prompt caching for a batch of specs.")
+    parser.add_argument("--specs", type=int, default=20, help="specs in the batch (default: %(default)s)")
+    parser.add_argument("--calls", type=int, default=3, help="LLM calls per task (default: %(default)s)")
+    args = parser.parse_args(argv)
+    for caching in (False, True):
+        print("with prompt caching" if caching else "without prompt caching")
+        print(format_report(simulate(args.specs, args.calls, caching)))
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
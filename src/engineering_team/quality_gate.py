@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""Quality gate run on the generated backend module after the crew has written it.
+
+evaluate() runs the generated unit tests and the standard benchmark workload from
+benchmark.py against a module. It turns the timings into findings: which operations slow
+down as the transaction ledger grows, and how much memory each transaction costs.
+
+optimize() feeds those findings back to the backend engineer for a bounded number of rounds.
+Every candidate is evaluated in the same way, and the fastest candidate that fails no more
+tests than the best so far is written back to the module. The original module is a candidate
+too, so a round that breaks the tests or slows things down is simply discarded.
+
+    quality_gate --module output/accounts.py --tests output/test_accounts.py
+"""
+import argparse
+import itertools
+import math
+import sys
+from collections import namedtuple
+
+from engineering_team.benchmark import benchmark_module, load_module
+from engineering_team.suite_runner import format_results, run_suites
+
+GATE_SIZES = (1, 10_000)
+
+# An operation whose cost at the largest size exceeds this multiple of its cost on a fresh
+# account is reported as scaling with the ledger
+GROWTH_THRESHOLD = 4.0
+
+GateResult = namedtuple("GateResult", "tests_run failures test_output benchmark score findings")
+
+# Each candidate is imported under a fresh name so an earlier version is never reused from sys.modules
+_candidates = itertools.count()
+
+
+def run_tests(test_path):
+    """Runs the generated unit tests with the parallel, caching test runner.
+
+    Returns:
+        (tests run, failures and errors, the runner's output)
+    """
+    try:
+        results = run_suites([test_path])
+    except SyntaxError as e:
+        # The tests cannot even be collected
+        return 0, 1, f"{type(e).__name__}: {e}"
+    outcomes = results[test_path].outcomes
+    failures = sum(outcome.status in ("fail", "error") for outcome in outcomes)
+    return len(outcomes), failures, format_results(results)
+
+
+def score(benchmark):
+    """Geometric mean of the per-call times at the largest benchmarked size; lower is faster."""
+    largest = benchmark[max(benchmark, key=int)]["operations"]
+    if not largest:
+        return math.inf
+    return math.exp(sum(math.log(max(seconds, 1e-12)) for seconds in largest.values()) / len(largest))
+
+
+def find_complexity_issues(benchmark):
+    """Describes the operations whose cost grows with the number of recorded transactions."""
+    sizes = sorted(benchmark, key=int)
+    smallest, largest = sizes[0], sizes[-1]
+    findings = []
+    for operation, seconds in benchmark[largest]["operations"].items():
+        baseline = benchmark[smallest]["operations"].get(operation)
+        if not baseline:
+            continue
+        growth = seconds / baseline
+        if growth < GROWTH_THRESHOLD:
+            continue
+        exponent = math.log(growth) / math.log(int(largest) / int(smallest))
+        findings.append(
+            f"{operation} takes {seconds * 1e6:.1f}us per call with {largest} transactions, "
+            f"{growth:.0f}x its cost on a fresh account (about O(n^{exponent:.1f}) in the ledger size); "
+            f"it should not rescan or copy the transaction history."
+        )
+    return findings
+
+
+def evaluate(module_path, test_path, sizes=GATE_SIZES, min_time=0.01, repeat=3):
+    """Tests and benchmarks a generated module.
+
+    Returns:
+        A GateResult; its score is math.inf when the module cannot be benchmarked.
+    """
+    tests_run, failures, test_output = run_tests(test_path)
+    findings = []
+    try:
+        module = load_module(module_path, f"quality_gate_candidate_{next(_candidates)}")
+        benchmark = benchmark_module(module, sizes=sizes, min_time=min_time, repeat=repeat)
+    except Exception as e:
+        benchmark = {}
+        findings.append(f"The benchmark workload failed: {type(e).__name__}: {e}")
+    if benchmark:
+        findings.extend(find_complexity_issues(benchmark))
+    return GateResult(tests_run, failures, test_output, benchmark,
+                      score(benchmark) if benchmark else math.inf, findings)
+
+
+def is_better(candidate, best):
+    """A candidate wins by failing fewer tests, or by being faster while failing no more."""
+    return (candidate.failures, candidate.score) < (best.failures, best.score)
+
+
+def format_feedback(result):
+    """Renders a gate result as the feedback given to the backend engineer."""
+    lines = [f"Unit tests: {result.tests_run - result.failures} of {result.tests_run} passed."]
+    if result.failures:
+        lines.append("Test output:\n" + result.test_output.strip()[-2000:])
+    if result.benchmark:
+        lines.append("Benchmark, seconds per call by number of recorded transactions:")
+        for size, entry in result.benchmark.items():
+            timings = ", ".join(f"{op}={seconds:.2e}" for op, seconds in entry["operations"].items())
+            lines.append(f"  {size}: {timings}")
+            memory = entry.get("memory_per_transaction")
+            if memory:
+                lines.append(f"  {size}: about {memory:.0f} bytes retained per transaction")
+    if result.findings:
+        lines.append("Findings:")
+        lines.extend(f"  - {finding}" for finding in result.findings)
+    else:
+        lines.append("No scaling problems were found.")
+    return "\n".join(lines)
+
+
+def optimize(run_round, module_path, test_path, rounds, log=print):
+    """Runs bounded optimization rounds and keeps the fastest passing version of the module.
+
+    Args:
+        run_round: Called with (current code, feedback text); must write a revised module to
+            module_path, as the optimization crew's task does.
+        module_path: The generated module.
+        test_path: The generated unit tests for it.
+        rounds: The maximum number of optimization rounds.
+        log: Receives one line of progress per round.
+
+    Returns:
+        The GateResult of the version left in module_path.
+    """
+    with open(module_path) as f:
+        best_code = f.read()
+    best = evaluate(module_path, test_path)
+    log(f"quality gate: original module, {best.failures} failing tests, score {best.score:.2e}s")
+
+    for round_number in range(1, rounds + 1):
+        if not best.failures and not best.findings:
+            break  # Nothing for the engineer to act on
+        run_round(best_code, format_feedback(best))
+        candidate = evaluate(module_path, test_path)
+        kept = is_better(candidate, best)
+        log(f"quality gate: round {round_number}, {candidate.failures} failing tests, "
+            f"score {candidate.score:.2e}s ({'kept' if kept else 'discarded'})")
+        if kept:
+            best = candidate
+            with open(module_path) as f:
+                best_code = f.read()
+
+    with open(module_path, "w") as f:
+        f.write(best_code)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test and benchmark a generated module and report findings.")
+    parser.add_argument("--module", default="output/accounts.py", help="generated module (default: %(default)s)")
+    parser.add_argument("--tests", default="output/test_accounts.py", help="its unit tests (default: %(default)s)")
+    args = parser.parse_args(argv)
+    result = evaluate(args.module, args.tests)
+    print(format_feedback(result))
+    return 1 if result.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
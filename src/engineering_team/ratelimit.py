@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+"""Process-wide rate limiting of LLM calls, per model, by requests and tokens.
+
+Every agent's LLM is a RateLimitedLLM, so concurrent crews in one process draw on the same
+token buckets instead of each discovering the provider's quota through 429 responses.
+Before each call, rate_limiter() is asked for one request plus the prompt's tokens and
+EXPECTED_COMPLETION_TOKENS. Once the response is in, the estimate is corrected to the
+tokens actually used.
+
+Quotas come from config/rate_limits.yaml. An entry is looked up by model, then by provider
+(the part before "/", "openai" for bare OpenAI model names). Models without an entry are
+not limited. Buckets belong to entries, so models that fall back to their provider's entry
+draw on one shared bucket, as they do on the provider's quota.
+
+Setting ENGINEERING_TEAM_RATE_LIMIT_STATE to a file path shares the buckets between processes
+too, through a JSON file held under an exclusive lock.
+
+A 429 that still gets through halves the model's rate and blocks it for the Retry-After
+time, or for an exponential backoff. Each successful call then adds back RECOVERY_STEP of
+the full rate. share_connections() gives OpenAI-compatible providers one process-wide
+keep-alive connection pool; litellm already caches one client per provider for the others.
+
+    ratelimit --crews 8 --calls 40      # simulate crews against a fake provider's quota
+"""
+import argparse
+import fcntl
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import yaml
+from crewai import LLM
+
+from engineering_team.context import count_tokens, message_text
+
+LIMITS_FILE = os.path.join(os.path.dirname(__file__), "config", "rate_limits.yaml")
+STATE_ENV = "ENGINEERING_TEAM_RATE_LIMIT_STATE"
+
+# Seconds of quota a bucket holds, so a burst after an idle spell stays within the provider's window
+BURST_SECONDS = 5.0
+EXPECTED_COMPLETION_TOKENS = 1_000
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+MIN_MULTIPLIER = 0.1
+RECOVERY_STEP = 0.05
+MAX_CONNECTIONS = 100
+MAX_NAIVE_BACKOFF = 2.0
+
+Limit = namedtuple("Limit", "requests_per_minute tokens_per_minute")
+
+
+class RateLimited(Exception):
+    """Raised by a fake provider, in place of litellm.RateLimitError, when a call exceeds its quota."""
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limit exceeded")
+        self.retry_after = retry_after
+
+
+def load_limits(path=LIMITS_FILE):
+    """Reads {model or provider: Limit} from a YAML file."""
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    return {name: Limit(entry["requests_per_minute"], entry["tokens_per_minute"]) for name, entry in config.items()}
+
+
+def provider(model):
+    return model.split("/", 1)[0] if "/" in model else "openai"
+
+
+class LocalState:
+    """Bucket state shared by the threads of one process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def bucket(self, key):
+        with self._lock:
+            yield self._buckets.setdefault(key, {})
+
+
+class FileState:
+    """Bucket state shared by processes through a JSON file under an exclusive flock."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()  # flock is per process; threads must also take turns
+
+    @contextmanager
+    def bucket(self, key):
+        with self._lock, open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                text = f.read()
+                state = json.loads(text) if text.strip() else {}
+                yield state.setdefault(key, {})
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()  # Before unlocking, not when the file is closed
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """Token buckets of requests and tokens per quota entry, with adaptive backoff.
+
+    The buckets refill continuously at the quota times the model's multiplier, which a 429
+    halves and each success raises by RECOVERY_STEP. They hold BURST_SECONDS of quota.
+    Time is wall-clock time, so buckets in a FileState mean the same to every process.
+    """
+
+    def __init__(self, limits, state=None, clock=time.time, sleep=time.sleep):
+        self.limits = limits
+        self.state = state or LocalState()
+        self.clock = clock
+        self.sleep = sleep
+
+    def limit_key(self, model):
+        """The quota entry, and so the bucket, model draws on: its own, else its provider's, else None."""
+        for key in (model, provider(model)):
+            if key in self.limits:
+                return key
+        return None
+
+    def limit_for(self, model):
+        key = self.limit_key(model)
+        return None if key is None else self.limits[key]
+
+    def _refill(self, bucket, limit, now):
+        requests = limit.requests_per_minute / 60
+        tokens = limit.tokens_per_minute / 60
+        if not bucket:
+            bucket.update(requests=requests * BURST_SECONDS, tokens=tokens * BURST_SECONDS,
+                          updated=now, multiplier=1.0, blocked_until=0.0, strikes=0)
+        elapsed = max(0.0, now - bucket["updated"]) * bucket["multiplier"]
+        bucket["requests"] = min(requests * BURST_SECONDS, bucket["requests"] + elapsed * requests)
+        bucket["tokens"] = min(tokens * BURST_SECONDS, bucket["tokens"] + elapsed * tokens)
+        bucket["updated"] = now
+        return requests * bucket["multiplier"], tokens * bucket["multiplier"]
+
+    def acquire(self, model, tokens):
+        """Blocks until model's quota allows one more request of `tokens` tokens, and takes it.
+
+        Returns:
+            The seconds spent waiting.
+        """
+        key = self.limit_key(model)
+        if key is None:
+            return 0.0
+        limit = self.limits[key]
+        waited = 0.0
+        while True:
+            with self.state.bucket(key) as bucket:
+                now = self.clock()
+                request_rate, token_rate = self._refill(bucket, limit, now)
+                # A request larger than the bucket waits for a full bucket rather than forever, and
+                # then overdraws it, so the callers after it wait until its tokens are paid back
+                needed = min(tokens, limit.tokens_per_minute / 60 * BURST_SECONDS)
+                wait = max(bucket["blocked_until"] - now,
+                           (1 - bucket["requests"]) / request_rate,
+                           (needed - bucket["tokens"]) / token_rate)
+                if wait <= 0:
+                    bucket["requests"] -= 1
+                    bucket["tokens"] -= tokens
+                    return waited
+            self.sleep(wait)
+            waited += wait
+
+    def settle(self, model, reserved, used):
+        """Corrects a successful call's token estimate to what it used, and recovers the rate."""
+        key = self.limit_key(model)
+        if key is None:
+            return
+        with self.state.bucket(key) as bucket:
+            self._refill(bucket, self.limits[key], self.clock())
+            bucket["tokens"] += reserved - used  # Overdrawn buckets make the next callers wait
+            bucket["multiplier"] = min(1.0, bucket["multiplier"] + RECOVERY_STEP)
+            bucket["strikes"] = 0
+
+    def throttled(self, model, retry_after=None):
+        """Backs model off after a 429: halves its rate and blocks it for retry_after or an exponential backoff."""
+        key = self.limit_key(model)
+        if key is None:
+            return
+        with self.state.bucket(key) as bucket:
+            now = self.clock()
+            self._refill(bucket, self.limits[key], now)
+            bucket["multiplier"] = max(MIN_MULTIPLIER, bucket["multiplier"] / 2)
+            backoff = retry_after if retry_after is not None else min(MAX_BACKOFF, BASE_BACKOFF * 2 ** bucket["strikes"])
+            bucket["strikes"] += 1
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + backoff)
+            bucket["requests"] = min(bucket["requests"], 0.0)
+
+
+def rate_limit_error(error):
+    """The rate-limit error behind error, if any; crewAI re-raises streaming failures as a plain Exception."""
+    import litellm
+
+    while error is not None:
+        if isinstance(error, (litellm.RateLimitError, RateLimited)):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def retry_after(error):
+    """Seconds from a rate-limit error's Retry-After header, if it has one."""
+    if isinstance(error, RateLimited):
+        return error.retry_after
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def limited_call(limiter, model, reserved, call, used=None, max_attempts=MAX_ATTEMPTS):
+    """Makes call() within model's quota, backing off and retrying when it is rate-limited anyway.
+
+    Args:
+        reserved: Estimated tokens of the call, taken from the bucket before it.
+        used: Function of the response giving the tokens actually used; reserved if omitted.
+    """
+    for attempt in range(max_attempts):
+        limiter.acquire(model, reserved)
+        try:
+            response = call()
+        except Exception as e:
+            limited = rate_limit_error(e)
+            if limited is None or attempt == max_attempts - 1:
+                raise
+            limiter.throttled(model, retry_after(limited))
+            continue
+        limiter.settle(model, reserved, reserved if used is None else used(response))
+        return response
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def rate_limiter():
+    """The process-wide RateLimiter, shared with other processes if ENGINEERING_TEAM_RATE_LIMIT_STATE is set."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            path = os.environ.get(STATE_ENV)
+            _limiter = RateLimiter(load_limits(), FileState(path) if path else LocalState())
+        return _limiter
+
+
+_shared_connections = False
+
+
+def share_connections(max_connections=MAX_CONNECTIONS):
+    """Gives litellm's OpenAI-compatible clients one keep-alive connection pool, once per process."""
+    global _shared_connections
+    if not _shared_connections:
+        import httpx
+        import litellm
+
+        litellm.client_session = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+        )
+        _shared_connections = True
+
+
+class RateLimitedLLM(LLM):
+    """An LLM whose calls go through the process-wide rate limiter."""
+
+    def __init__(self, *args, limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        prompt_tokens = count_tokens(message_text(messages))
+        return limited_call(
+            self.limiter or rate_limiter(), self.model,
+            prompt_tokens + (self.max_tokens or EXPECTED_COMPLETION_TOKENS),
+            lambda: super(RateLimitedLLM, self).call(messages, tools, callbacks, available_functions),
+            used=lambda response: prompt_tokens + count_tokens(str(response)),
+        )
+
+
+class FakeProvider:
+    """A local provider enforcing a quota the way a real one does: it answers 429 once a bucket is empty."""
+
+    def __init__(self, limit, latency=0.01):
+        self.limit = limit
+        self.latency = latency
+        self._limiter = RateLimiter({"fake": limit})
+        self.served = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def complete(self, tokens):
+        with self._limiter.state.bucket("fake") as bucket:
+            now = self._limiter.clock()
+            self._limiter._refill(bucket, self.limit, now)
+            if bucket["requests"] < 1 or bucket["tokens"] < tokens:
+                # Rejected calls count against the request quota too, as they do at OpenAI
+                bucket["requests"] = max(bucket["requests"] - 1, -self.limit.requests_per_minute / 60 * BURST_SECONDS)
+                with self._lock:
+                    self.rejected += 1
+                raise RateLimited()
+            bucket["requests"] -= 1
+            bucket["tokens"] -= tokens
+        time.sleep(self.latency)
+        with self._lock:
+            self.served += 1
+        return "ok"
+
+
+def simulate(crews, calls, tokens, limit, limited, naive_backoff=0.05):
+    """Runs crews concurrently against a FakeProvider, with the rate limiter or with a naive retry loop.
+
+    Returns:
+        (seconds, calls served, 429 responses)
+    """
+    fake = FakeProvider(limit)
+    limiter = RateLimiter({"fake": limit})
+
+    def naive():
+        # What a client does on its own: retry with exponential backoff and full jitter
+        for attempt in itertools.count():
+            try:
+                return fake.complete(tokens)
+            except RateLimited:
+                time.sleep(random.uniform(0, min(MAX_NAIVE_BACKOFF, naive_backoff * 2 ** attempt)))
+
+    def crew():
+        for _ in range(calls):
+            if limited:
+                limited_call(limiter, "fake", tokens, lambda: fake.complete(tokens), max_attempts=1_000)
+            else:
+                naive()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=crew) for _ in range(crews)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, fake.served, fake.rejected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent crews against a fake provider's rate limits.")
+    parser.add_argument("--crews", type=int, default=8, help="concurrent crews (default: %(default)s)")
+    parser.add_argument("--calls", type=int, default=40, help="calls per crew (default: %(default)s)")
+    parser.add_argument("--tokens", type=int, default=500, help="tokens per call (default: %(default)s)")
+    parser.add_argument("--rpm", type=int, default=1_200, help="provider's requests per minute (default: %(default)s)")
+    parser.add_argument("--tpm", type=int, default=600_000, help="provider's tokens per minute (default: %(default)s)")
+    args = parser.parse_args(argv)
+    limit = Limit(args.rpm, args.tpm)
+    quota = min(args.rpm / 60, args.tpm / 60 / args.tokens)
+    print(f"{args.crews} crews x {args.calls} calls, quota {quota:.1f} calls/s")
+    print(f"{'client':<14}{'seconds':>9}{'calls/s':>9}{'of quota':>10}{'429s':>7}")
+    for name, limited in (("naive retry", False), ("rate limiter", True)):
+        seconds, served, rejected = simulate(args.crews, args.calls, args.tokens, limit, limited)
+        # The provider allows its initial burst on top of the steady rate
+        allowed = quota * (seconds + BURST_SECONDS)
+        print(f"{name:<14}{seconds:>9.2f}{served / seconds:>9.1f}{served / allowed:>10.0%}{rejected:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""Speculative start of the frontend and test tasks from the design document.
+
+The engineering lead's design already spells out the module's interface: headings such as
+"#### `deposit(self, amount: float) -> None`" under "## Class: Account". design_interface()
+turns those signatures into the same kind of stub source that context.public_api() extracts
+from real code. In speculative mode (EngineeringTeam(speculative=True).crew()) the frontend
+and test engineers start from it while the backend engineer is still writing the module.
+
+When all three are done, interface_drift() compares the design's signatures with the real
+ones, and affected() reports the differences that a generated file actually depends on. A
+file that uses none of them is kept as it is. Otherwise a patch task is given the differences
+and revises only what they touch.
+
+    speculative --design output/accounts.py_design.md --module output/accounts.py output/app.py
+"""
+import argparse
+import ast
+import re
+import sys
+
+from engineering_team.context import public_api, strip_code_fences
+
+_CLASS_HEADING = re.compile(r"^#+\s*(?:class:?\s*`?|`?class\s+)([A-Za-z_]\w*)`?\s*$", re.IGNORECASE)
+_SIGNATURE = re.compile(r"`(?:def\s+)?([A-Za-z_]\w*\s*\(.*?\)(?:\s*->\s*[^`]+)?)`")
+_CODE_BLOCK = re.compile(r"```python\s*\n(.*?)\n\s*```", re.DOTALL)
+
+
+def _parses(source):
+    try:
+        ast.parse(source)
+    except SyntaxError:
+        return False
+    return True
+
+
+def _stub(signature, indent=""):
+    """A def with an "..." body, or None if the signature is not valid Python."""
+    for candidate in (signature, re.sub(r"\s*->.*$", "", signature)):
+        source = f"{indent}def {candidate}:\n{indent}    ...\n"
+        if _parses(f"class _:\n{source}" if indent else source):
+            return source
+    return None
+
+
+def design_interface(markdown):
+    """Extracts the module interface a design document describes, as stub Python source.
+
+    Signatures are taken from Markdown headings, where the design template puts them;
+    one whose first parameter is self or cls belongs to the class of the nearest
+    "Class:" heading above it. Python code blocks in the design are added as they are.
+    Signatures that are not valid Python are skipped.
+    """
+    markdown = strip_code_fences(markdown.strip())
+    classes = {}
+    functions = []
+    current = None
+    for line in markdown.splitlines():
+        if not line.lstrip().startswith("#"):
+            continue
+        heading = line.strip()
+        match = _SIGNATURE.search(heading)
+        if match is None:
+            match = _CLASS_HEADING.match(heading)
+            if match is not None:
+                current = match.group(1)
+                classes.setdefault(current, [])
+            continue
+        signature = match.group(1).strip()
+        parameters = signature[signature.index("(") + 1:].lstrip()
+        if current is not None and parameters.startswith(("self", "cls")):
+            stub = _stub(signature, indent="    ")
+            if stub is not None:
+                classes[current].append(stub)
+        else:
+            stub = _stub(signature)
+            if stub is not None:
+                functions.append(stub)
+    parts = list(functions)
+    for name, methods in classes.items():
+        parts.append(f"class {name}:\n" + ("".join(methods) or "    ...\n"))
+    for block in _CODE_BLOCK.findall(markdown):
+        if _parses(block):
+            parts.append(public_api(block) + "\n")
+    return "\n".join(parts)
+
+
+def _parameters(function):
+    """(name, has default) for each parameter of a function, in the order a call binds them."""
+    args = function.args
+    positional = args.posonlyargs + args.args
+    defaults = [False] * (len(positional) - len(args.defaults)) + [True] * len(args.defaults)
+    parameters = list(zip((arg.arg for arg in positional), defaults))
+    if args.vararg:
+        parameters.append(("*" + args.vararg.arg, True))
+    parameters.extend((arg.arg, default is not None) for arg, default in zip(args.kwonlyargs, args.kw_defaults))
+    if args.kwarg:
+        parameters.append(("**" + args.kwarg.arg, True))
+    return parameters
+
+
+def signatures(source):
+    """Maps each public function, class and method of a module to its parameters.
+
+    Returns:
+        {qualified name: [(parameter, has default)]}; a class maps to its __init__'s
+        parameters, or None if it does not define one.
+    """
+    try:
+        tree = ast.parse(public_api(source))
+    except SyntaxError:
+        return {}
+    found = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            found[node.name] = _parameters(node)
+        elif isinstance(node, ast.ClassDef):
+            found[node.name] = None
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    if item.name == "__init__":
+                        found[node.name] = _parameters(item)
+                    else:
+                        found[f"{node.name}.{item.name}"] = _parameters(item)
+    return found
+
+
+def _compatible(expected, actual):
+    """Whether every call that binds to the expected parameters also binds to the actual ones."""
+    if expected is None or actual is None:
+        return True  # An undocumented constructor; nothing to compare
+    if any(name.startswith("*") for name, _ in actual):
+        return True
+    names = [name for name, _ in actual]
+    for index, (name, has_default) in enumerate(expected):
+        if name not in names or (index < len(actual) and actual[index][0] != name):
+            return False
+        if has_default and not dict(actual)[name]:
+            return False
+    return all(has_default for name, has_default in actual if name not in dict(expected))
+
+
+def _render(name, parameters):
+    if parameters is None:
+        return name
+    return f"{name}({', '.join(p + ('=...' if default else '') for p, default in parameters)})"
+
+
+def interface_drift(design, code):
+    """Lists where the module's interface breaks the one in the design.
+
+    Returns:
+        {qualified name: description}, for names the design promises that the module
+        lacks or that take incompatible parameters. Additions are not drift.
+    """
+    expected = signatures(design)
+    actual = signatures(code)
+    drift = {}
+    for name, parameters in expected.items():
+        if name not in actual:
+            drift[name] = f"{_render(name, parameters)} is in the design but not in the module"
+        elif not _compatible(parameters, actual[name]):
+            drift[name] = f"{_render(name, parameters)} is {_render(name, actual[name])} in the module"
+    return drift
+
+
+def _names_used(source):
+    """Every identifier and attribute name that appears in a module's code."""
+    try:
+        tree = ast.parse(strip_code_fences(source))
+    except SyntaxError:
+        return None
+    used = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            used.add(node.attr)
+        elif isinstance(node, ast.alias):
+            used.add(node.name.split(".")[-1])
+    return used
+
+
+def affected(drift, source):
+    """The drift a generated file depends on: entries whose name it mentions.
+
+    A file that cannot be parsed depends on all of it.
+    """
+    used = _names_used(source)
+    if used is None:
+        return dict(drift)
+    return {name: description for name, description in drift.items() if name.rsplit(".", 1)[-1] in used}
+
+
+def format_drift(drift):
+    return "\n".join(f"- {description}" for description in drift.values()) or "No differences."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check files generated from a design against the module's real interface.")
+    parser.add_argument("files", nargs="*", default=["output/app.py", "output/test_accounts.py"],
+                        help="files generated from the design (default: %(default)s)")
+    parser.add_argument("--design", default="output/accounts.py_design.md", help="design document (default: %(default)s)")
+    parser.add_argument("--module", default="output/accounts.py", help="generated module (default: %(default)s)")
+    parser.add_argument("--show", action="store_true", help="print the interface extracted from the design")
+    args = parser.parse_args(argv)
+    with open(args.design) as f:
+        design = design_interface(f.read())
+    with open(args.module) as f:
+        drift = interface_drift(design, f.read())
+    if args.show:
+        print(design)
+    print(f"{args.module} against {args.design}:")
+    print(format_drift(drift))
+    stale = False
+    for path in args.files:
+        with open(path) as f:
+            needed = affected(drift, f.read())
+        stale = stale or bool(needed)
+        print(f"{path}: {'needs patching for ' + ', '.join(needed) if needed else 'valid'}")
+    return 1 if stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
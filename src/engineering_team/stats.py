@@ -0,0 +1,9 @@
+"""Summary statistics shared by the load test, hedging and run analytics."""
+
+
+def percentile(sorted_values, fraction):
+    """Returns the value at the given fraction (0-1) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
@@ -0,0 +1,223 @@
+"""Streams code-writing tasks' answers to their output files and stops broken generations early.
+
+Agents that write code use streaming LLMs (see crew.py). CodeStreamer listens to the crewAI
+event bus. Once a task's answer begins, each completed line goes straight to the task's
+output_file, with any markdown code fence around it dropped on the way. Each top-level
+statement is compiled as soon as it is complete. If one fails, BrokenGeneration is raised
+from the chunk handler; crewAI's LLM then stops reading the stream and returns the answer
+so far. check_python is the matching task guardrail: it rejects an answer that does not
+compile, cut off or not, and crewAI retries the task with the error message as feedback.
+A broken generation is thus retried mid-stream instead of after the full completion has
+been paid for.
+
+When the task finishes, the file is rewritten with the final answer, stripped of fences
+in the same way, because crewAI itself saves the raw answer.
+"""
+import tokenize
+from io import StringIO
+
+from crewai.utilities.events import (
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+    TaskCompletedEvent,
+    TaskStartedEvent,
+    crewai_event_bus,
+)
+
+from engineering_team.context import strip_code_fences
+
+FINAL_ANSWER = "Final Answer:"
+
+# Lines at column 0 that continue the statement before them rather than starting a new one
+_CONTINUATIONS = ("else", "elif", "except", "finally", "case", ")", "]", "}", "#", "@")
+
+# Lines that can only start a statement, so never belong inside an open bracket
+_STATEMENTS = ("def ", "async def ", "class ", "import ", "from ", "@")
+
+
+class BrokenGeneration(Exception):
+    """Raised from the event bus to abandon a streamed answer that can no longer be valid Python."""
+
+
+def check_python(output):
+    """Task guardrail: accepts an answer that compiles, with its code fences removed."""
+    code = strip_code_fences(output.raw)
+    try:
+        compile(code, "<generated>", "exec")
+    except SyntaxError as e:
+        return False, f"The code does not compile: {e.msg} on line {e.lineno}: {e.text!r}. Output only valid Python."
+    return True, code
+
+
+class StreamedFile:
+    """Writes one streamed answer to a file line by line, checking its syntax as it goes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None        # Opened when the answer begins, so tool-calling turns leave the file alone
+        self._pending = ""       # Streamed text not yet ending in a newline, or before the answer begins
+        self._answering = False  # Past "Final Answer:"
+        self._started = False    # Past the opening code fence, if there is one
+        self._closed = False     # Past the closing code fence
+        self._unchecked = []     # Complete lines not yet compiled
+
+    def feed(self, chunk):
+        """Accepts the next chunk of the completion.
+
+        Raises:
+            BrokenGeneration: If a completed top-level statement does not compile.
+        """
+        if self._closed:
+            return
+        self._pending += chunk
+        if not self._answering:
+            start = self._pending.find(FINAL_ANSWER)
+            if start < 0:
+                # Keep just enough to find a marker split across chunks
+                self._pending = self._pending[-len(FINAL_ANSWER):]
+                return
+            self._answering = True
+            self._file = open(self.path, "w")
+            self._pending = self._pending[start + len(FINAL_ANSWER):]
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._line(line + "\n")
+            if self._closed:
+                return
+        self._file.flush()
+
+    def _line(self, line):
+        if not self._started:
+            if not line.strip():
+                return
+            self._started = True
+            # The space after "Final Answer:" may arrive in a chunk of its own
+            line = line.lstrip(" ")
+            if line.startswith("```"):
+                return
+        elif line.strip() == "```" and not self._in_string():
+            self._closed = True
+            return
+        if line[:1].strip() and not line.startswith(_CONTINUATIONS) and self._unchecked:
+            previous = next((l for l in reversed(self._unchecked) if l.strip()), "")
+            if not previous.startswith("@"):
+                self._check(line)
+        self._unchecked.append(line)
+        self._file.write(line)
+
+    def _in_string(self):
+        """Whether the lines since the last check end inside a multi-line string literal."""
+        try:
+            for _ in tokenize.generate_tokens(StringIO("".join(self._unchecked)).readline):
+                pass
+        except tokenize.TokenError as e:
+            return "string" in e.args[0]
+        except SyntaxError:
+            pass
+        return False
+
+    def _check(self, next_line):
+        """Compiles the lines since the last check if they form complete top-level statements."""
+        segment = "".join(self._unchecked)
+        try:
+            # Tokenizing first tells an incomplete statement (an open bracket or string) from a wrong one
+            for _ in tokenize.generate_tokens(StringIO(segment).readline):
+                pass
+        except tokenize.TokenError as e:
+            if "statement" in e.args[0] and next_line.startswith(_STATEMENTS):
+                raise BrokenGeneration(f"{self.path}: unclosed bracket before {next_line.strip()!r}") from e
+            return  # Not complete yet; the next column-0 line may finish it
+        except SyntaxError as e:
+            raise BrokenGeneration(f"{self.path}: {e.msg}") from e
+        try:
+            compile(segment, self.path, "exec")
+        except SyntaxError as e:
+            raise BrokenGeneration(f"{self.path}: {e.msg}: {e.text!r}") from e
+        self._unchecked = []
+
+    def close(self):
+        if self._file is None:
+            return
+        if not self._closed and self._pending.strip():
+            # The unfinished last line, unless it is a code fence
+            if self._started:
+                fence = self._pending.strip() == "```" and not self._in_string()
+            else:
+                fence = self._pending.lstrip(" ").startswith("```")
+            if not fence:
+                self._file.write(self._pending if self._started else self._pending.lstrip(" "))
+        self._file.close()
+
+
+class CodeStreamer:
+    """Routes streamed chunks of code-writing tasks to StreamedFile writers.
+
+    Only tasks whose output_file has one of the given suffixes are streamed. Chunks are
+    routed by the LLM that emits them: each agent has its own LLM and works on one task at
+    a time, so tasks running concurrently (see EngineeringTeam's speculative mode) each
+    stream to their own file.
+    """
+
+    def __init__(self, suffixes=(".py",)):
+        self.suffixes = suffixes
+        self._tasks = {}  # {LLM: task it is working on}
+        self._files = {}  # {LLM: StreamedFile of its current call}
+
+    def register(self, bus=crewai_event_bus):
+        bus.on(TaskStartedEvent)(self._on_task_started)
+        bus.on(LLMCallStartedEvent)(self._on_call_started)
+        bus.on(LLMStreamChunkEvent)(self._on_chunk)
+        bus.on(TaskCompletedEvent)(self._on_task_completed)
+        return self
+
+    def _llm(self, task):
+        # A hedged LLM streams through its primary; a winning fallback's answer is written on completion
+        llm = getattr(task.agent, "llm", None)
+        return getattr(llm, "primary", llm)
+
+    def _on_task_started(self, task, event):
+        llm = self._llm(task)
+        path = getattr(task, "output_file", None)
+        if path and path.endswith(self.suffixes):
+            self._tasks[llm] = task
+        else:
+            self._tasks.pop(llm, None)
+
+    def _on_call_started(self, llm, event):
+        # Each call of the agent's loop starts a fresh answer, e.g. after a tool call or a retry
+        self._close(llm)
+        if llm in self._tasks:
+            self._files[llm] = StreamedFile(self._tasks[llm].output_file)
+
+    def _on_chunk(self, llm, event):
+        streamed = self._files.get(llm)
+        if streamed is not None:
+            try:
+                streamed.feed(event.chunk)
+            except BrokenGeneration:
+                self._close(llm)
+                raise
+
+    def _on_task_completed(self, task, event):
+        llm = self._llm(task)
+        self._close(llm)
+        if self._tasks.get(llm) is task:
+            with open(task.output_file, "w") as f:
+                f.write(strip_code_fences(event.output.raw))
+            del self._tasks[llm]
+
+    def _close(self, llm):
+        streamed = self._files.pop(llm, None)
+        if streamed is not None:
+            streamed.close()
+
+
+_streamer = None
+
+
+def stream_code_outputs():
+    """Registers the CodeStreamer on crewAI's event bus, once per process."""
+    global _streamer
+    if _streamer is None:
+        _streamer = CodeStreamer().register()
+    return _streamer
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+"""Parallel runner for generated unittest suites, with a cache of passing results.
+
+Test cases are found by parsing the test file rather than importing it. Each test gets a key
+made of two hashes:
+- the source it depends on within the file: the test method, the rest of its class
+  (fixtures, helpers, base classes), and the file's module-level code;
+- the local modules the file imports, such as accounts.py, followed transitively.
+
+A test that passed under the same key is not run again. Editing the generated module
+therefore reruns the tests that import it, and editing one test reruns only that test.
+Everything else is sharded across a process pool. Shards still running RUN_TIMEOUT seconds
+after the first is submitted are reported as errors and their workers are killed, so a test
+that loops or blocks cannot hang the pipeline.
+
+    suite_runner output/test_accounts.py example_output_4o/test_accounts.py
+    suite_runner output/test_accounts.py --no-cache --workers 8
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+import unittest
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+CACHE_FILE = ".test_results_cache.json"
+RUN_TIMEOUT = 300.0
+
+TestCase = namedtuple("TestCase", "suite test_id key")
+Outcome = namedtuple("Outcome", "test_id status detail")  # status: pass, fail, error or skip
+SuiteResult = namedtuple("SuiteResult", "outcomes cached duration")
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def local_imports(path):
+    """Returns {module name: file} for the modules next to path that it imports, transitively."""
+    directory = os.path.dirname(os.path.abspath(path))
+    found = {}
+    pending = [path]
+    while pending:
+        with open(pending.pop()) as f:
+            try:
+                tree = ast.parse(f.read())
+            except SyntaxError:
+                continue  # Its tests will fail on import; its content is still hashed
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(directory, name.split(".")[0] + ".py")
+                if name not in found and os.path.isfile(candidate):
+                    found[name] = candidate
+                    pending.append(candidate)
+    return found
+
+
+def _is_test_class(node, test_classes):
+    for base in node.bases:
+        name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "")
+        if name.endswith("TestCase") or name in test_classes:
+            return True
+    return False
+
+
+def collect(test_path):
+    """Lists the test cases of a unittest file, each with its cache key."""
+    with open(test_path) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    dependencies = local_imports(test_path)
+    dependency_hash = _hash(*(name + open(path).read() for name, path in sorted(dependencies.items())))
+
+    classes = {}
+    shared = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and _is_test_class(node, classes):
+            classes[node.name] = node
+        else:
+            shared.append(ast.get_source_segment(source, node) or "")
+    module_hash = _hash(*shared)
+
+    def class_parts(node):
+        """The test methods and the remaining class source of node and its local test base classes."""
+        tests, rest = {}, []
+        for base in node.bases:
+            if getattr(base, "id", None) in classes:
+                base_tests, base_rest = class_parts(classes[base.id])
+                tests.update(base_tests)
+                rest.extend(base_rest)
+        for item in node.body:
+            segment = ast.get_source_segment(source, item) or ""
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith("test"):
+                tests[item.name] = segment
+            else:
+                rest.append(segment)
+        return tests, rest
+
+    cases = []
+    for name, node in classes.items():
+        tests, rest = class_parts(node)
+        rest_hash = _hash(*rest)
+        for method, segment in tests.items():
+            test_id = f"{name}.{method}"
+            cases.append(TestCase(test_path, test_id, _hash(dependency_hash, module_hash, rest_hash, test_id, segment)))
+    return cases
+
+
+def _run_shard(test_path, test_ids, local_modules):
+    """Runs some tests of one file in this worker process and reports each test's outcome."""
+    directory = os.path.dirname(os.path.abspath(test_path))
+    test_module = os.path.splitext(os.path.basename(test_path))[0]
+    # A worker may have run another directory's suite, whose modules share these names
+    for name in [test_module, *local_modules]:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        try:
+            suite = unittest.defaultTestLoader.loadTestsFromNames([f"{test_module}.{test_id}" for test_id in test_ids])
+        except Exception:
+            return [Outcome(test_id, "error", traceback.format_exc()) for test_id in test_ids]
+        result = unittest.TestResult()
+        suite.run(result)
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(directory)
+
+    def short_id(test):
+        return test.id().split(".", 1)[1] if "." in test.id() else test.id()
+
+    outcomes = {test_id: Outcome(test_id, "pass", "") for test_id in test_ids}
+    for status, problems in (("fail", result.failures), ("error", result.errors)):
+        for test, detail in problems:
+            if short_id(test) not in outcomes:
+                # The loader stands in a placeholder when the test module fails to import
+                return [Outcome(test_id, "error", detail) for test_id in test_ids]
+            outcomes[short_id(test)] = Outcome(short_id(test), status, detail)
+    for test, reason in result.skipped:
+        outcomes[short_id(test)] = Outcome(short_id(test), "skip", reason)
+    return list(outcomes.values())
+
+
+def load_cache(directory):
+    try:
+        with open(os.path.join(directory, CACHE_FILE)) as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_cache(directory, keys):
+    with open(os.path.join(directory, CACHE_FILE), "w") as f:
+        json.dump(sorted(keys), f)
+
+
+def run_suites(test_paths, workers=None, use_cache=True, timeout=RUN_TIMEOUT):
+    """Runs several unittest files in parallel, skipping tests that already passed under the same key.
+
+    Args:
+        timeout: Seconds to wait for all shards, from the first submission. When they run
+            over, the pool is stopped and every test of an unfinished shard is reported as an
+            error.
+
+    Returns:
+        {test path: SuiteResult}
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    cases = {path: collect(path) for path in test_paths}
+    caches = {path: load_cache(os.path.dirname(os.path.abspath(path))) if use_cache else set() for path in test_paths}
+
+    pending = {path: [case for case in cases[path] if case.key not in caches[path]] for path in test_paths}
+    shards = []
+    for path, to_run in pending.items():
+        if not to_run:
+            continue
+        # Round-robin so each file is spread over at most `workers` shards of similar size
+        count = min(workers, len(to_run))
+        local_modules = list(local_imports(path))
+        for index in range(count):
+            shards.append((path, [case.test_id for case in to_run[index::count]], local_modules))
+
+    outcomes = {path: [] for path in test_paths}
+    if shards:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(shards)))
+        unfinished = ()
+        try:
+            futures = [(shard, pool.submit(_run_shard, *shard)) for shard in shards]
+            # One deadline for the whole run, however many shards wait in the queue
+            _, unfinished = wait([future for _, future in futures], timeout=timeout)
+            hung = f"Timed out: the test run took more than {timeout:g}s"
+            for (path, test_ids, _), future in futures:
+                if future in unfinished:
+                    outcomes[path].extend(Outcome(test_id, "error", hung) for test_id in test_ids)
+                else:
+                    outcomes[path].extend(future.result())
+        finally:
+            if unfinished:
+                # The executor cannot cancel a running call; stop its workers instead
+                for process in list(pool._processes.values()):
+                    process.terminate()
+            pool.shutdown(wait=not unfinished, cancel_futures=True)
+
+    duration = time.perf_counter() - start
+    results = {}
+    for path in test_paths:
+        keys = {case.test_id: case.key for case in cases[path]}
+        passed = {keys[outcome.test_id] for outcome in outcomes[path] if outcome.status in ("pass", "skip")}
+        cached = [Outcome(case.test_id, "pass", "cached") for case in cases[path] if case.key in caches[path]]
+        if use_cache:
+            # Keep only keys of current tests, so the cache does not grow with every edit
+            current = {case.key for case in cases[path]}
+            save_cache(os.path.dirname(os.path.abspath(path)), (caches[path] | passed) & current)
+        results[path] = SuiteResult(cached + outcomes[path], len(cached), duration)
+    return results
+
+
+def format_results(results):
+    """Renders failures with their tracebacks, then one summary line per file, as unittest does."""
+    lines = []
+    for path, result in results.items():
+        for outcome in result.outcomes:
+            if outcome.status in ("fail", "error"):
+                lines.append("=" * 70)
+                lines.append(f"{outcome.status.upper()}: {outcome.test_id} ({path})")
+                lines.append("-" * 70)
+                lines.append(outcome.detail.rstrip())
+    for path, result in results.items():
+        counts = {}
+        for outcome in result.outcomes:
+            counts[outcome.status] = counts.get(outcome.status, 0) + 1
+        failed = counts.get("fail", 0) + counts.get("error", 0)
+        status = "OK" if not failed else f"FAILED (failures={counts.get('fail', 0)}, errors={counts.get('error', 0)})"
+        lines.append(f"{path}: ran {len(result.outcomes)} tests ({result.cached} cached) "
+                     f"in {result.duration:.2f}s - {status}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run generated unittest files in parallel, caching passing results.")
+    parser.add_argument("tests", nargs="*", default=["output/test_accounts.py"], help="test files (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="run every test, ignoring and not updating the cache")
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT,
+                        help="seconds to wait for all the tests (default: %(default)s)")
+    args = parser.parse_args(argv)
+    results = run_suites(args.tests, args.workers, use_cache=not args.no_cache, timeout=args.timeout)
+    print(format_results(results))
+    failed = any(outcome.status in ("fail", "error") for result in results.values() for outcome in result.outcomes)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
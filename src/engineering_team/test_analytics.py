@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from engineering_team.analytics import RunHistory, TaskRecord, config_hash, format_report, regressions
+
+
+def task(name, duration):
+    return TaskRecord(name, "backend_engineer", "gpt-4o", duration, 0, 0, 100, 50)
+
+
+class TestRegressions(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.history = RunHistory(os.path.join(self.tmpdir.name, "runs.sqlite3"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, config, code_seconds, test_seconds=5.0):
+        return self.history.record(0.0, code_seconds + test_seconds, "single", "accounts.py",
+                                   [task("code_task", code_seconds), task("test_task", test_seconds)],
+                                   config=config, git_commit="abc123")
+
+    def flagged(self, **kwargs):
+        runs = self.history.runs()
+        return regressions(runs, self.history.tasks([run["id"] for run in runs]), **kwargs)
+
+    def test_flags_slower_tasks_after_a_config_change(self):
+        for seconds in (10.0, 11.0, 12.0):
+            self.record("old", seconds)
+        for seconds in (20.0, 21.0, 22.0):
+            self.record("new", seconds)
+        self.assertEqual(self.flagged(), [("(run)", 16.0, 26.0), ("code_task", 11.0, 21.0)])
+
+    def test_needs_min_runs_of_each_config(self):
+        for seconds in (10.0, 11.0, 12.0):
+            self.record("old", seconds)
+        for seconds in (20.0, 21.0):
+            self.record("new", seconds)
+        self.assertEqual(self.flagged(), [])
+        self.assertEqual([name for name, _, _ in self.flagged(min_runs=2)], ["(run)", "code_task"])
+
+    def test_compares_with_the_config_just_before(self):
+        for config, seconds in (("a", 10.0), ("a", 10.0), ("b", 30.0), ("b", 30.0), ("c", 31.0), ("c", 31.0)):
+            self.record(config, seconds)
+        self.assertEqual(self.flagged(min_runs=2), [])
+        self.assertEqual(self.flagged(min_runs=2, ratio=1.01), [("(run)", 35.0, 36.0), ("code_task", 30.0, 31.0)])
+
+    def test_single_config_has_nothing_to_compare(self):
+        for seconds in (10.0, 50.0, 90.0):
+            self.record("only", seconds)
+        self.assertEqual(self.flagged(), [])
+
+    def test_history_round_trip_and_report(self):
+        run_id = self.record("old", 10.0)
+        run = self.history.runs()[0]
+        self.assertEqual((run["id"], run["config"], run["git_commit"], run["duration"]), (run_id, "old", "abc123", 15.0))
+        self.assertEqual([row["name"] for row in self.history.tasks([run_id])], ["code_task", "test_task"])
+        self.assertEqual(len(self.history.runs(last=1)), 1)
+        report = format_report(self.history)
+        self.assertIn("code_task", report)
+        self.assertNotIn("Latency regressions", report)
+
+    def test_config_hash_follows_the_files(self):
+        for name in ("agents.yaml", "tasks.yaml"):
+            with open(os.path.join(self.tmpdir.name, name), "w") as f:
+                f.write(name)
+        before = config_hash(self.tmpdir.name)
+        with open(os.path.join(self.tmpdir.name, "tasks.yaml"), "a") as f:
+            f.write("edit")
+        self.assertNotEqual(config_hash(self.tmpdir.name), before)
+        self.assertEqual(len(before), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
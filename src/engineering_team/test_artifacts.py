@@ -0,0 +1,132 @@
+import os
+import tempfile
+import time
+import unittest
+
+from engineering_team.artifacts import ArtifactStore
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(os.path.join(self.tmpdir.name, "store"))
+        self.root = os.path.join(self.tmpdir.name, "output")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, relative, text):
+        path = os.path.join(self.root, *relative.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def age(self, path, seconds):
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+    def blobs(self):
+        return sorted(name for _, _, names in os.walk(os.path.join(self.store.directory, "blobs")) for name in names)
+
+    def read(self, directory, relative):
+        with open(os.path.join(directory, *relative.split("/"))) as f:
+            return f.read()
+
+    def test_snapshot_shares_unchanged_blobs(self):
+        self.write("accounts.py", "v1")
+        self.write("pkg/pricing.py", "prices")
+        first = self.store.manifest(self.store.snapshot(self.root, label="first", tasks={"design_task": "design"}))
+        self.write("accounts.py", "v2")
+        second = self.store.manifest(self.store.snapshot(self.root))
+        self.assertEqual(sorted(first["files"]), ["accounts.py", "pkg/pricing.py"])
+        self.assertEqual(first["label"], "first")
+        self.assertEqual(self.store.get(first["tasks"]["design_task"]), b"design")
+        self.assertEqual(first["files"]["pkg/pricing.py"], second["files"]["pkg/pricing.py"])
+        self.assertEqual(len(self.blobs()), 4)  # v1, v2, prices and the design
+
+    def test_diff_and_patch(self):
+        self.write("accounts.py", "balance = 1\n")
+        self.write("old.py", "")
+        old = self.store.manifest(self.store.snapshot(self.root, tasks={"code_task": "a"}))
+        self.write("accounts.py", "balance = 2\n")
+        os.remove(os.path.join(self.root, "old.py"))
+        self.write("new.py", "")
+        new = self.store.manifest(self.store.snapshot(self.root, tasks={"code_task": "b"}))
+        self.assertEqual(self.store.diff(old, new),
+                         {"added": ["new.py"], "removed": ["old.py"], "changed": ["accounts.py", "task:code_task"]})
+        patch = self.store.patch(old, new, "accounts.py")
+        self.assertIn("-balance = 1", patch)
+        self.assertIn("+balance = 2", patch)
+
+    def test_restore_writes_only_changed_files(self):
+        self.write("accounts.py", "v1")
+        self.write("pkg/pricing.py", "prices")
+        manifest = self.store.manifest(self.store.snapshot(self.root))
+        target = os.path.join(self.tmpdir.name, "restored")
+        self.assertEqual(self.store.restore(manifest, target), {"written": 2, "unchanged": 0, "deleted": 0})
+        self.assertEqual(self.read(target, "pkg/pricing.py"), "prices")
+
+        with open(os.path.join(target, "accounts.py"), "w") as f:
+            f.write("edited")
+        with open(os.path.join(target, "extra.py"), "w") as f:
+            f.write("")
+        self.assertEqual(self.store.restore(manifest, target), {"written": 1, "unchanged": 1, "deleted": 0})
+        self.assertEqual(self.read(target, "accounts.py"), "v1")
+        self.assertTrue(os.path.exists(os.path.join(target, "extra.py")))
+        self.assertEqual(self.store.restore(manifest, target, clean=True), {"written": 0, "unchanged": 2, "deleted": 1})
+        self.assertFalse(os.path.exists(os.path.join(target, "extra.py")))
+
+    def test_manifest_refs(self):
+        self.write("accounts.py", "v1")
+        first = self.store.snapshot(self.root)
+        self.write("accounts.py", "v2")
+        second = self.store.snapshot(self.root)
+        self.assertEqual(self.store.manifest("latest")["id"], second)
+        self.assertEqual(self.store.manifest("latest~1")["id"], first)
+        self.assertEqual(self.store.manifest(first)["id"], first)
+        self.assertEqual(self.store.manifest(second[:-2])["id"], second)
+        with self.assertRaises(KeyError):
+            self.store.manifest("latest~2")
+        with self.assertRaises(KeyError):
+            self.store.manifest("")  # Matches both runs
+        with self.assertRaises(KeyError):
+            self.store.manifest("nope")
+
+    def test_gc_deletes_old_unreferenced_blobs(self):
+        self.write("accounts.py", "v1")
+        self.store.snapshot(self.root)
+        digest = self.store.put(b"orphan")
+        self.age(self.store._blob_path(digest), 7200)
+        self.assertEqual(self.store.gc(), 1)
+        self.assertNotIn(digest, self.blobs())
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_gc_keeps_recent_and_temporary_files(self):
+        recent = self.store.put(b"being snapshotted")
+        temporary = self.store._blob_path(recent) + ".123.tmp"
+        with open(temporary, "wb") as f:
+            f.write(b"in flight")
+        self.age(temporary, 7200)
+        self.assertEqual(self.store.gc(), 0)
+        self.assertTrue(os.path.exists(self.store._blob_path(recent)))
+        self.assertTrue(os.path.exists(temporary))
+
+    def test_reused_blob_is_protected_from_gc(self):
+        digest = self.store.put(b"shared")
+        self.age(self.store._blob_path(digest), 7200)
+        # A running snapshot reuses the existing blob before writing its manifest
+        self.store.put(b"shared")
+        self.assertEqual(self.store.gc(), 0)
+        self.assertEqual(self.store.gc(grace=0), 1)
+
+    def test_manifest_is_written_atomically(self):
+        self.write("accounts.py", "v1")
+        run_id = self.store.snapshot(self.root)
+        self.assertEqual(os.listdir(os.path.join(self.store.directory, "runs")), [f"{run_id}.json"])
+        with open(os.path.join(self.store.directory, "runs", "partial.json.99.tmp"), "w") as f:
+            f.write('{"id": ')
+        self.assertEqual([manifest["id"] for manifest in self.store.runs()], [run_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
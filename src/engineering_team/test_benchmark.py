@@ -0,0 +1,190 @@
+import json
+import os
+import tempfile
+import unittest
+
+from engineering_team.benchmark import AccountAdapter, find_regressions, find_variants, load_module, main, populate
+
+# The account is opened empty and every price lookup takes the price function, as example_output_4o does
+PRICE_ARGUMENT = '''
+def get_share_price(symbol):
+    return {"AAPL": 150.0}.get(symbol, 0.0)
+
+
+class Account:
+    def __init__(self, account_id):
+        self.account_id = account_id
+        self.balance = 0.0
+        self.holdings = {}
+        self.transactions = []
+
+    def deposit(self, amount):
+        self.balance += amount
+        self.transactions.append(("deposit", amount))
+        return True
+
+    def withdraw(self, amount):
+        self.balance -= amount
+        self.transactions.append(("withdraw", amount))
+        return True
+
+    def buy_shares(self, symbol, quantity, get_share_price):
+        self.balance -= get_share_price(symbol) * quantity
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        self.transactions.append(("buy", symbol, quantity))
+        return True
+
+    def sell_shares(self, symbol, quantity, get_share_price):
+        self.balance += get_share_price(symbol) * quantity
+        self.holdings[symbol] -= quantity
+        self.transactions.append(("sell", symbol, quantity))
+        return True
+
+    def get_portfolio_value(self, get_share_price):
+        return self.balance + sum(get_share_price(s) * q for s, q in self.holdings.items())
+
+    def get_holdings(self):
+        return dict(self.holdings)
+
+    def get_transactions(self):
+        return list(self.transactions)
+'''
+
+# Funded by the constructor, with the other naming scheme, as example_output_new and _mini do
+FUNDED = '''
+def get_share_price(symbol):
+    return 10.0
+
+
+class Account:
+    def __init__(self, user_id, initial_deposit, currency="USD"):
+        self.user_id = user_id
+        self.balance = initial_deposit
+        self.holdings = {}
+        self.transactions = [("deposit", initial_deposit)]
+
+    def deposit_funds(self, amount):
+        self.balance += amount
+        self.transactions.append(("deposit", amount))
+
+    def withdraw_funds(self, amount):
+        self.balance -= amount
+        self.transactions.append(("withdraw", amount))
+
+    def buy_shares(self, symbol, quantity):
+        self.balance -= get_share_price(symbol) * quantity
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        self.transactions.append(("buy", symbol, quantity))
+
+    def sell_shares(self, symbol, quantity):
+        self.balance += get_share_price(symbol) * quantity
+        self.holdings[symbol] -= quantity
+        self.transactions.append(("sell", symbol, quantity))
+
+    def calculate_portfolio_value(self):
+        return self.balance + sum(get_share_price(s) * q for s, q in self.holdings.items())
+
+    def calculate_profit_or_loss(self):
+        return self.calculate_portfolio_value() - self.transactions[0][1]
+
+    def report_holdings(self):
+        return dict(self.holdings)
+
+    def report_transactions(self):
+        return list(self.transactions)
+'''
+
+
+def timings(seconds, memory=100.0):
+    return {"operations": {"deposit": seconds, "buy": seconds}, "memory_per_transaction": memory}
+
+
+class TestAccountAdapter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, directory, source):
+        os.makedirs(os.path.join(self.tmpdir.name, directory))
+        path = os.path.join(self.tmpdir.name, directory, "accounts.py")
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_price_function_is_passed_and_account_funded(self):
+        adapter = AccountAdapter(load_module(self.write("output", PRICE_ARGUMENT), "bench_price_argument"), 1000.0)
+        self.assertEqual(adapter.account.account_id, "benchmark")
+        adapter.buy("AAPL", 2)
+        self.assertEqual(adapter.portfolio_value(), 1000.0)
+        self.assertEqual(adapter.account.balance, 700.0)
+        self.assertEqual(adapter.holdings(), {"AAPL": 2})
+        self.assertFalse(adapter.supports("profit_or_loss"))
+
+    def test_constructor_deposit_and_other_names(self):
+        adapter = AccountAdapter(load_module(self.write("example_output_new", FUNDED), "bench_funded"), 1000.0)
+        self.assertEqual((adapter.account.user_id, adapter.account.balance), ("benchmark", 1000.0))
+        adapter.deposit(50.0)
+        adapter.withdraw(25.0)
+        adapter.buy("X", 3)
+        adapter.sell("X", 1)
+        self.assertEqual(adapter.holdings(), {"X": 2})
+        self.assertEqual(adapter.profit_or_loss(), 25.0)
+        self.assertEqual(len(adapter.transactions()), 5)
+        self.assertTrue(all(adapter.supports(operation) for operation in ("deposit", "profit_or_loss", "transactions")))
+
+    def test_populate_reaches_the_ledger_size(self):
+        module = load_module(self.write("output", FUNDED), "bench_populate")
+        for size in (1, 2, 9, 1000):
+            adapter = AccountAdapter(module, 1e9)
+            populate(adapter, size)
+            self.assertEqual(len(adapter.transactions()), size)
+            self.assertEqual(adapter.holdings().get("AAPL", 0), 0)
+
+    def test_find_variants(self):
+        self.write("output", FUNDED)
+        self.write("example_output_mini", FUNDED)
+        os.makedirs(os.path.join(self.tmpdir.name, "example_output_empty"))
+        self.write("other", FUNDED)
+        self.assertEqual(sorted(find_variants(self.tmpdir.name)), ["example_output_mini", "output"])
+
+
+class TestRegressions(unittest.TestCase):
+    def test_slower_or_larger_figures_are_reported(self):
+        baseline = {"output": {"1000": timings(1e-6)}}
+        self.assertEqual(find_regressions({"output": {"1000": timings(1.2e-6, 120.0)}}, baseline), [])
+        regressions = find_regressions({"output": {"1000": timings(2e-6, 200.0)}}, baseline)
+        self.assertEqual(regressions, ["output n=1000 deposit: 2.00us vs baseline 1.00us",
+                                       "output n=1000 buy: 2.00us vs baseline 1.00us",
+                                       "output n=1000 memory: 200B/tx vs baseline 100B/tx"])
+        self.assertEqual(len(find_regressions({"output": {"1000": timings(2e-6, 200.0)}}, baseline, tolerance=3.0)), 0)
+
+    def test_missing_baseline_entries_are_skipped(self):
+        results = {"output": {"1000": timings(1.0)}, "example_output_new": {"1": timings(1.0)}}
+        baseline = {"output": {"1": timings(1e-6)}, "example_output_new": {"1": {"operations": {}}}}
+        self.assertEqual(find_regressions(results, baseline), [])
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "output"))
+            with open(os.path.join(root, "output", "accounts.py"), "w") as f:
+                f.write(FUNDED)
+            baseline = os.path.join(root, "baseline.json")
+            arguments = ["--root", root, "--sizes", "1", "--no-memory"]
+            self.assertEqual(main(arguments + ["--save-baseline", baseline]), 0)
+            with open(baseline) as f:
+                saved = json.load(f)
+            self.assertEqual(sorted(saved["output"]["1"]["operations"]),
+                             ["buy", "deposit", "holdings", "portfolio_value", "sell", "transactions", "withdraw"])
+            self.assertEqual(main(arguments + ["--baseline", baseline, "--tolerance", "1000"]), 0)
+
+            for operations in saved["output"].values():
+                operations["operations"]["deposit"] = 1e-12
+            with open(baseline, "w") as f:
+                json.dump(saved, f)
+            self.assertEqual(main(arguments + ["--baseline", baseline]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
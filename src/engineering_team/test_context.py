@@ -0,0 +1,74 @@
+import unittest
+
+from engineering_team.context import message_text, public_api, strip_code_fences
+
+SOURCE = '''
+import math
+
+RATE = 0.5
+cache = {}
+
+
+def get_share_price(symbol: str) -> float:
+    """Fixed test prices."""
+    prices = {"AAPL": 150.0, "TSLA": 700.0}
+    return prices.get(symbol, 0.0)
+
+
+def _private():
+    return 1
+
+
+class Account:
+    """An account."""
+    kind = "cash"
+
+    def __init__(self, deposit: float) -> None:
+        """Opens the account."""
+        self.balance = deposit
+
+    def withdraw(self, amount: float) -> None:
+        self.balance -= amount
+
+    def _check(self):
+        pass
+'''
+
+
+class TestPublicApi(unittest.TestCase):
+    def test_summary(self):
+        api = public_api(SOURCE)
+        self.assertIn("RATE = 0.5", api)
+        self.assertNotIn("cache", api)
+        self.assertNotIn("_private", api)
+        self.assertNotIn("_check", api)
+        self.assertNotIn("self.balance", api)
+        self.assertIn("def withdraw(self, amount: float) -> None:\n        ...", api)
+        self.assertIn('"""Opens the account."""', api)
+        self.assertIn("kind = 'cash'", api)
+
+    def test_small_helpers_keep_their_bodies(self):
+        api = public_api(SOURCE)
+        self.assertIn("'AAPL': 150.0", api)
+        self.assertIn("return prices.get(symbol, 0.0)", api)
+
+    def test_long_functions_are_stubbed(self):
+        source = "def report():\n" + "".join(f"    x{i} = {i}\n" for i in range(20)) + "    return x0\n"
+        self.assertEqual(public_api(source), "def report():\n    ...")
+
+    def test_fenced_and_unparsable_source(self):
+        self.assertEqual(public_api("```python\nRATE = 1\n```"), "RATE = 1")
+        self.assertEqual(public_api("def broken("), "def broken(")
+        self.assertEqual(strip_code_fences("plain"), "plain")
+
+
+class TestMessageText(unittest.TestCase):
+    def test_string_and_block_content(self):
+        messages = [{"role": "system", "content": "a"},
+                    {"role": "user", "content": [{"type": "text", "text": "b"}, "ignored"]}]
+        self.assertEqual(message_text(messages), "a\nb")
+        self.assertEqual(message_text("plain"), "plain")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import tempfile
+import unittest
+
+from engineering_team.differential import (
+    INITIAL_DEPOSIT, compare, format_results, load_variant, main, make_workload, run, trace,
+)
+
+# Refuses by returning False, as output/ does
+RETURNS_FALSE = '''
+def get_share_price(symbol):
+    return 1.0
+
+
+class Account:
+    def __init__(self, account_id, initial_deposit):
+        self.balance = initial_deposit
+        self.initial_deposit = initial_deposit
+        self.holdings = {}
+        self.transactions = [("deposit", initial_deposit)]
+
+    def deposit(self, amount):
+        self.balance += amount
+        self.transactions.append(("deposit", amount))
+
+    def withdraw(self, amount):
+        if amount > self.balance{overdraft}:
+            return False
+        self.balance -= amount
+        self.transactions.append(("withdraw", amount))
+        return True
+
+    def buy_shares(self, symbol, quantity):
+        cost = get_share_price(symbol) * quantity
+        if cost > self.balance:
+            return False
+        self.balance -= cost
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        self.transactions.append(("buy", symbol, quantity))
+        return True
+
+    def sell_shares(self, symbol, quantity):
+        if self.holdings.get(symbol, 0) < quantity:
+            return False
+        self.balance += get_share_price(symbol) * quantity
+        self.holdings[symbol] -= quantity
+        self.transactions.append(("sell", symbol, quantity))
+        return True
+
+    def get_portfolio_value(self):
+        return self.balance + sum(get_share_price(s) * q for s, q in self.holdings.items())
+
+    def get_profit_or_loss(self):
+        return self.get_portfolio_value() - self.initial_deposit - sum(
+            t[1] for t in self.transactions[1:] if t[0] == "deposit") + sum(
+            t[1] for t in self.transactions if t[0] == "withdraw")
+
+    def get_holdings(self):
+        return dict(self.holdings)
+
+    def get_transactions(self):
+        return list(self.transactions)
+'''
+
+# Refuses by raising, under other method names, and keeps sold-out symbols at 0, as example_output_mini does
+RAISES = '''
+def get_share_price(symbol):
+    return 1.0
+
+
+class Account:
+    def __init__(self, username, initial_deposit):
+        self.balance = initial_deposit
+        self.holdings = {}
+        self.deposits = initial_deposit
+        self.log = [initial_deposit]
+
+    def deposit_funds(self, amount):
+        self.balance += amount
+        self.deposits += amount
+        self.log.append(amount)
+
+    def withdraw_funds(self, amount):
+        if amount > self.balance:
+            raise ValueError("Insufficient funds")
+        self.balance -= amount
+        self.deposits -= amount
+        self.log.append(-amount)
+
+    def buy_shares(self, symbol, quantity):
+        cost = get_share_price(symbol) * quantity
+        if cost > self.balance:
+            raise ValueError("Insufficient funds")
+        self.balance -= cost
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        self.log.append((symbol, quantity))
+
+    def sell_shares(self, symbol, quantity):
+        if self.holdings.get(symbol, 0) < quantity:
+            raise ValueError("Not enough shares")
+        self.balance += get_share_price(symbol) * quantity
+        self.holdings[symbol] -= quantity
+        self.log.append((symbol, -quantity))
+
+    def calculate_portfolio_value(self):
+        return self.balance + sum(get_share_price(s) * q for s, q in self.holdings.items())
+
+    def calculate_profit_or_loss(self):
+        return self.calculate_portfolio_value() - self.deposits
+
+    def report_holdings(self):
+        return dict(self.holdings)
+
+    def report_transactions(self):
+        return list(self.log)
+'''
+
+
+class TestDifferential(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.variants = {
+            "output": self.write("output", RETURNS_FALSE.replace("{overdraft}", "")),
+            "example_output_raises": self.write("example_output_raises", RAISES),
+            # Never refuses a withdrawal
+            "example_output_overdraft": self.write("example_output_overdraft", RETURNS_FALSE.replace("{overdraft}", " + 1e12")),
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, directory, source):
+        os.makedirs(os.path.join(self.tmpdir.name, directory))
+        path = os.path.join(self.tmpdir.name, directory, "accounts.py")
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_workload_is_reproducible_and_includes_refusals(self):
+        workload = make_workload(500, seed=3)
+        self.assertEqual(workload, make_workload(500, seed=3))
+        self.assertNotEqual(workload, make_workload(500, seed=4))
+        self.assertEqual({operation for operation, _ in workload}, {"deposit", "withdraw", "buy", "sell"})
+        self.assertTrue(any(operation == "withdraw" and args[0] > INITIAL_DEPOSIT for operation, args in workload))
+
+    def test_variants_share_the_test_prices(self):
+        module = load_variant(self.variants["output"], "differential_test_prices")
+        self.assertEqual(module.get_share_price("TSLA"), 700.0)
+
+    def test_equivalent_variants_and_first_divergence(self):
+        workload = make_workload(300)
+        reference = trace(load_variant(self.variants["output"], "differential_test_reference"), workload)
+        # The overdraft variant first differs on the first withdrawal the reference refuses
+        expected = next(step for step, ((operation, _), state) in enumerate(zip(workload, reference))
+                        if operation == "withdraw" and not state["accepted"])
+
+        results = run(self.variants, "output", steps=300)
+        self.assertEqual(results["output"]["mismatches"], {})
+        self.assertEqual(results["example_output_raises"]["mismatches"], {})
+        self.assertIsNone(results["example_output_raises"]["first_divergence"])
+        first = results["example_output_overdraft"]["first_divergence"]
+        self.assertEqual((first["step"], first["operation"], first["field"]), (expected, "withdraw", "accepted"))
+        self.assertEqual((first["expected"], first["actual"]), (False, True))
+        self.assertIn("balance", results["example_output_overdraft"]["mismatches"])
+        self.assertGreater(results["output"]["throughput"], 0)
+        self.assertGreater(results["output"]["memory_per_transaction"], 0)
+
+        report = format_results(results, "output")
+        self.assertIn("output (reference)", report)
+        self.assertIn(f"example_output_overdraft: first differs at step {expected} withdraw", report)
+
+    def test_compare_skips_unsupported_fields(self):
+        reference = [{"accepted": True, "balance": 1.0, "holdings": {}, "portfolio_value": 1.0,
+                      "profit_or_loss": 0.0, "transactions": 1}]
+        traced = [dict(reference[0], profit_or_loss=None, transactions=2)]
+        self.assertEqual(compare(reference, traced), ({"transactions": 1}, (0, "transactions", 1, 2)))
+
+    def test_exit_status(self):
+        arguments = ["--root", self.tmpdir.name, "--steps", "200"]
+        self.assertEqual(main(arguments + ["--variant", "example_output_raises"]), 0)
+        self.assertEqual(main(arguments), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
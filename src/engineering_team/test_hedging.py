@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+
+from crewai import LLM
+from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+
+from engineering_team.hedging import MIN_SAMPLES, FakeLLM, HedgedLLM, HedgeStats, _on_chunk
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+RESPONSE = "one two three four five six seven eight nine ten"
+
+
+def latencies(*seconds):
+    """A FakeLLM latency giving these seconds to successive calls."""
+    remaining = list(seconds)
+    return lambda rng: remaining.pop(0)
+
+
+class TestHedgedLLM(unittest.TestCase):
+    def setUp(self):
+        self.scope = crewai_event_bus.scoped_handlers()
+        self.scope.__enter__()
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_chunk)
+        self.chunks = {}
+        self.lock = threading.Lock()
+
+        def record(llm, event):
+            with self.lock:
+                self.chunks[llm.model] = self.chunks.get(llm.model, 0) + 1
+
+        crewai_event_bus.on(LLMStreamChunkEvent)(record)
+        self.stats = HedgeStats()
+
+    def tearDown(self):
+        self.scope.__exit__(None, None, None)
+
+    def hedged(self, primary, fallback, slo=0.05):
+        llm = HedgedLLM(FakeLLM("fake/primary", primary, response=RESPONSE),
+                        FakeLLM("fake/fallback", fallback, response=RESPONSE.upper()),
+                        slos={"task": slo}, stats=self.stats)
+        llm.task = "task"
+        return llm
+
+    def test_fast_primary_is_not_hedged(self):
+        llm = self.hedged(latencies(0.01), latencies(0.01))
+        self.assertEqual(llm.call(MESSAGES), RESPONSE)
+        self.assertEqual(self.stats.records[0].hedged, False)
+        self.assertEqual(self.stats.records[0].winner, "primary")
+        self.assertNotIn("fake/fallback", self.chunks)
+
+    def test_slow_primary_loses_and_is_stopped(self):
+        llm = self.hedged(latencies(1.0), latencies(0.01))
+        self.assertEqual(llm.call(MESSAGES), RESPONSE.upper())
+        self.assertEqual(self.stats.records[0].winner, "fallback")
+        time.sleep(1.2)
+        # Its first chunk was due 0.1s in, after it lost, so it stopped there
+        self.assertNotIn("fake/primary", self.chunks)
+
+    def test_loser_stays_cancelled_during_the_next_call(self):
+        llm = self.hedged(latencies(1.0, 0.02), latencies(0.01))
+        self.assertEqual(llm.call(MESSAGES), RESPONSE.upper())
+        self.assertEqual(llm.call(MESSAGES), RESPONSE)
+        time.sleep(1.2)
+        # Only the second call's chunks: the first call's loser never resumed
+        self.assertEqual(self.chunks["fake/primary"], len(RESPONSE.split(" ")))
+
+    def test_failed_primary_hedges_at_once(self):
+        llm = HedgedLLM(FakeLLM("fake/primary", latencies(0.02), fail_rate=1.0),
+                        FakeLLM("fake/fallback", latencies(0.01), response=RESPONSE), slos={"task": 10.0},
+                        stats=self.stats)
+        llm.task = "task"
+        start = time.perf_counter()
+        self.assertEqual(llm.call(MESSAGES), RESPONSE)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(self.stats.records[0].winner, "fallback")
+
+    def test_both_failing_raises(self):
+        llm = HedgedLLM(FakeLLM("fake/primary", latencies(0.01), fail_rate=1.0),
+                        FakeLLM("fake/fallback", latencies(0.01), fail_rate=1.0), stats=self.stats)
+        with self.assertRaises(ConnectionError):
+            llm.call(MESSAGES)
+
+    def test_models_are_switched_to_streaming(self):
+        llm = HedgedLLM(LLM(model="gpt-4o", stream=False), LLM(model="anthropic/claude", stream=False))
+        self.assertFalse(llm.stream)
+        self.assertTrue(llm.primary.stream)
+        self.assertTrue(llm.fallback.stream)
+
+
+class TestHedgeStats(unittest.TestCase):
+    def test_hedge_delay_is_capped_p95(self):
+        stats = HedgeStats()
+        self.assertEqual(stats.hedge_delay("task", 5.0), 5.0)
+        for seconds in [0.1] * (MIN_SAMPLES * 4) + [2.0]:
+            stats.add_primary_latency("task", seconds)
+        self.assertEqual(stats.hedge_delay("task", 5.0), 0.1)
+        self.assertEqual(stats.hedge_delay("task", 0.05), 0.05)
+
+    def test_summary(self):
+        stats = HedgeStats()
+        stats.add_primary_latency("task", 3.0)
+        stats.record("task", 1.0, True, "fallback")
+        stats.record("task", 0.5, False, "primary")
+        row = stats.summary()["task"]
+        self.assertEqual((row["calls"], row["hedged"], row["fallback_wins"]), (2, 1, 1))
+        self.assertEqual(row["saved"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from engineering_team.jobqueue import JobQueue, Worker
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def state(self, job_id):
+        return self.queue.jobs(job_id)[0]
+
+    def test_claims_highest_priority_then_oldest(self):
+        low = self.queue.submit({"module_name": "low.py"})
+        first = self.queue.submit({"module_name": "first.py"}, priority=5)
+        second = self.queue.submit({"module_name": "second.py"}, priority=5)
+        claimed = [self.queue.claim("w")["id"] for _ in range(3)]
+        self.assertEqual(claimed, [first, second, low])
+        self.assertIsNone(self.queue.claim("w"))
+        job = self.state(first)
+        self.assertEqual((job["state"], job["attempts"], job["worker"]), ("running", 1, "w"))
+        self.assertEqual(json.loads(job["spec"]), {"module_name": "first.py"})
+
+    def test_expired_lease_is_requeued_for_another_worker(self):
+        job_id = self.queue.submit({})
+        self.queue.claim("w1", lease=-1)
+        self.assertFalse(self.queue.heartbeat(job_id, "w2"))
+        job = self.queue.claim("w2")
+        self.assertEqual((job["id"], job["worker"], job["attempts"]), (job_id, "w2", 2))
+        self.assertEqual(job["error"], "lease expired")
+        # The first worker lost its lease: its late reports are ignored
+        self.assertFalse(self.queue.heartbeat(job_id, "w1"))
+        self.queue.complete(job_id, "w1")
+        self.assertEqual(self.state(job_id)["state"], "running")
+        self.queue.complete(job_id, "w2")
+        self.assertEqual(self.state(job_id)["state"], "succeeded")
+
+    def test_expired_lease_fails_job_out_of_attempts(self):
+        job_id = self.queue.submit({}, max_attempts=1)
+        self.queue.claim("w", lease=-1)
+        self.assertIsNone(self.queue.claim("w"))
+        job = self.state(job_id)
+        self.assertEqual((job["state"], job["error"]), ("failed", "lease expired"))
+
+    def test_failed_attempt_backs_off_then_fails_for_good(self):
+        job_id = self.queue.submit({}, max_attempts=2)
+        self.queue.claim("w")
+        before = time.time()
+        self.queue.fail(job_id, "w", "boom", backoff=60)
+        job = self.state(job_id)
+        self.assertEqual((job["state"], job["error"]), ("queued", "boom"))
+        self.assertGreaterEqual(job["not_before"], before + 60)
+        self.assertIsNone(self.queue.claim("w"))  # Still backing off
+
+        self.queue.fail(job_id, "w", "ignored", backoff=0)  # Not running: no effect
+        self.assertEqual(self.state(job_id)["error"], "boom")
+
+        with self.queue._transaction() as db:
+            db.execute("UPDATE jobs SET not_before = 0")
+        self.assertEqual(self.queue.claim("w")["attempts"], 2)
+        self.queue.fail(job_id, "w", "boom again", backoff=0)
+        job = self.state(job_id)
+        self.assertEqual((job["state"], job["error"]), ("failed", "boom again"))
+        self.assertIsNotNone(job["finished"])
+
+    def test_backoff_doubles_with_each_attempt(self):
+        job_id = self.queue.submit({}, max_attempts=3)
+        for attempt in range(2):
+            with self.queue._transaction() as db:
+                db.execute("UPDATE jobs SET not_before = 0")
+            self.queue.claim("w")
+            before = time.time()
+            self.queue.fail(job_id, "w", "boom", backoff=10)
+            self.assertAlmostEqual(self.state(job_id)["not_before"] - before, 10 * 2 ** attempt, delta=1)
+
+    def test_cancel_ends_the_lease(self):
+        job_id = self.queue.submit({})
+        self.queue.claim("w")
+        self.assertTrue(self.queue.heartbeat(job_id, "w"))
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertFalse(self.queue.heartbeat(job_id, "w"))
+        self.assertFalse(self.queue.cancel(job_id))
+        self.assertEqual(self.state(job_id)["state"], "cancelled")
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_runs_jobs_and_retries_failures(self):
+        def command(job):
+            code = json.loads(job["spec"])["exit"]
+            return [sys.executable, "-c", f"import sys; print('attempt'); sys.exit({code})"]
+
+        ok = self.queue.submit({"exit": 0})
+        bad = self.queue.submit({"exit": 3}, max_attempts=2)
+        Worker(self.queue, slots=2, heartbeat=0.05, command=command, backoff=0).run(until_idle=True)
+
+        self.assertEqual(self.queue.jobs(ok)[0]["state"], "succeeded")
+        job = self.queue.jobs(bad)[0]
+        self.assertEqual((job["state"], job["attempts"], job["error"]), ("failed", 2, "exited with status 3"))
+        self.assertEqual(sorted(os.listdir(self.queue.workdir(bad))), ["attempt_1.log", "attempt_2.log"])
+        with open(os.path.join(self.queue.workdir(ok), "attempt_1.log")) as f:
+            self.assertEqual(f.read(), "attempt\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from engineering_team.knowledge import KnowledgeIndex, chunk_text, hash_embedding, relevant_knowledge
+
+PRICING = "Share prices come from get_share_price. AAPL is 150, TSLA is 700 and GOOGL is 2800."
+RISK = "Withdrawals must never leave a negative balance, and sales need enough shares held."
+STYLE = "Docstrings use the Google style with Args and Returns sections."
+
+
+class CountingEmbedding:
+    """hash_embedding, counting the texts it embeds."""
+
+    def __init__(self, name="hash-256"):
+        self.name = name
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return hash_embedding(texts)
+
+
+class TestKnowledgeIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "knowledge")
+        self.index_dir = os.path.join(self.tmpdir.name, "index")
+        os.makedirs(self.directory)
+        self.write("pricing.md", PRICING)
+        self.write("risk.txt", RISK)
+        self.write("style.md", STYLE)
+        self.write("ignored.py", "print('not knowledge')")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.directory, name), "w") as f:
+            f.write(text)
+
+    def index(self, embed=None):
+        return KnowledgeIndex(self.directory, self.index_dir, embed or CountingEmbedding())
+
+    def test_only_changed_files_are_re_embedded(self):
+        first = self.index()
+        self.assertEqual(first.update(), {"reused": 0, "embedded": 3, "removed": 0, "chunks": 3})
+
+        embed = CountingEmbedding()
+        self.assertEqual(self.index(embed).update(), {"reused": 3, "embedded": 0, "removed": 0, "chunks": 0})
+        self.assertEqual(embed.texts, [])
+
+        self.write("risk.txt", RISK + " Trades are priced once per order.")
+        embed = CountingEmbedding()
+        index = self.index(embed)
+        self.assertEqual(index.update()["embedded"], 1)
+        self.assertEqual(len(embed.texts), 1)
+        self.assertIn("priced once", embed.texts[0])
+        # Reused rows keep their vectors next to the re-embedded ones
+        np.testing.assert_allclose(index.vectors[0], first.vectors[0])
+
+    def test_deleted_files_are_dropped(self):
+        self.index().update()
+        os.remove(os.path.join(self.directory, "style.md"))
+        index = self.index()
+        self.assertEqual(index.update()["removed"], 1)
+        self.assertEqual(sorted(index.manifest["files"]), ["pricing.md", "risk.txt"])
+        self.assertEqual(len(index.chunks), index.vectors.shape[0])
+        self.assertNotIn("style.md", {chunk["file"] for chunk in index.chunks})
+        # Only the current generation's files are kept
+        self.assertEqual(len([name for name in os.listdir(self.index_dir) if name.startswith("vectors-")]), 1)
+
+    def test_switching_embedder_rebuilds(self):
+        self.index().update()
+        embed = CountingEmbedding("other")
+        index = self.index(embed)
+        self.assertEqual(index.update()["embedded"], 3)
+        self.assertEqual(index.manifest["embedder"], "other")
+        self.assertEqual(len(embed.texts), 3)
+
+    def test_search_ranks_by_similarity(self):
+        index = self.index()
+        index.update()
+        results = index.search("what price is AAPL share", k=2)
+        self.assertEqual(results[0][1], "pricing.md")
+        self.assertLessEqual(len(results), 2)
+        self.assertEqual([score for score, _, _ in results], sorted((score for score, _, _ in results), reverse=True))
+        self.assertEqual(index.search("zzz qqq", k=3, min_score=0.5), [])
+
+    def test_files_without_chunks(self):
+        for name in ("pricing.md", "risk.txt", "style.md"):
+            self.write(name, "")
+        self.index().update()
+        index = self.index()
+        self.assertEqual(index.update(), {"reused": 3, "embedded": 0, "removed": 0, "chunks": 0})
+        self.assertEqual(index.search("anything"), [])
+
+        self.write("risk.txt", RISK)
+        index = self.index()
+        self.assertEqual(index.update()["embedded"], 1)
+        self.assertEqual(index.search("negative balance", k=1)[0][1], "risk.txt")
+
+    def test_loaded_index_survives_a_later_update(self):
+        self.index().update()
+        reader = self.index()
+        self.write("style.md", STYLE + " Type hints on every public function.")
+        self.index().update()
+        self.assertEqual(reader.search("negative balance", k=1)[0][1], "risk.txt")
+
+    def test_concurrent_updates(self):
+        self.index().update()
+        self.write("risk.txt", RISK + " Trades are priced once per order.")
+        context = multiprocessing.get_context("fork")
+        with context.Pool(4) as pool:
+            results = pool.starmap(relevant_knowledge, [("priced once per order", self.directory, 1, hash_embedding,
+                                                         self.index_dir)] * 8)
+        self.assertTrue(all(result.startswith("[risk.txt]") for result in results))
+        names = os.listdir(self.index_dir)
+        self.assertFalse([name for name in names if name.endswith(".tmp")])
+        self.assertEqual(self.index().update()["embedded"], 0)
+
+    def test_relevant_knowledge(self):
+        snippets = relevant_knowledge("negative balance withdrawals", self.directory, k=1, embed=hash_embedding,
+                                      index_dir=self.index_dir)
+        self.assertEqual(snippets, f"[risk.txt]\n{RISK}")
+        self.assertEqual(relevant_knowledge("x", os.path.join(self.tmpdir.name, "missing")), "")
+
+
+class TestChunkText(unittest.TestCase):
+    def test_chunks_overlap_and_cover_the_text(self):
+        text = " ".join(f"word{i}" for i in range(400))
+        chunks = chunk_text(text, size=200, overlap=50)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertTrue(chunks[0].startswith("word0 "))
+        self.assertTrue(chunks[-1].endswith("word399"))
+        self.assertEqual(chunk_text("  "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import unittest
+from types import SimpleNamespace
+
+from engineering_team.loadtest import (
+    HISTOGRAM_BOUNDS, SYMBOLS, LoadGenerator, arguments_for, histogram, parse_mix, resolve_handlers,
+)
+
+
+def fake_app(trade_concurrency=None, read_concurrency=None):
+    """An app module whose handlers record how many of each group run at once."""
+    running = {"trading": 0, "read": 0}
+    peak = {"trading": 0, "read": 0}
+
+    def handler(group):
+        async def handle(*args):
+            running[group] += 1
+            peak[group] = max(peak[group], running[group])
+            await asyncio.sleep(0.001)
+            running[group] -= 1
+            return args
+        return handle
+
+    async def create_account(initial_deposit, request):
+        return await handler("trading")(initial_deposit, request)
+
+    async def buy_shares(symbol, quantity, request):
+        return await handler("trading")(symbol, quantity, request)
+
+    async def get_account_summary(request):
+        return await handler("read")(request)
+
+    def failing_history(request):
+        raise RuntimeError("no account")
+
+    app = SimpleNamespace(create_account=create_account, buy_shares=buy_shares, get_account_summary=get_account_summary,
+                          get_transactions=failing_history, TRADE_CONCURRENCY=trade_concurrency,
+                          READ_CONCURRENCY=read_concurrency)
+    return app, peak
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_handlers_are_resolved_by_operation(self):
+        app, _ = fake_app()
+        self.assertEqual(sorted(resolve_handlers(app)), ["buy", "create_account", "history", "summary"])
+
+    def test_calls_are_limited_per_group(self):
+        app, peak = fake_app(trade_concurrency=3, read_concurrency=2)
+        generator = LoadGenerator(app)
+        asyncio.run(generator.run(users=20, ops=10))
+        self.assertEqual(peak, {"trading": 3, "read": 2})
+
+    def test_without_limits_every_user_runs_at_once(self):
+        app, peak = fake_app()
+        asyncio.run(LoadGenerator(app).run(users=20, ops=0))
+        self.assertEqual(peak["trading"], 20)
+
+    def test_report(self):
+        app, _ = fake_app()
+        generator = LoadGenerator(app)
+        report = generator.report(asyncio.run(generator.run(users=5, ops=20)))
+        calls = {operation: stats["calls"] for operation, stats in report["operations"].items()}
+        self.assertEqual(calls["create_account"], 5)
+        self.assertEqual(sum(calls.values()), report["calls"])
+        self.assertEqual(report["calls"], 5 * 21)
+        self.assertEqual(report["errors"], calls.get("history", 0))
+        for stats in report["operations"].values():
+            self.assertLessEqual(stats["p50"], stats["p99"])
+            self.assertLessEqual(stats["p99"], stats["max"])
+            self.assertEqual(sum(stats["histogram"].values()), stats["calls"])
+
+
+class TestScripts(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("trader=0.3,viewer=0.7"), {"trader": 0.3, "viewer": 0.7})
+        self.assertEqual(parse_mix("balanced"), {"balanced": 1.0})
+        with self.assertRaisesRegex(ValueError, "Unknown user profile 'whale'"):
+            parse_mix("trader=1,whale=2")
+        with self.assertRaises(ValueError):
+            parse_mix("trader=lots")
+
+    def test_arguments_for(self):
+        rng = random.Random(0)
+
+        def buy_shares(symbol, quantity: int, request):
+            pass
+
+        symbol, quantity, request = arguments_for(buy_shares, "buy", "session-1", rng)
+        self.assertIn(symbol, SYMBOLS)
+        self.assertIsInstance(quantity, int)
+        self.assertEqual(request.session_hash, "session-1")
+
+        def create_account(amount, user_id, note="", extra=None):
+            pass
+
+        self.assertEqual(arguments_for(create_account, "create_account", "session-1", rng), ["10000", "session-1"])
+
+        def deposit(amount: float, comment):
+            pass
+
+        amount, comment = arguments_for(deposit, "deposit", "session-1", rng)
+        self.assertIsInstance(amount, float)
+        self.assertTrue(1 <= amount <= 500)
+        self.assertEqual(comment, "")
+
+    def test_profiles_follow_the_mix(self):
+        app, _ = fake_app()
+        generator = LoadGenerator(app, mix=parse_mix("trader=0.25,viewer=0.75"))
+        profiles = [generator.profile_for(index) for index in range(1000)]
+        self.assertAlmostEqual(profiles.count("trader") / 1000, 0.25, delta=0.01)
+        self.assertEqual(set(profiles), {"trader", "viewer"})
+        self.assertEqual({LoadGenerator(app).profile_for(index) for index in range(10)}, {"balanced"})
+
+    def test_histogram(self):
+        values = [0.0, 1e-6, 1.5e-6, 3e-6, 4e-6, 1e-3, 1e6]
+        counts = histogram(values)
+        self.assertEqual(counts[1e-6], 2)
+        self.assertEqual(counts[2e-6], 1)
+        self.assertEqual(counts[4e-6], 2)
+        self.assertEqual(counts[float("inf")], 1)
+        self.assertEqual(sum(counts.values()), len(values))
+        bound = next(b for b in HISTOGRAM_BOUNDS if b >= 1e-3)
+        self.assertEqual(counts[bound], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from engineering_team.project import (
+    SAMPLE_PLAN, Job, JobResult, Module, assemble_package, critical_path, dependency_order, module_jobs, parse_module_plan,
+    run_jobs,
+)
+
+
+def module(name, *depends_on):
+    return Module(name, name[:-3].title(), "", depends_on)
+
+
+class TestPlan(unittest.TestCase):
+    def test_dependency_order_keeps_plan_order_otherwise(self):
+        modules = [module("c.py", "a.py"), module("a.py"), module("b.py"), module("d.py", "c.py", "b.py")]
+        self.assertEqual([m.name for m in dependency_order(modules)], ["a.py", "b.py", "c.py", "d.py"])
+
+    def test_unknown_dependency(self):
+        with self.assertRaisesRegex(ValueError, "missing from the plan: z.py"):
+            dependency_order([module("a.py", "z.py")])
+
+    def test_cycle(self):
+        with self.assertRaisesRegex(ValueError, "Circular imports between a.py, b.py"):
+            dependency_order([module("a.py", "b.py"), module("b.py", "a.py"), module("c.py")])
+
+    def test_parse_module_plan(self):
+        modules = parse_module_plan("Design text\n" + SAMPLE_PLAN)
+        self.assertEqual([m.name for m in modules], ["pricing.py", "persistence.py", "accounts.py", "reporting.py"])
+        self.assertEqual(modules[2].class_name, "Account")
+        self.assertEqual(modules[3].depends_on, ("accounts.py", "pricing.py"))
+        with self.assertRaises(ValueError):
+            parse_module_plan("```yaml\nname: not a plan\n```")
+
+    def test_module_jobs(self):
+        jobs = module_jobs([module("a.py"), module("b.py", "a.py")], lambda m: None, lambda m: None)
+        self.assertEqual([(job.name, job.depends_on) for job in jobs],
+                         [("code:a.py", ()), ("code:b.py", ("code:a.py",)),
+                          ("test:a.py", ("code:a.py",)), ("test:b.py", ("code:b.py",))])
+
+
+class TestRunJobs(unittest.TestCase):
+    def sleeper(self, seconds, log=None, name=None):
+        def run():
+            time.sleep(seconds)
+            if log is not None:
+                log.append(name)
+        return run
+
+    def test_dependencies_finish_first_and_independent_jobs_overlap(self):
+        jobs = [Job("a", (), self.sleeper(0.2)), Job("b", (), self.sleeper(0.2)), Job("c", ("a", "b"), self.sleeper(0.1))]
+        start = time.perf_counter()
+        results = run_jobs(jobs, workers=4)
+        self.assertLess(time.perf_counter() - start, 0.45)
+        self.assertTrue(all(result.error is None for result in results.values()))
+        self.assertGreaterEqual(results["c"].start, max(results["a"].end, results["b"].end))
+        self.assertLess(results["b"].start, results["a"].end)
+
+    def test_failed_dependency_skips_dependents(self):
+        def fail():
+            raise RuntimeError("no code")
+
+        ran = []
+        jobs = [Job("a", (), fail), Job("b", ("a",), lambda: ran.append("b")), Job("c", ("b",), lambda: ran.append("c")),
+                Job("d", (), lambda: ran.append("d"))]
+        results = run_jobs(jobs, workers=2)
+        self.assertEqual(results["a"].error, "RuntimeError: no code")
+        self.assertEqual(results["b"].error, "skipped: a did not succeed")
+        self.assertEqual(results["c"].error, "skipped: b did not succeed")
+        self.assertIsNone(results["d"].error)
+        self.assertEqual(ran, ["d"])
+
+    def test_workers_bound_concurrency(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        run_jobs([Job(str(i), (), job) for i in range(6)], workers=2)
+        self.assertEqual(max(peak), 2)
+
+    def test_critical_path(self):
+        jobs = [Job("a", (), None), Job("b", (), None), Job("c", ("a",), None)]
+        results = {"a": JobResult(0.0, 1.0, None), "b": JobResult(0.0, 1.5, None), "c": JobResult(1.0, 2.0, None)}
+        self.assertEqual(critical_path(jobs, results), (2.0, ["a", "c"]))
+
+
+class TestAssemblePackage(unittest.TestCase):
+    def test_exports_written_modules(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "pricing.py"), "w") as f:
+                f.write("class PriceService: pass\n")
+            assemble_package(directory, "trading", [Module("pricing.py", "PriceService", "", ()),
+                                                    Module("accounts.py", "Account", "", ())])
+            with open(os.path.join(directory, "__init__.py")) as f:
+                source = f.read()
+        self.assertIn("from .pricing import PriceService", source)
+        self.assertNotIn("Account", source)
+        self.assertIn("__all__ = ['PriceService']", source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+
+from engineering_team.prompt_cache import (
+    CHARS_PER_TOKEN, MAX_BREAKPOINTS, MIN_CACHED_TOKENS, PromptCacheStats, SimulatedProvider, cached_tokens,
+    mark_cache_breakpoints, simulate,
+)
+
+CLAUDE = "anthropic/claude-3-7-sonnet-latest"
+LONG = "x" * (MIN_CACHED_TOKENS * CHARS_PER_TOKEN)
+
+
+def breakpoints(messages):
+    """Indexes of the messages carrying a cache breakpoint."""
+    return [index for index, message in enumerate(messages) if isinstance(message["content"], list)
+            and any("cache_control" in block for block in message["content"])]
+
+
+class TestMarkCacheBreakpoints(unittest.TestCase):
+    def test_automatic_providers_are_unchanged(self):
+        messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "u"}]
+        self.assertIs(mark_cache_breakpoints(messages, "gpt-4o"), messages)
+        self.assertEqual(mark_cache_breakpoints("prompt", CLAUDE), "prompt")
+
+    def test_system_prompt_and_latest_turn(self):
+        messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "task"},
+                    {"role": "assistant", "content": "a1"}, {"role": "user", "content": "o1"},
+                    {"role": "assistant", "content": "a2"}]
+        marked = mark_cache_breakpoints(messages, CLAUDE)
+        self.assertEqual(breakpoints(marked), [0, 1, 4])
+        self.assertEqual(marked[1]["content"], [{"type": "text", "text": "task", "cache_control": {"type": "ephemeral"}}])
+        self.assertEqual(marked[2], messages[2])
+        self.assertEqual(messages[0]["content"], "s")  # The input is not modified
+
+    def test_placeholder_before_the_system_message(self):
+        # crewAI sends Anthropic a placeholder user message ahead of the system message
+        messages = [{"role": "user", "content": "."}, {"role": "system", "content": "s"},
+                    {"role": "user", "content": "task"}]
+        self.assertEqual(breakpoints(mark_cache_breakpoints(messages, CLAUDE)), [1, 2])
+
+    def test_breakpoint_limit(self):
+        block = {"type": "text", "text": "t", "cache_control": {"type": "ephemeral"}}
+        messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "task"},
+                    {"role": "assistant", "content": [block, dict(block)]}, {"role": "user", "content": "latest"}]
+        marked = mark_cache_breakpoints(messages, CLAUDE)
+        count = sum("cache_control" in block for message in marked if isinstance(message["content"], list)
+                    for block in message["content"])
+        self.assertEqual(count, MAX_BREAKPOINTS)
+        self.assertEqual(breakpoints(marked), [0, 1, 2])
+
+
+class TestSimulatedProvider(unittest.TestCase):
+    def messages(self, turn="a"):
+        return [{"role": "system", "content": LONG}, {"role": "user", "content": "task"},
+                {"role": "assistant", "content": turn}]
+
+    def test_marked_prefix_is_read_on_the_next_call(self):
+        provider = SimulatedProvider()
+        first = provider.complete(CLAUDE, mark_cache_breakpoints(self.messages(), CLAUDE))
+        second = provider.complete(CLAUDE, mark_cache_breakpoints(self.messages("b"), CLAUDE))
+        self.assertEqual(first[1], 0)
+        self.assertEqual(second[1], (len(LONG) + len("task")) // CHARS_PER_TOKEN)
+        self.assertLess(second[2], first[2])
+        self.assertLess(second[3], first[3])
+
+    def test_unmarked_and_short_prompts_miss(self):
+        provider = SimulatedProvider()
+        for _ in range(2):
+            self.assertEqual(provider.complete(CLAUDE, self.messages())[1], 0)
+        short = mark_cache_breakpoints([{"role": "system", "content": "short"}], CLAUDE)
+        for _ in range(2):
+            self.assertEqual(provider.complete(CLAUDE, short)[1], 0)
+        disabled = SimulatedProvider(caching=False)
+        for _ in range(2):
+            self.assertEqual(disabled.complete(CLAUDE, mark_cache_breakpoints(self.messages(), CLAUDE))[1], 0)
+
+    def test_automatic_caching(self):
+        provider = SimulatedProvider()
+        self.assertEqual(provider.complete("gpt-4o", self.messages())[1], 0)
+        self.assertGreaterEqual(provider.complete("gpt-4o", self.messages("b"))[1], MIN_CACHED_TOKENS)
+
+    def test_too_many_breakpoints_are_rejected(self):
+        block = {"text": "t", "cache_control": {"type": "ephemeral"}}
+        with self.assertRaises(ValueError):
+            SimulatedProvider().complete(CLAUDE, [{"role": "user", "content": [block] * (MAX_BREAKPOINTS + 1)}])
+
+
+class TestAccounting(unittest.TestCase):
+    def test_cached_tokens(self):
+        self.assertEqual(cached_tokens({"prompt_tokens_details": {"cached_tokens": 1200}}), 1200)
+        self.assertEqual(cached_tokens({"cache_read_input_tokens": 900}), 900)
+        self.assertEqual(cached_tokens({"prompt_tokens": 10}), 0)
+        self.assertEqual(cached_tokens(None), 0)
+
+    def test_stats(self):
+        stats = PromptCacheStats()
+        stats.record("lead", 1000, 0, 0.5)
+        stats.record("lead", 1000, 800, 0.2)
+        row = stats.agents["lead"]
+        self.assertEqual((row["calls"], row["hits"], row["cached_tokens"]), (2, 1, 800))
+        self.assertAlmostEqual(row["cost"], 1000 + 1000 - 800 * 0.9)
+
+    def test_simulation_saves_cost(self):
+        without = simulate(2, caching=False).agents
+        with_caching = simulate(2, caching=True).agents
+        for agent, row in with_caching.items():
+            self.assertGreater(row["hits"], 0)
+            self.assertLess(row["cost"], without[agent]["cost"])
+            self.assertEqual(without[agent]["hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
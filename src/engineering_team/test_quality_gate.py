@@ -0,0 +1,95 @@
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from engineering_team.quality_gate import GateResult, find_complexity_issues, is_better, optimize, score
+
+
+def result(failures, seconds, findings=("slow",)):
+    return GateResult(10, failures, "", {}, seconds, list(findings))
+
+
+def benchmark(small, large):
+    return {"1": {"operations": small}, "10000": {"operations": large}}
+
+
+class TestSelection(unittest.TestCase):
+    def test_is_better(self):
+        self.assertTrue(is_better(result(0, 2.0), result(1, 1.0)))  # Fewer failures beat speed
+        self.assertTrue(is_better(result(0, 1.0), result(0, 2.0)))
+        self.assertFalse(is_better(result(1, 0.1), result(0, 2.0)))
+        self.assertFalse(is_better(result(0, 2.0), result(0, 2.0)))  # Ties keep the current best
+        self.assertTrue(is_better(result(0, 5.0), result(0, math.inf)))
+
+    def test_score_and_findings(self):
+        timings = benchmark({"deposit": 1e-6, "report": 1e-6}, {"deposit": 1e-6, "report": 1e-2})
+        self.assertAlmostEqual(score(timings), 1e-4)
+        self.assertEqual(score(benchmark({}, {})), math.inf)
+        findings = find_complexity_issues(timings)
+        self.assertEqual(len(findings), 1)
+        self.assertTrue(findings[0].startswith("report takes 10000.0us per call with 10000 transactions"))
+        self.assertIn("O(n^1.0)", findings[0])
+
+
+class TestOptimize(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.module_path = os.path.join(self.tmpdir.name, "accounts.py")
+        self.write("original")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, code):
+        with open(self.module_path, "w") as f:
+            f.write(code)
+
+    def read(self):
+        with open(self.module_path) as f:
+            return f.read()
+
+    def optimize(self, results, revisions, rounds):
+        """Runs optimize with the gate result of each version of the module given by results."""
+        seen = []
+
+        def run_round(code, feedback):
+            seen.append(code)
+            self.write(revisions.pop(0))
+
+        with mock.patch("engineering_team.quality_gate.evaluate", lambda module, tests: results[self.read()]):
+            best = optimize(run_round, self.module_path, "test_accounts.py", rounds, log=lambda line: None)
+        return best, seen
+
+    def test_keeps_the_fastest_passing_version(self):
+        results = {"original": result(0, 3.0), "faster": result(0, 2.0), "broken": result(2, 0.5),
+                   "slower": result(0, 2.5)}
+        best, seen = self.optimize(results, ["faster", "broken", "slower"], rounds=3)
+        self.assertIs(best, results["faster"])
+        self.assertEqual(self.read(), "faster")
+        # Each round starts from the best version so far, not the last attempt
+        self.assertEqual(seen, ["original", "faster", "faster"])
+
+    def test_restores_the_original_when_nothing_improves(self):
+        results = {"original": result(0, 3.0), "broken": result(1, 0.1)}
+        best, _ = self.optimize(results, ["broken"], rounds=1)
+        self.assertIs(best, results["original"])
+        self.assertEqual(self.read(), "original")
+
+    def test_stops_when_there_is_nothing_to_fix(self):
+        results = {"original": result(0, 3.0), "clean": result(0, 1.0, findings=()), "unused": result(0, 0.1)}
+        best, seen = self.optimize(results, ["clean", "unused"], rounds=5)
+        self.assertIs(best, results["clean"])
+        self.assertEqual(seen, ["original"])
+        self.assertEqual(self.read(), "clean")
+
+    def test_no_rounds_leaves_the_module(self):
+        results = {"original": result(0, 3.0)}
+        best, seen = self.optimize(results, [], rounds=0)
+        self.assertIs(best, results["original"])
+        self.assertEqual(seen, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import itertools
+import json
+import os
+import tempfile
+import unittest
+
+from engineering_team.ratelimit import BURST_SECONDS, FileState, Limit, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # As a real sleep does, always let some time pass, so rounding cannot stall a waiter
+        self.now += seconds + 1e-6
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limit = Limit(requests_per_minute=50, tokens_per_minute=20_000)
+        self.limiter = RateLimiter({"anthropic": self.limit}, clock=self.clock, sleep=self.clock.sleep)
+
+    def admitted_tokens(self, tokens, used, seconds=120, calls=None):
+        """Makes calls until the clock reaches seconds; calls gives (limiter, model) pairs taking turns."""
+        turns = itertools.cycle(calls or [(self.limiter, "anthropic/claude")])
+        admitted = 0
+        while self.clock.now < seconds:
+            limiter, model = next(turns)
+            limiter.acquire(model, tokens)
+            admitted += used
+            limiter.settle(model, tokens, used)
+        return admitted
+
+    def test_large_calls_stay_within_token_quota(self):
+        # 4000 tokens is more than the bucket holds, so each call overdraws it
+        admitted = self.admitted_tokens(4_000, 4_000)
+        allowed = self.limit.tokens_per_minute / 60 * (self.clock.now + BURST_SECONDS)
+        self.assertLessEqual(admitted, allowed + 4_000)
+        self.assertGreater(admitted, allowed * 0.9)
+
+    def test_unused_reservation_is_returned(self):
+        admitted = self.admitted_tokens(2_000, 500)
+        allowed = self.limit.tokens_per_minute / 60 * (self.clock.now + BURST_SECONDS)
+        self.assertGreater(admitted, allowed * 0.9)
+        self.assertLessEqual(admitted, allowed + 2_000)
+
+    def test_request_quota(self):
+        calls = 0
+        while self.clock.now < 60:
+            self.limiter.acquire("anthropic/claude", 1)
+            calls += 1
+        self.assertLessEqual(calls, self.limit.requests_per_minute / 60 * (60 + BURST_SECONDS) + 1)
+
+    def test_throttled_blocks_and_halves_rate(self):
+        self.limiter.acquire("anthropic/claude", 100)
+        self.limiter.throttled("anthropic/claude", retry_after=7.0)
+        waited = self.limiter.acquire("anthropic/claude", 100)
+        self.assertGreaterEqual(waited, 7.0)
+        with self.limiter.state.bucket("anthropic") as bucket:
+            self.assertEqual(bucket["multiplier"], 0.5)
+
+    def test_models_of_a_provider_share_its_limit(self):
+        admitted = self.admitted_tokens(1_000, 1_000, calls=[(self.limiter, "anthropic/claude-a"),
+                                                             (self.limiter, "anthropic/claude-b")])
+        allowed = self.limit.tokens_per_minute / 60 * (self.clock.now + BURST_SECONDS)
+        self.assertLessEqual(admitted, allowed + 1_000)
+
+    def test_own_limit_takes_precedence(self):
+        own = Limit(requests_per_minute=600, tokens_per_minute=600_000)
+        limiter = RateLimiter({"anthropic": self.limit, "anthropic/claude-a": own}, clock=self.clock,
+                              sleep=self.clock.sleep)
+        self.assertEqual(limiter.limit_key("anthropic/claude-a"), "anthropic/claude-a")
+        self.assertEqual(limiter.limit_key("anthropic/claude-b"), "anthropic")
+        self.assertIsNone(limiter.limit_key("gemini/pro"))
+
+    def test_processes_share_buckets_through_a_state_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.json")
+            limiters = [RateLimiter({"anthropic": self.limit}, FileState(path), clock=self.clock, sleep=self.clock.sleep)
+                        for _ in range(2)]
+            admitted = self.admitted_tokens(1_000, 1_000, calls=[(limiter, "anthropic/claude") for limiter in limiters])
+            allowed = self.limit.tokens_per_minute / 60 * (self.clock.now + BURST_SECONDS)
+            self.assertLessEqual(admitted, allowed + 1_000)
+            self.assertGreater(admitted, allowed * 0.9)
+            with open(path) as f:
+                self.assertEqual(list(json.load(f)), ["anthropic"])
+
+    def test_models_without_limit_are_not_limited(self):
+        self.assertEqual(self.limiter.acquire("gpt-4o", 10**9), 0.0)
+        self.assertEqual(self.clock.now, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from engineering_team.speculative import _compatible, affected, design_interface, interface_drift, signatures
+
+DESIGN = '''# Design for accounts.py
+
+## Function: `get_share_price(symbol: str) -> float`
+Returns test prices.
+
+## Class: Account
+
+### `__init__(self, account_id: str, initial_deposit: float)`
+Opens the account.
+
+#### `deposit(self, amount: float) -> None`
+#### `buy_shares(self, symbol: str, quantity: int) -> bool`
+#### `get_holdings(self) -> dict`
+#### `broken(self, amount: float = ) -> None`
+
+Notes on usage:
+```python
+MAX_QUANTITY = 1000
+```
+'''
+
+MODULE = '''
+MAX_QUANTITY = 1000
+
+
+def get_share_price(symbol):
+    return 1.0
+
+
+class Account:
+    def __init__(self, account_id, initial_deposit):
+        self.balance = initial_deposit
+
+    def deposit(self, amount):
+        self.balance += amount
+
+    def buy_shares(self, symbol, quantity):
+        return True
+
+    def get_holdings(self):
+        return {}
+
+    def _internal(self):
+        pass
+'''
+
+
+class TestDesignInterface(unittest.TestCase):
+    def test_signatures_from_headings(self):
+        found = signatures(design_interface(DESIGN))
+        self.assertEqual(found, {
+            "get_share_price": [("symbol", False)],
+            "Account": [("self", False), ("account_id", False), ("initial_deposit", False)],
+            "Account.deposit": [("self", False), ("amount", False)],
+            "Account.buy_shares": [("self", False), ("symbol", False), ("quantity", False)],
+            "Account.get_holdings": [("self", False)],
+        })
+        self.assertIn("MAX_QUANTITY = 1000", design_interface(DESIGN))
+
+    def test_class_heading_styles(self):
+        for heading in ("## Class: Account", "### class Account", "## `class Account`"):
+            source = design_interface(f"{heading}\n#### `deposit(self, amount)`\n")
+            self.assertEqual(list(signatures(source)), ["Account", "Account.deposit"])
+
+    def test_signatures(self):
+        found = signatures("def f(a, b=1, *args, c, d=2, **kwargs): pass\nclass C: pass\nclass _Private: pass\n")
+        self.assertEqual(found["f"], [("a", False), ("b", True), ("*args", True), ("c", False), ("d", True),
+                                      ("**kwargs", True)])
+        self.assertEqual(found["C"], None)
+        self.assertNotIn("_Private", found)
+
+
+class TestDrift(unittest.TestCase):
+    def test_matching_interface(self):
+        self.assertEqual(interface_drift(design_interface(DESIGN), MODULE), {})
+
+    def test_added_methods_and_parameters_with_defaults_are_not_drift(self):
+        module = MODULE + "\n    def get_report(self):\n        return ''\n"
+        module = module.replace("def deposit(self, amount):", "def deposit(self, amount, note=None):")
+        self.assertEqual(interface_drift(design_interface(DESIGN), module), {})
+
+    def test_changed_signatures_and_missing_methods(self):
+        module = (MODULE.replace("def buy_shares(self, symbol, quantity):", "def buy_shares(self, quantity, symbol):")
+                  .replace("def get_holdings(self):", "def report_holdings(self):")
+                  .replace("def __init__(self, account_id, initial_deposit):", "def __init__(self, initial_deposit):"))
+        drift = interface_drift(design_interface(DESIGN), module)
+        self.assertEqual(sorted(drift), ["Account", "Account.buy_shares", "Account.get_holdings"])
+        self.assertEqual(drift["Account.buy_shares"], "Account.buy_shares(self, symbol, quantity) is "
+                                                      "Account.buy_shares(self, quantity, symbol) in the module")
+        self.assertEqual(drift["Account.get_holdings"],
+                         "Account.get_holdings(self) is in the design but not in the module")
+
+    def test_compatible(self):
+        self.assertTrue(_compatible([("a", False)], [("a", False), ("b", True)]))
+        self.assertTrue(_compatible([("a", True)], [("a", True)]))
+        self.assertTrue(_compatible(None, [("a", False)]))
+        self.assertTrue(_compatible([("a", False), ("b", False)], [("*args", True)]))
+        self.assertFalse(_compatible([("a", False)], [("a", False), ("b", False)]))  # New required parameter
+        self.assertFalse(_compatible([("a", True)], [("a", False)]))  # Default removed
+        self.assertFalse(_compatible([("a", False)], [("b", False)]))  # Renamed
+        self.assertFalse(_compatible([("a", False), ("b", False)], [("b", False), ("a", False)]))  # Reordered
+
+
+class TestAffected(unittest.TestCase):
+    DRIFT = {"Account.buy_shares": "changed", "Account.get_holdings": "missing"}
+
+    def test_only_drift_the_file_uses(self):
+        app = "from accounts import Account\naccount = Account('a', 1.0)\naccount.buy_shares('AAPL', 1)\n"
+        self.assertEqual(affected(self.DRIFT, app), {"Account.buy_shares": "changed"})
+        self.assertEqual(affected(self.DRIFT, "from accounts import Account\n"), {})
+
+    def test_unparseable_file_depends_on_everything(self):
+        self.assertEqual(affected(self.DRIFT, "def broken(:\n"), self.DRIFT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from engineering_team.streaming import BrokenGeneration, CodeStreamer, StreamedFile
+
+CODE = 'import os\n\n\ndef home():\n    return os.environ["HOME"]\n'
+
+
+class TestStreamedFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "accounts.py")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def stream(self, *chunks):
+        streamed = StreamedFile(self.path)
+        try:
+            for chunk in chunks:
+                streamed.feed(chunk)
+        finally:
+            streamed.close()
+        with open(self.path) as f:
+            return f.read()
+
+    def test_unfenced_answer(self):
+        self.assertEqual(self.stream("Thought: I know it.\nFinal Answer: " + CODE), CODE)
+
+    def test_fenced_answer(self):
+        self.assertEqual(self.stream("Final Answer:\n```python\n", CODE, "```\nThat is all."), CODE)
+
+    def test_marker_split_across_chunks(self):
+        self.assertEqual(self.stream("Thought: done\nFinal An", "swer: import os\n", CODE[len("import os\n"):]), CODE)
+
+    def test_chunk_boundary_right_after_marker(self):
+        self.assertEqual(self.stream("Final Answer:", " import os\n", CODE[len("import os\n"):]), CODE)
+        self.assertEqual(self.stream("Final Answer:", " ```python\n", CODE, "```"), CODE)
+
+    def test_fence_inside_a_string_is_code(self):
+        code = 'HELP = """\nExample:\n```\nrun()\n```\n"""\nx = 1\n'
+        self.assertEqual(self.stream("Final Answer: ```python\n", code, "```\n"), code)
+
+    def test_nothing_is_written_before_the_answer(self):
+        streamed = StreamedFile(self.path)
+        streamed.feed("Thought: I should read the design first\nAction: read_file\n")
+        streamed.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_broken_statement_stops_the_stream(self):
+        streamed = StreamedFile(self.path)
+        streamed.feed("Final Answer: import os\nx = = 1\n")
+        with self.assertRaisesRegex(BrokenGeneration, "invalid syntax"):
+            streamed.feed("y = 2\n")
+        streamed.close()
+
+    def test_unclosed_bracket_before_a_definition(self):
+        streamed = StreamedFile(self.path)
+        streamed.feed("Final Answer: x = max(1,\n")
+        with self.assertRaisesRegex(BrokenGeneration, r"unclosed bracket before 'def f\(\):'"):
+            streamed.feed("def f():\n")
+        streamed.close()
+
+    def test_statement_spanning_lines_is_not_broken(self):
+        code = "x = max(\n1,\n2)\nif x:\n    pass\nelse:\n    pass\n@staticmethod\ndef f():\n    pass\n"
+        self.assertEqual(self.stream("Final Answer: ", *code.splitlines(keepends=True)), code)
+
+
+class TestCodeStreamer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.streamer = CodeStreamer()
+        self.llm = object()  # Streams are routed by LLM identity
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def task(self, name):
+        return SimpleNamespace(agent=SimpleNamespace(llm=self.llm), output_file=os.path.join(self.tmpdir.name, name))
+
+    def read(self, task):
+        with open(task.output_file) as f:
+            return f.read()
+
+    def chunk(self, text):
+        self.streamer._on_chunk(self.llm, SimpleNamespace(chunk=text))
+
+    def complete(self, task, raw):
+        self.streamer._on_task_completed(task, SimpleNamespace(output=SimpleNamespace(raw=raw)))
+
+    def test_streams_code_tasks_and_saves_the_final_answer(self):
+        task = self.task("accounts.py")
+        self.streamer._on_task_started(task, None)
+        self.streamer._on_call_started(self.llm, None)
+        self.chunk("Final Answer: ```python\nimport os\n")
+        self.assertEqual(self.read(task), "import os\n")  # Written before the task ends
+        self.chunk("x = 1\n```")
+        self.complete(task, "```python\nimport os\nx = 1\n```")
+        self.assertEqual(self.read(task), "import os\nx = 1")
+
+    def test_other_tasks_are_not_streamed(self):
+        task = self.task("design.md")
+        self.streamer._on_task_started(task, None)
+        self.streamer._on_call_started(self.llm, None)
+        self.chunk("Final Answer: # Design\n")
+        self.assertFalse(os.path.exists(task.output_file))
+
+    def test_broken_generation_is_raised_to_the_llm(self):
+        task = self.task("accounts.py")
+        self.streamer._on_task_started(task, None)
+        self.streamer._on_call_started(self.llm, None)
+        self.chunk("Final Answer: x = = 1\n")
+        with self.assertRaises(BrokenGeneration):
+            self.chunk("y = 2\n")
+        self.chunk("z = 3\n")  # Ignored until the retry's call starts
+        self.assertEqual(self.read(task), "x = = 1\n")
+
+    def test_hedged_llm_streams_through_its_primary(self):
+        task = self.task("accounts.py")
+        task.agent.llm = SimpleNamespace(primary=self.llm)
+        self.streamer._on_task_started(task, None)
+        self.streamer._on_call_started(self.llm, None)
+        self.chunk("Final Answer: x = 1\n")
+        self.assertEqual(self.read(task), "x = 1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
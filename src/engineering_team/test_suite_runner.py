@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+import unittest
+
+from engineering_team.suite_runner import CACHE_FILE, collect, run_suites
+
+MODULE = '''
+def double(x):
+    return 2 * x
+'''
+
+TESTS = '''
+import time
+import unittest
+
+from sample import double
+
+
+class TestSample(unittest.TestCase):
+    def test_double(self):
+        self.assertEqual(double(2), 4)
+
+    def test_wrong(self):
+        self.assertEqual(double(2), 5)
+'''
+
+SLOW = '''
+import time
+import unittest
+
+
+class TestSlow(unittest.TestCase):
+    def test_slow(self):
+        time.sleep(1.0)
+'''
+
+
+class TestRunSuites(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.write("sample.py", MODULE)
+        self.test_path = self.write("test_sample.py", TESTS)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, source):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def statuses(self, result):
+        return {outcome.test_id: outcome.status for outcome in result.outcomes}
+
+    def test_outcomes(self):
+        result = run_suites([self.test_path], workers=2, use_cache=False)[self.test_path]
+        self.assertEqual(self.statuses(result), {"TestSample.test_double": "pass", "TestSample.test_wrong": "fail"})
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, CACHE_FILE)))
+
+    def test_passing_tests_are_cached_until_their_module_changes(self):
+        run_suites([self.test_path], workers=2)
+        result = run_suites([self.test_path], workers=2)[self.test_path]
+        self.assertEqual(result.cached, 1)
+        self.assertEqual(self.statuses(result)["TestSample.test_wrong"], "fail")
+
+        self.write("sample.py", MODULE + "\n# edited\n")
+        self.assertEqual(run_suites([self.test_path], workers=2)[self.test_path].cached, 0)
+
+    def test_editing_one_test_changes_only_its_key(self):
+        before = {case.test_id: case.key for case in collect(self.test_path)}
+        self.write("test_sample.py", TESTS.replace("double(2), 5", "double(3), 5"))
+        after = {case.test_id: case.key for case in collect(self.test_path)}
+        self.assertEqual(before["TestSample.test_double"], after["TestSample.test_double"])
+        self.assertNotEqual(before["TestSample.test_wrong"], after["TestSample.test_wrong"])
+
+    def test_hung_shard_is_reported_as_an_error(self):
+        self.write("test_sample.py", TESTS.replace("self.assertEqual(double(2), 5)", "time.sleep(60)"))
+        start = time.perf_counter()
+        result = run_suites([self.test_path], workers=2, use_cache=False, timeout=2)[self.test_path]
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertEqual(self.statuses(result), {"TestSample.test_double": "pass", "TestSample.test_wrong": "error"})
+        self.assertIn("Timed out", result.outcomes[-1].detail)
+
+    def test_timeout_bounds_the_whole_run(self):
+        # Each shard finishes within the timeout, but not all of them together
+        paths = [self.write(f"test_slow{index}.py", SLOW) for index in range(3)]
+        start = time.perf_counter()
+        results = run_suites(paths, workers=1, use_cache=False, timeout=1.6)
+        self.assertLess(time.perf_counter() - start, 2.8)
+        statuses = [self.statuses(results[path])["TestSlow.test_slow"] for path in paths]
+        self.assertEqual(statuses, ["pass", "error", "error"])
+
+
+if __name__ == "__main__":
+    unittest.main()